@@ -1,9 +1,22 @@
 import os
+import threading
+from collections import deque
+from contextlib import contextmanager
 from google.adk.agents import Agent
+from google.adk.flows.llm_flows.functions import find_matching_function_call
+from google.adk.runners import Runner
 from prompts.system_prompts import ROOT_SYSTEM_PROMPT, TECH_PROMPT, BILLING_PROMPT, ESCALATION_PROMPT
-from tools.billing_tools import check_balance, process_payment
-from tools.network_tools import check_outage, run_diagnostics
-from tools.escalation_tools import escalate_to_human
+from services.database import REDIS_CLIENT_MODE
+from agents.scheduled_gemini import ScheduledGemini
+from agents.context_compactor import context_compactor
+from agents.prompt_cache import caller_context
+if REDIS_CLIENT_MODE == "async":
+    # Tools await the pooled asyncio Redis client instead of blocking the loop
+    from tools.async_tools import check_balance, process_payment, check_outage, run_diagnostics, escalate_to_human
+else:
+    from tools.billing_tools import check_balance, process_payment
+    from tools.network_tools import check_outage, run_diagnostics
+    from tools.escalation_tools import escalate_to_human
 from agents.escalation_agent import escalation_agent # We can reuse this one if it has no tools/state, or recreate it.
 # Actually, let's just recreate them all to be safe.
 
@@ -15,46 +28,142 @@ try:
 except ImportError:
     MODEL_NAME = "gemini-2.0-flash"
 
-def create_agent_graph(user_id: str) -> Agent:
+# Session state key holding the caller's ID; resolved by ADK instruction templating
+USER_ID_STATE_KEY = "user_id"
+USER_ID_TEMPLATE = "{" + USER_ID_STATE_KEY + "}"
+
+
+def _build_graph(user_id: str, model=None) -> Agent:
     """
-    Creates a fresh Agent Graph for a specific request.
-    Injects user_id into system prompts to ensure robust tool calling.
+    Builds the RootDispatcher -> specialists graph with the given user ID text.
+    `model` replaces the Gemini client, e.g. with a fake model for load tests.
     """
-    
-    # helper to inject context
-    def inject_id(prompt):
-        return f"CURRENT USER ID: {user_id}\n\n{prompt}"
+
+    # One model client for the graph; each call leases its own API key
+    model = model or ScheduledGemini(model=MODEL_NAME)
+
+    # Every agent sends a token-budgeted history and records what its tools found.
+    # System instructions stay static, so the prompt prefix is identical for every
+    # caller; the caller's ID goes first in the conversation instead.
+    callbacks = dict(
+        before_model_callback=[context_compactor.before_model, caller_context(f"CURRENT USER ID: {user_id}")],
+        after_tool_callback=context_compactor.after_tool,
+    )
 
     # 1. Billing Agent
     billing = Agent(
         name="BillingAgent",
-        instruction=inject_id(BILLING_PROMPT),
-        model=MODEL_NAME,
-        tools=[check_balance, process_payment]
+        instruction=BILLING_PROMPT,
+        model=model,
+        tools=[check_balance, process_payment],
+        **callbacks
     )
 
     # 2. Tech Support Agent
     tech = Agent(
         name="TechSupportAgent",
-        instruction=inject_id(TECH_PROMPT),
-        model=MODEL_NAME,
-        tools=[check_outage, run_diagnostics]
+        instruction=TECH_PROMPT,
+        model=model,
+        tools=[check_outage, run_diagnostics],
+        **callbacks
     )
     
     # 3. Escalation Agent
     escalation = Agent(
         name="EscalationAgent",
-        instruction=inject_id(ESCALATION_PROMPT),
-        model=MODEL_NAME,
-        tools=[escalate_to_human]
+        instruction=ESCALATION_PROMPT,
+        model=model,
+        tools=[escalate_to_human],
+        **callbacks
     )
 
     # 4. Root Dispatcher
     root = Agent(
         name="RootDispatcher",
-        instruction=inject_id(ROOT_SYSTEM_PROMPT),
-        model=MODEL_NAME,
-        sub_agents=[tech, billing, escalation]
+        instruction=ROOT_SYSTEM_PROMPT,
+        model=model,
+        sub_agents=[tech, billing, escalation],
+        **callbacks
     )
     
     return root
+
+def create_agent_graph(user_id: str, model=None) -> Agent:
+    """
+    Creates a fresh Agent Graph for a specific request.
+    Gives every model call user_id as context to ensure robust tool calling.
+    """
+    return _build_graph(user_id, model)
+
+_TEMPLATE_GRAPH = None
+_TEMPLATE_GRAPH_LOCK = threading.Lock()
+
+def get_agent_graph() -> Agent:
+    """
+    Returns the process-wide template Agent Graph.
+    The caller context carries a `{user_id}` placeholder that is filled from
+    session state on every model call, so the graph itself holds no per-caller data.
+    """
+    global _TEMPLATE_GRAPH
+    if _TEMPLATE_GRAPH is None:
+        with _TEMPLATE_GRAPH_LOCK:
+            if _TEMPLATE_GRAPH is None:
+                _TEMPLATE_GRAPH = _build_graph(USER_ID_TEMPLATE)
+    return _TEMPLATE_GRAPH
+
+def initial_session_state(user_id: str) -> dict:
+    """State a new session needs for the template graph's prompts to resolve."""
+    return {USER_ID_STATE_KEY: user_id}
+
+
+class RoutedRunner(Runner):
+    """
+    Runner over the whole graph that starts each turn at `start_agent` (a
+    specialist picked by agents/intent_router.py) instead of the agent ADK
+    would pick, skipping the RootDispatcher LLM hop. Every earlier event's
+    author is still an agent of this graph, and transfers resolve as usual.
+    _find_agent_to_run is private to ADK, so google-adk is pinned exactly in
+    requirements.txt and tests/test_intent_router.py checks the hook.
+    """
+
+    def __init__(self, *, start_agent: str, **kwargs):
+        super().__init__(**kwargs)
+        self.start_agent = start_agent
+
+    def _find_agent_to_run(self, session, root_agent):
+        # A pending function response still goes back to the agent that called
+        if find_matching_function_call(session.events) is None:
+            agent = root_agent.find_agent(self.start_agent)
+            if agent is not None:
+                return agent
+        return super()._find_agent_to_run(session, root_agent)
+
+
+class RunnerPool:
+    """
+    Reuses Runners bound to the template graph.
+    Runners keep no per-invocation state, so an idle one can serve any caller.
+    """
+
+    def __init__(self, factory, max_idle: int = 16):
+        self._factory = factory
+        self._max_idle = max_idle
+        self._idle = deque()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def runner(self):
+        with self._lock:
+            runner = self._idle.pop() if self._idle else None
+        if runner is None:
+            runner = self._factory()
+        try:
+            yield runner
+        finally:
+            with self._lock:
+                if len(self._idle) < self._max_idle:
+                    self._idle.append(runner)
+
+    def clear(self):
+        with self._lock:
+            self._idle.clear()
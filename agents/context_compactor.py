@@ -0,0 +1,148 @@
+import json
+import logging
+import os
+
+from dotenv import load_dotenv
+from google.genai import types
+
+from services.metrics import CONTEXT_COMPACTIONS, PROMPT_HISTORY_TOKENS
+
+load_dotenv()
+
+logger = logging.getLogger("ContextCompactor")
+
+# --- Context Settings ---
+# Estimated tokens of earlier turns sent with each model call (0 = send the whole call)
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "2000"))
+# When over budget, older turns are folded away until history fits in this share
+# of the budget, so the cut (and the prompt prefix) moves every few turns, not every turn
+CONTEXT_COMPACT_TO = float(os.environ.get("CONTEXT_COMPACT_TO", "0.5"))
+
+# Session state keys: turns already folded away, and one line per tool with its latest result
+DROPPED_TURNS_KEY = "context_dropped_turns"
+CALL_FACTS_KEY = "call_facts"
+
+# What is worth remembering from each tool's result once its turn is folded away
+CALL_FACTS = {
+    "check_balance": "balance checked: {balance_amount} {currency}, due {due_date}",
+    "process_payment": "payment of {amount_paid} made, remaining balance {remaining_balance}, "
+                       "transaction {transaction_id}",
+    "check_outage": "network status in {region}: {status}",
+    "run_diagnostics": "diagnostics on {device}: {status}",
+    "escalate_to_human": "escalated to a human, ticket {ticket_id}",
+}
+
+# ADK replays other agents' events as user messages starting with this part
+_FOREIGN_MARKER = "For context:"
+_CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(content: types.Content) -> int:
+    """Rough token count (~4 characters a token), good enough to budget with."""
+    chars = 0
+    for part in content.parts or ():
+        if part.text:
+            chars += len(part.text)
+        elif part.function_call:
+            chars += len(part.function_call.name or "") + len(json.dumps(part.function_call.args or {}, default=str))
+        elif part.function_response:
+            chars += len(part.function_response.name or "") + len(
+                json.dumps(part.function_response.response or {}, default=str))
+    return chars // _CHARS_PER_TOKEN + 1
+
+
+def _is_caller_message(content: types.Content) -> bool:
+    if content.role != "user" or not content.parts:
+        return False
+    first = content.parts[0]
+    return bool(first.text) and first.text != _FOREIGN_MARKER and not any(p.function_response for p in content.parts)
+
+
+def split_turns(contents: list) -> list:
+    """
+    Groups contents into turns, each starting at a caller message. A model's
+    function_call and its function_response always land in the same turn.
+    """
+    turns = []
+    for content in contents:
+        if not turns or _is_caller_message(content):
+            turns.append([content])
+        else:
+            turns[-1].append(content)
+    return turns
+
+
+class ContextCompactor:
+    """
+    Keeps the history sent to the model within a token budget.
+
+    Turns are dropped whole and oldest first, so tool call/response pairs stay
+    intact; what they established (balance, ticket, outage status) survives as
+    a short note built from CALL_FACTS, recorded as tools return. The number
+    of dropped turns is kept in session state, so each call only measures the
+    turns after the cut and the cut never moves back.
+    """
+
+    def __init__(self, budget: int = CONTEXT_TOKEN_BUDGET, compact_to: float = CONTEXT_COMPACT_TO):
+        self.budget = budget
+        self.compact_to = compact_to
+
+    def compact(self, contents: list, state) -> list:
+        """The contents to send; updates DROPPED_TURNS_KEY in `state` when the cut moves."""
+        turns = split_turns(contents)
+        if self.budget <= 0 or len(turns) < 2:
+            return contents
+
+        # The caller's current turn is always sent in full
+        history, current = turns[:-1], turns[-1]
+        dropped = min(state.get(DROPPED_TURNS_KEY, 0), len(history))
+        history = history[dropped:]
+        sizes = [sum(estimate_tokens(c) for c in turn) for turn in history]
+        total = sum(sizes)
+
+        if total > self.budget:
+            target = self.budget * self.compact_to
+            while sizes and total > target:
+                total -= sizes.pop(0)
+                history.pop(0)
+                dropped += 1
+            state[DROPPED_TURNS_KEY] = dropped
+            CONTEXT_COMPACTIONS.inc()
+            logger.info(f"Compacted history: {dropped} earlier turns folded into the call summary")
+
+        kept = [content for turn in history + [current] for content in turn]
+        if dropped:
+            kept.insert(0, self.summary(state))
+        return kept
+
+    @staticmethod
+    def summary(state) -> types.Content:
+        facts = list((state.get(CALL_FACTS_KEY) or {}).values())
+        text = "Earlier turns of this call were summarized."
+        if facts:
+            text += " So far: " + "; ".join(facts) + "."
+        return types.Content(role="user", parts=[types.Part(text=_FOREIGN_MARKER), types.Part(text=text)])
+
+    # --- ADK callbacks (see agents/agent_factory.py) ---
+
+    def before_model(self, callback_context, llm_request):
+        llm_request.contents = self.compact(llm_request.contents, callback_context.state)
+        PROMPT_HISTORY_TOKENS.observe(sum(estimate_tokens(c) for c in llm_request.contents),
+                                      callback_context.agent_name)
+        return None
+
+    def after_tool(self, tool, args, tool_context, tool_response):
+        template = CALL_FACTS.get(tool.name)
+        if template is None or not isinstance(tool_response, dict) or tool_response.get("status") == "error":
+            return None
+        try:
+            fact = template.format(**tool_response)
+        except KeyError:
+            return None
+        # Reassigned (not mutated in place) so the change is recorded as a state delta
+        tool_context.state[CALL_FACTS_KEY] = {**(tool_context.state.get(CALL_FACTS_KEY) or {}), tool.name: fact}
+        return None
+
+
+# Global Compactor Instance
+context_compactor = ContextCompactor()
@@ -0,0 +1,74 @@
+import os
+import threading
+from collections import Counter
+
+from dotenv import load_dotenv
+
+from agents.utterance_classifier import utterance_classifier
+
+load_dotenv()
+
+# --- Routing Settings ---
+# "fast": confident keyword intents go straight to a specialist agent
+# "llm":  every turn goes through the RootDispatcher
+INTENT_ROUTING_MODE = os.environ.get("INTENT_ROUTING_MODE", "fast").lower()
+# One keyword inside a sentence scores 0.75 and stays with the RootDispatcher; two hits
+# for the same intent (0.875) or a whole-utterance request (1.0) take the fast path
+INTENT_CONFIDENCE_THRESHOLD = float(os.environ.get("INTENT_CONFIDENCE_THRESHOLD", "0.8"))
+
+# Specialist agent each intent is dispatched to on the fast path
+INTENT_AGENTS = {
+    "billing": "BillingAgent",
+    "network": "TechSupportAgent",
+    "human": "EscalationAgent",
+}
+
+# The classifier compiled over just the intents above
+routable_intents = utterance_classifier.subset(INTENT_AGENTS)
+
+
+def classify_intent(text: str):
+    """
+    Scores the routable intents' phrases (agents/intents.json) in one pass.
+    Returns (intent, confidence); confidence grows with the number of hits for
+    the winning intent and shrinks when other intents match too.
+    Ties go to the earlier intent in the config.
+    """
+    intent, confidence, _ = routable_intents.classify(text)
+    return intent, confidence
+
+
+class IntentRouter:
+    """Picks the agent a turn starts at and tracks per-intent fast-path hit rates."""
+
+    def __init__(self, mode: str = INTENT_ROUTING_MODE,
+                 threshold: float = INTENT_CONFIDENCE_THRESHOLD):
+        self.mode = mode
+        self.threshold = threshold
+        self.fast_path = Counter()
+        self.fallback = Counter()
+        self._lock = threading.Lock()
+
+    def route(self, text: str):
+        """Returns the specialist agent name, or None to use the LLM RootDispatcher."""
+        intent, confidence = classify_intent(text)
+        routed = self.mode == "fast" and intent is not None and confidence >= self.threshold
+        with self._lock:
+            if routed:
+                self.fast_path[intent] += 1
+            else:
+                self.fallback[intent or "unknown"] += 1
+        return INTENT_AGENTS[intent] if routed else None
+
+    def hit_rates(self) -> dict:
+        """Share of turns per intent that skipped the RootDispatcher."""
+        with self._lock:
+            intents = set(self.fast_path) | set(self.fallback)
+            return {
+                intent: self.fast_path[intent] / (self.fast_path[intent] + self.fallback[intent])
+                for intent in intents
+            }
+
+
+# Global Router Instance
+intent_router = IntentRouter()
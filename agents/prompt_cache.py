@@ -0,0 +1,142 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from google.adk.utils import instructions_utils
+from google.genai import types
+
+from services.metrics import PROMPT_CACHE_REQUESTS
+
+load_dotenv()
+
+logger = logging.getLogger("PromptCache")
+
+# --- Prompt Cache Settings ---
+# "off":      static-first prompts only (enough for Gemini's implicit prefix caching)
+# "explicit": also serve each agent's system instruction + tools from a Gemini cached content
+PROMPT_CACHE_MODE = os.environ.get("PROMPT_CACHE_MODE", "off").lower()
+PROMPT_CACHE_TTL_SECONDS = int(os.environ.get("PROMPT_CACHE_TTL_SECONDS", "3600"))
+# A prefix the API refuses to cache (e.g. below the model's minimum size) is retried after this long
+PROMPT_CACHE_RETRY_SECONDS = int(os.environ.get("PROMPT_CACHE_RETRY_SECONDS", "600"))
+
+# ADK replays other agents' events as user messages starting with this part
+_CONTEXT_MARKER = "For context:"
+
+
+def caller_context(template: str):
+    """
+    before_model callback that sends the per-caller line (e.g. "CURRENT USER
+    ID: {user_id}", resolved from session state) as the first message instead
+    of inside the system instruction. Every agent's system instruction and
+    tools are then the same bytes for every caller and turn, so the provider
+    can reuse the prompt prefix.
+    """
+
+    async def add_caller_context(callback_context, llm_request):
+        text = await instructions_utils.inject_session_state(template, callback_context)
+        llm_request.contents.insert(
+            0, types.Content(role="user", parts=[types.Part(text=_CONTEXT_MARKER), types.Part(text=text)]))
+        return None
+
+    return add_caller_context
+
+
+def prefix_bytes(config: types.GenerateContentConfig) -> bytes:
+    """The static part of a request: system instruction, tools and tool config."""
+    if config is None:
+        return b""
+    return config.model_dump_json(include={"system_instruction", "tools", "tool_config"}, exclude_none=True).encode()
+
+
+class PromptCache:
+    """
+    Explicit Gemini context caching for the static prompt prefix.
+
+    One cached content per (API key, model, prefix): caches belong to the
+    key's project, and each agent has its own instruction and tools. The first
+    request for a prefix creates it while concurrent ones go out uncached; a
+    prefix the API will not cache is remembered and retried later.
+    """
+
+    def __init__(self, mode: str = PROMPT_CACHE_MODE, ttl: int = PROMPT_CACHE_TTL_SECONDS,
+                 retry_after: int = PROMPT_CACHE_RETRY_SECONDS):
+        self.mode = mode
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self._entries = {}  # key -> (cached content name or None, usable until)
+        self._creating = set()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode == "explicit"
+
+    async def apply(self, llm_request, api_key: str, model: str, create):
+        """
+        Returns the request to send: a copy pointing at the cached prefix
+        (without the instruction and tools it holds), or `llm_request` as is.
+        `create(model=..., config=CreateCachedContentConfig)` makes a cache.
+        """
+        if not self.enabled:
+            return llm_request
+        config = llm_request.config
+        if config is None or config.cached_content or not config.system_instruction:
+            return llm_request
+
+        prefix = prefix_bytes(config)
+        key = (api_key or "", model, hashlib.sha256(prefix).hexdigest())
+        now = time.monotonic()
+        with self._lock:
+            name, usable_until = self._entries.get(key, (None, 0.0))
+            fresh = now < usable_until
+            creating = key in self._creating
+            if not fresh and not creating:
+                self._creating.add(key)
+        if fresh:
+            PROMPT_CACHE_REQUESTS.inc("hit" if name else "unavailable")
+            return self._cached_request(llm_request, name) if name else llm_request
+        if creating:
+            PROMPT_CACHE_REQUESTS.inc("miss")
+            return llm_request
+
+        entry = None
+        try:
+            cache = await create(model=model, config=types.CreateCachedContentConfig(
+                system_instruction=config.system_instruction,
+                tools=config.tools,
+                tool_config=config.tool_config,
+                ttl=f"{self.ttl}s",
+            ))
+            # Refreshed a little before the API expires it
+            entry = (cache.name, time.monotonic() + self.ttl * 0.9)
+            logger.info(f"Cached prompt prefix ({len(prefix)} bytes) as {cache.name}")
+        except Exception as e:
+            entry = (None, time.monotonic() + self.retry_after)
+            logger.warning(f"Prompt prefix not cached, sending it with each request: {e}")
+        finally:
+            with self._lock:
+                self._creating.discard(key)
+                if entry is not None:
+                    self._entries[key] = entry
+
+        name = entry[0]
+        PROMPT_CACHE_REQUESTS.inc("miss")
+        return self._cached_request(llm_request, name) if name else llm_request
+
+    @staticmethod
+    def _cached_request(llm_request, name: str):
+        config = llm_request.config.model_copy(update={
+            "cached_content": name, "system_instruction": None, "tools": None, "tool_config": None,
+        })
+        return llm_request.model_copy(update={"config": config})
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Global Prompt Cache Instance
+prompt_cache = PromptCache()
@@ -0,0 +1,63 @@
+import threading
+
+from google.adk.models.google_llm import Gemini
+from google.genai import Client, errors, types
+from pydantic import PrivateAttr
+
+from agents.prompt_cache import prompt_cache
+from services.key_scheduler import key_scheduler
+
+
+def _is_rate_limited(error: errors.APIError) -> bool:
+    return error.code == 429 or error.status == "RESOURCE_EXHAUSTED"
+
+
+class ScheduledGemini(Gemini):
+    """
+    Gemini model whose calls each lease an API key from the key scheduler.
+    The key is handed to a per-key genai Client rather than read from the
+    process environment, so concurrent turns never race on GOOGLE_API_KEY.
+    A 429 puts the key on cooldown and the call is retried on another key.
+    With PROMPT_CACHE_MODE=explicit the static prompt prefix is sent as a
+    cached content of that key's project (see agents/prompt_cache.py).
+    """
+
+    _keyed_models: dict = PrivateAttr(default_factory=dict)
+    _keyed_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def _model_for(self, api_key: str) -> Gemini:
+        with self._keyed_lock:
+            keyed = self._keyed_models.get(api_key)
+            if keyed is None:
+                keyed = Gemini(model=self.model, retry_options=self.retry_options)
+                # Pre-fills Gemini.api_client (a cached_property) with a client bound to this key
+                keyed.__dict__["api_client"] = Client(
+                    api_key=api_key,
+                    http_options=types.HttpOptions(
+                        headers=keyed._tracking_headers,
+                        retry_options=self.retry_options,
+                    ),
+                )
+                self._keyed_models[api_key] = keyed
+            return keyed
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        # Each key gets at most one try per call
+        for attempt in range(max(1, len(key_scheduler))):
+            async with key_scheduler.lease() as api_key:
+                model = self._model_for(api_key) if api_key else super()
+                started = False
+                try:
+                    request = await prompt_cache.apply(
+                        llm_request, api_key, self.model, lambda **kw: model.api_client.aio.caches.create(**kw))
+                    async for response in model.generate_content_async(request, stream):
+                        started = True
+                        yield response
+                    return
+                except errors.APIError as e:
+                    # Only retry before anything reached the caller
+                    if not api_key or started or not _is_rate_limited(e):
+                        raise
+                    key_scheduler.report_rate_limited(api_key)
+                    if attempt == len(key_scheduler) - 1:
+                        raise
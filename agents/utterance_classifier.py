@@ -0,0 +1,167 @@
+import json
+import os
+import re
+from typing import NamedTuple, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- Classifier Settings ---
+# Phrase lists per intent (see agents/intents.json for the format)
+INTENT_CONFIG_PATH = os.environ.get(
+    "INTENT_CONFIG_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "intents.json")
+)
+
+# How a phrase has to appear in the utterance
+MATCH_MODES = {
+    "utterance": r"\W*(?:{})\W*$",  # the whole utterance, give or take punctuation (anchored by match())
+    "word": r"(?:{})\b",            # as whole words (the leading boundary is checked per match)
+    "contains": r"(?:{})",           # anywhere, e.g. "pay" in "payment"
+}
+
+
+class IntentMatch(NamedTuple):
+    intent: Optional[str]
+    confidence: float
+    span: Optional[tuple]  # (start, end) of the first match in the original text
+
+
+NO_MATCH = IntentMatch(None, 0.0, None)
+
+
+def _trie_pattern(leaves: dict) -> str:
+    """
+    Alternation of the phrases factored by common prefix ("b(?:alance|ill)"),
+    so the regex engine tries each leading letter once however many phrases
+    (and intents) share it. Each phrase ends in an empty named group from
+    `leaves` (phrase -> group name), which tells which phrase matched.
+    """
+    trie = {}
+    for phrase, group in leaves.items():
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = group  # a phrase ends here
+
+    def emit(node) -> str:
+        branches = [
+            # Any run of spaces/punctuation between words: "thanks bye" matches "Thanks, bye"
+            (r"\W+" if char == " " else re.escape(char)) + emit(child)
+            for char, child in sorted(node.items()) if char
+        ]
+        # After the longer phrases, so "bye bye" is not cut short at "bye"
+        if "" in node:
+            branches.append(f"(?P<{node['']}>)")
+        return branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+
+    return emit(trie)
+
+
+class UtteranceClassifier:
+    """
+    Compiles every intent's phrases into a prefix trie per match mode, so an
+    utterance is scanned once and the cost stays close to flat however many
+    intents there are. Whole-utterance phrases are tried once at the start;
+    word and contains phrases share one scan regex. Phrases are lowercased at
+    compile time and the utterance once per call; re.IGNORECASE would cost
+    more than the scan itself.
+
+    The winner is the intent with the highest priority, then the most hits,
+    then the earliest in the config. Confidence is 1.0 for a whole-utterance
+    phrase; otherwise it grows with the winner's hits and shrinks when other
+    intents match too. A phrase listed under two intents counts for the
+    earlier one.
+    """
+
+    def __init__(self, intents: dict):
+        self.spec = dict(intents)
+        self.intents = list(intents)
+        # max() key: higher priority first, then earlier in the config
+        self._rank = {
+            intent: (spec.get("priority", 0), -order) for order, (intent, spec) in enumerate(intents.items())
+        }
+        self._groups = {}  # regex group name -> (intent, mode)
+        self._subsets = {}
+        patterns = {}
+        for mode in ("utterance", "word", "contains"):
+            leaves = {}
+            for intent, spec in intents.items():
+                for phrase in spec.get(mode, ()):
+                    phrase = " ".join(phrase.lower().split())
+                    if phrase and phrase not in leaves:
+                        leaves[phrase] = f"p{len(self._groups)}"
+                        self._groups[leaves[phrase]] = (intent, mode)
+            if leaves:
+                patterns[mode] = MATCH_MODES[mode].format(_trie_pattern(leaves))
+        # Matched at position 0 only, before the scan, so it wins there
+        whole = patterns.pop("utterance", r"(?!)")
+        # No leading \b: a scan that starts with a phrase letter lets the regex engine
+        # skip ahead to candidate letters; classify() drops matches that start mid-word
+        # and retries the contains phrases there
+        scan = "|".join(patterns.values()) or r"(?!)"
+        contains = patterns.get("contains", r"(?!)")
+        self._regexes = tuple(re.compile(p) for p in (whole, scan, contains))
+        # For the rare text whose lowercase changes length ("İ"), where spans would drift
+        self._regexes_ignorecase = tuple(re.compile(p, re.IGNORECASE) for p in (whole, scan, contains))
+
+    @classmethod
+    def from_file(cls, path: str = INTENT_CONFIG_PATH) -> "UtteranceClassifier":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def subset(self, intents) -> "UtteranceClassifier":
+        """
+        Classifier over just these intents (in config order), compiled once.
+        Cheaper than filtering a full scan when a caller only asks one question.
+        """
+        key = frozenset(intents)
+        if key not in self._subsets:
+            self._subsets[key] = UtteranceClassifier({i: s for i, s in self.spec.items() if i in key})
+        return self._subsets[key]
+
+    def classify(self, text: str) -> IntentMatch:
+        """Best intent for the utterance, with the span of its first match."""
+        text = text or ""
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            subject, (whole, scan, contains) = lowered, self._regexes
+        else:
+            subject, (whole, scan, contains) = text, self._regexes_ignorecase
+
+        match = whole.match(subject)
+        if match is not None:
+            return IntentMatch(self._groups[match.lastgroup][0], 1.0, match.span())
+
+        hits = {}
+        spans = {}
+        search = scan.search
+        match = search(subject)
+        while match is not None:
+            start = match.start()
+            intent, mode = self._groups[match.lastgroup]
+            # A word phrase has to start a word (\w is isalnum() or "_")
+            if mode == "word" and start and (subject[start - 1].isalnum() or subject[start - 1] == "_"):
+                match = contains.match(subject, start) or search(subject, start + 1)
+                continue
+            if intent in hits:
+                hits[intent] += 1
+            else:
+                hits[intent] = 1
+                spans[intent] = match.span()
+            match = search(subject, match.end())
+        if not hits:
+            return NO_MATCH
+
+        if len(hits) == 1:
+            intent, top = hits.popitem()
+            total = top
+        else:
+            intent = max(hits, key=lambda i: (self._rank[i][0], hits[i], self._rank[i][1]))
+            top = hits[intent]
+            total = sum(hits.values())
+        return IntentMatch(intent, (top / total) * (1 - 0.5 ** (top + 1)), spans[intent])
+
+
+# Global Classifier Instance
+utterance_classifier = UtteranceClassifier.from_file()
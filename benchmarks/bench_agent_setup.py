@@ -0,0 +1,47 @@
+"""
+Per-turn agent setup cost: fresh graph + Runner (old path) vs pooled
+Runner on the cached template graph (current path).
+
+Run: python -m benchmarks.bench_agent_setup
+"""
+import timeit
+
+from google.adk.runners import Runner
+from google.adk.sessions.in_memory_session_service import InMemorySessionService
+
+from agents.agent_factory import create_agent_graph, get_agent_graph, RunnerPool
+
+TURNS = 200
+
+session_service = InMemorySessionService()
+
+
+def per_turn_rebuild():
+    agent = create_agent_graph("+918275267982")
+    Runner(agent=agent, app_name="voice-agent", session_service=session_service)
+
+
+runner_pool = RunnerPool(lambda: Runner(
+    agent=get_agent_graph(),
+    app_name="voice-agent",
+    session_service=session_service
+))
+
+
+def per_turn_pooled():
+    with runner_pool.runner():
+        pass
+
+
+def main():
+    results = {}
+    for name, fn in (("rebuild", per_turn_rebuild), ("pooled", per_turn_pooled)):
+        fn()  # warm up (imports, template graph, first Runner)
+        seconds = min(timeit.repeat(fn, number=TURNS, repeat=3))
+        results[name] = seconds / TURNS * 1e6
+        print(f"{name:>8}: {results[name]:10.1f} us/turn")
+    print(f"speedup: {results['rebuild'] / results['pooled']:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
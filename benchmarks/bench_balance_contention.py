@@ -0,0 +1,71 @@
+"""
+N concurrent payers debiting one hot account against a local Redis:
+legacy WATCH/MULTI retry loop vs the server-side Lua script in update_balance.
+
+Run: python -m benchmarks.bench_balance_contention [payers] [payments_per_payer]
+"""
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import redis
+
+from services.database import db
+
+HOT_KEY = "user:bench_hot_account"
+
+
+def legacy_update_balance(client, amount_paid: float):
+    """The pre-Lua implementation, kept here for comparison only."""
+    retries = 0
+    with client.pipeline() as pipe:
+        while True:
+            try:
+                pipe.watch(HOT_KEY)
+                user = json.loads(pipe.get(HOT_KEY))
+                user["balance"] = max(0, float(user.get("balance", 0)) - amount_paid)
+                pipe.multi()
+                pipe.set(HOT_KEY, json.dumps(user))
+                pipe.execute()
+                return retries
+            except redis.WatchError:
+                retries += 1
+
+
+def lua_update_balance(client, amount_paid: float):
+    db.update_balance(HOT_KEY.removeprefix("user:"), amount_paid)
+    return 0
+
+
+def run(name, fn, payers: int, per_payer: int):
+    opening = float(payers * per_payer)
+    db.client.set(HOT_KEY, json.dumps({"name": "Bench", "balance": opening}))
+
+    def payer(_):
+        return sum(fn(db.client, 1.0) for _ in range(per_payer))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=payers) as pool:
+        retries = sum(pool.map(payer, range(payers)))
+    elapsed = time.perf_counter() - start
+
+    final = json.loads(db.client.get(HOT_KEY))["balance"]
+    total = payers * per_payer
+    print(f"{name:>6}: {total / elapsed:8.0f} payments/s, {retries:6d} WATCH retries, final balance {final}")
+
+
+def main(payers: int, per_payer: int):
+    if db.client is None:
+        sys.exit("Redis is not reachable (see REDIS_URL).")
+    try:
+        run("watch", legacy_update_balance, payers, per_payer)
+        run("lua", lua_update_balance, payers, per_payer)
+    finally:
+        db.client.delete(HOT_KEY)
+
+
+if __name__ == "__main__":
+    payers = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    per_payer = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    main(payers, per_payer)
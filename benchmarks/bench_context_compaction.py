@@ -0,0 +1,95 @@
+"""
+Prompt size over a long call: estimated history tokens sent with each model
+call when the whole call is replayed (CONTEXT_TOKEN_BUDGET=0) vs with the
+token-budgeted compactor (agents/context_compactor.py).
+
+Runs the agent graph on the fake Gemini (benchmarks/fake_llm.py) with
+in-memory sessions and fakeredis, so nothing leaves the machine. Model
+latency and cost grow with prompt size, so the mean and max per call are
+what to compare.
+
+Run: python -m benchmarks.bench_context_compaction [turns]
+"""
+import asyncio
+import sys
+from unittest.mock import patch
+
+from google.adk.runners import Runner
+from google.adk.sessions.in_memory_session_service import InMemorySessionService
+from google.genai.types import Content, Part
+from pydantic import PrivateAttr
+
+from agents.agent_factory import create_agent_graph, initial_session_state
+from agents.context_compactor import CONTEXT_TOKEN_BUDGET, context_compactor, estimate_tokens
+from benchmarks.fake_llm import FakeGemini
+from benchmarks.load_calls import seed
+from services.database import AsyncRedisDatabase
+
+USER_ID = "+15550000000"
+
+# A caller who keeps coming back with the same few questions
+DIALOG = (
+    "What is my balance",
+    "Is there an outage in my area",
+    "How much is my bill due",
+    "My internet is still slow",
+    "I want to talk to a human agent",
+)
+
+
+class RecordingGemini(FakeGemini):
+    """FakeGemini that keeps the contents of every request it is sent."""
+
+    _requests: list = PrivateAttr(default_factory=list)
+
+    @property
+    def requests(self) -> list:
+        return self._requests
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        self._requests.append(list(llm_request.contents))
+        async for response in super().generate_content_async(llm_request, stream):
+            yield response
+
+
+async def run_call(turns: int, budget: int):
+    """Plays `turns` caller turns in one session; returns (model, final session state)."""
+    import fakeredis
+    db = AsyncRedisDatabase(client=fakeredis.FakeAsyncRedis(decode_responses=True))
+    await seed(db, 1)
+
+    model = RecordingGemini(latency=0)
+    sessions = InMemorySessionService()
+    runner = Runner(agent=create_agent_graph(USER_ID, model=model), app_name="voice-agent",
+                    session_service=sessions)
+    session = await sessions.create_session(app_name="voice-agent", user_id=USER_ID,
+                                            state=initial_session_state(USER_ID))
+
+    with patch('tools.async_tools.async_db', db), patch.object(context_compactor, "budget", budget):
+        for turn in range(turns):
+            message = Content(role="user", parts=[Part(text=DIALOG[turn % len(DIALOG)])])
+            async for _ in runner.run_async(user_id=USER_ID, session_id=session.id, new_message=message):
+                pass
+
+    session = await sessions.get_session(app_name="voice-agent", user_id=USER_ID, session_id=session.id)
+    return model, session.state
+
+
+def history_tokens(model) -> list:
+    return [sum(estimate_tokens(c) for c in contents) for contents in model.requests]
+
+
+def main(argv):
+    turns = int(argv[0]) if argv else 40
+    budget = CONTEXT_TOKEN_BUDGET or 2000
+    print(f"{turns} caller turns, budget {budget} tokens")
+    for name, mode_budget in (("whole call", 0), ("compacted", budget)):
+        model, state = asyncio.run(run_call(turns, mode_budget))
+        tokens = history_tokens(model)
+        print(f"{name:>11}: {len(tokens)} model calls, history tokens mean {sum(tokens) / len(tokens):7.0f}  "
+              f"max {max(tokens):6d}  last {tokens[-1]:6d}  total {sum(tokens):8d}")
+    print(f"call summary: {'; '.join(state.get('call_facts', {}).values())}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
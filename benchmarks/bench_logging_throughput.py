@@ -0,0 +1,102 @@
+"""
+Webhook throughput with logging off, with the old synchronous handlers
+(stdout + FileHandler on the event loop), and with the queued pipeline
+(services/log_pipeline.py), sampled and unsampled.
+
+Each turn is /gather_speech + /process_speech against a stub Runner, so the
+numbers isolate the web + logging path from the LLM. Console output goes to
+os.devnull; log files go to a temp directory.
+
+Run: python -m benchmarks.bench_logging_throughput [turns] [concurrency]
+"""
+import asyncio
+import gc
+import logging
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+
+# Importing server sets up logging; keep this run from writing a log file into the tree
+os.environ.setdefault("LOG_FILE", "")
+import server  # noqa: E402
+from agents.agent_factory import RunnerPool
+from services.log_pipeline import TEXT_FORMAT, setup_logging, shutdown_logging
+from services.session_store import create_session_backend
+
+
+class StubRunner:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def run_async(self, **kwargs):
+        yield SimpleNamespace(author="BillingAgent", text="Your balance is 500 rupees.")
+
+
+def logging_off(log_dir, devnull):
+    shutdown_logging()
+    logging.getLogger().handlers.clear()
+    logging.getLogger().setLevel(logging.WARNING)
+
+
+def logging_sync(log_dir, devnull):
+    # The pre-pipeline setup: every record is formatted and written inline
+    shutdown_logging()
+    root = logging.getLogger()
+    root.handlers.clear()
+    for handler in (logging.StreamHandler(devnull), logging.FileHandler(os.path.join(log_dir, "sync.log"))):
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+
+def logging_queued(log_dir, devnull, sample_rate=None):
+    options = {} if sample_rate is None else {"sample_rate": sample_rate}
+    setup_logging(log_file=os.path.join(log_dir, "queued.log"), stream=devnull, **options)
+
+
+async def run_turns(turns: int, concurrency: int, label: str) -> float:
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def caller(n, caller_id):
+            for k in range(n):
+                # A new caller per turn keeps session histories (and their cost) constant
+                form = {"From": f"bench-{label}-{caller_id}-{k}", "SpeechResult": "What is my balance"}
+                await client.post("/gather_speech", data=form)
+                await client.post("/process_speech", data={"From": form["From"]})
+
+        start = time.perf_counter()
+        await asyncio.gather(*(caller(turns // concurrency, i) for i in range(concurrency)))
+        return time.perf_counter() - start
+
+
+def main(turns: int, concurrency: int):
+    modes = (
+        ("off", logging_off),
+        ("sync", logging_sync),
+        ("queued", logging_queued),
+        ("queued/all", lambda d, n: logging_queued(d, n, sample_rate=1.0)),
+    )
+    with tempfile.TemporaryDirectory() as log_dir, open(os.devnull, "w") as devnull, \
+         patch('server.runner_pool', RunnerPool(StubRunner)), \
+         patch('server.intent_router.mode', "llm"):
+        for name, configure in modes:
+            configure(log_dir, devnull)
+            # Fresh stores per mode, so no mode pays for the sessions an earlier one left behind
+            session_service, call_store = create_session_backend("memory")
+            gc.collect()
+            with patch('server.session_service', session_service), patch('server.call_store', call_store):
+                asyncio.run(run_turns(concurrency, concurrency, f"{name}-warmup"))
+                elapsed = asyncio.run(run_turns(turns, concurrency, name))
+            print(f"{name:>10}: {turns / elapsed:8.0f} turns/s ({elapsed:.2f}s)", file=sys.__stdout__)
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    main(turns, concurrency)
@@ -0,0 +1,107 @@
+"""
+Prompt bytes per model call for three prompt layouts, over many short calls:
+
+  id-first      the old layout: "CURRENT USER ID: ..." at the top of every
+                system instruction, so no two callers share a prompt prefix;
+  static-first  system instructions and tools identical for every caller,
+                the caller's ID sent as the first message;
+  explicit      static-first, plus the instruction and tools served from a
+                cached content (PROMPT_CACHE_MODE=explicit).
+
+"Reusable" is the share of each request's bytes that repeats the start of an
+earlier request: what provider-side prefix caching can skip reprocessing.
+Runs the agent graph on the fake Gemini (benchmarks/fake_llm.py), which counts
+the bytes, with in-memory sessions and fakeredis.
+
+Run: python -m benchmarks.bench_prompt_cache [callers]
+"""
+import asyncio
+import os
+import sys
+from unittest.mock import patch
+
+from google.adk.runners import Runner
+from google.adk.sessions.in_memory_session_service import InMemorySessionService
+from google.genai.types import Content, Part
+from pydantic import PrivateAttr
+
+from agents.agent_factory import create_agent_graph, initial_session_state
+from agents.context_compactor import context_compactor
+from agents.prompt_cache import PromptCache, prefix_bytes
+from benchmarks.fake_llm import FakeGemini
+from benchmarks.load_calls import SCRIPTS, seed
+from services.database import AsyncRedisDatabase
+
+LAYOUTS = ("id-first", "static-first", "explicit")
+
+
+class PrefixRecordingGemini(FakeGemini):
+    """FakeGemini that also keeps what each request sent, to measure shared prefixes."""
+
+    _prompts: list = PrivateAttr(default_factory=list)
+
+    @property
+    def prompts(self) -> list:
+        return self._prompts
+
+    def _count_prompt(self, llm_request):
+        super()._count_prompt(llm_request)
+        self._prompts.append(prefix_bytes(llm_request.config) + b"".join(
+            c.model_dump_json(exclude_none=True).encode() for c in llm_request.contents or ()))
+
+
+def id_first(graph, user_id: str):
+    """Rebuilds the old layout on a graph: the ID at the top of each system instruction."""
+    for agent in [graph] + list(graph.sub_agents):
+        agent.instruction = f"CURRENT USER ID: {user_id}\n\n{agent.instruction}"
+        agent.before_model_callback = [context_compactor.before_model]
+    return graph
+
+
+def reusable_bytes(prompts: list) -> int:
+    """Bytes of each prompt that repeat the start of some earlier prompt."""
+    total = 0
+    for i, prompt in enumerate(prompts):
+        total += max((len(os.path.commonprefix([prompt, earlier])) for earlier in prompts[:i]), default=0)
+    return total
+
+
+async def run_callers(callers: int, layout: str) -> PrefixRecordingGemini:
+    import fakeredis
+    db = AsyncRedisDatabase(client=fakeredis.FakeAsyncRedis(decode_responses=True))
+    await seed(db, callers)
+
+    model = PrefixRecordingGemini(latency=0)
+    sessions = InMemorySessionService()
+    cache = PromptCache(mode="explicit" if layout == "explicit" else "off")
+    with patch('tools.async_tools.async_db', db), patch('benchmarks.fake_llm.prompt_cache', cache):
+        for i in range(callers):
+            user_id = f"+1555{i:07d}"
+            graph = create_agent_graph(user_id, model=model)
+            if layout == "id-first":
+                graph = id_first(graph, user_id)
+            runner = Runner(agent=graph, app_name="voice-agent", session_service=sessions)
+            session = await sessions.create_session(app_name="voice-agent", user_id=user_id,
+                                                    state=initial_session_state(user_id))
+            for utterance in SCRIPTS[i % len(SCRIPTS)][:-1]:  # leave out the goodbye
+                message = Content(role="user", parts=[Part(text=utterance)])
+                async for _ in runner.run_async(user_id=user_id, session_id=session.id, new_message=message):
+                    pass
+    return model
+
+
+def main(argv):
+    callers = int(argv[0]) if argv else 20
+    print(f"{callers} callers")
+    print(f"{'layout':>13} {'calls':>6} {'sent/call':>10} {'cached/call':>12} {'reusable':>9}")
+    for layout in LAYOUTS:
+        model = asyncio.run(run_callers(callers, layout))
+        sent = sum(s for s, _ in model.prompt_bytes)
+        cached = sum(c for _, c in model.prompt_bytes)
+        reusable = reusable_bytes(model.prompts) / max(1, sum(len(p) for p in model.prompts))
+        print(f"{layout:>13} {model.calls:>6} {sent / model.calls:>8.0f} B {cached / model.calls:>10.0f} B "
+              f"{reusable:>9.0%}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,61 @@
+"""
+Throughput of concurrent tool calls against a local Redis, sync vs async client.
+
+sync:  tools call RedisDatabase directly on the event loop (how ADK runs sync tools)
+async: tools await AsyncRedisDatabase and run concurrently
+
+Run: python seed_db.py && python -m benchmarks.bench_tool_throughput [calls] [concurrency]
+"""
+import asyncio
+import sys
+import time
+
+from services.database import db, async_db
+from tools import billing_tools, network_tools, async_tools
+
+USER_ID = "local_tester"
+
+
+async def run_sync(calls: int, concurrency: int) -> float:
+    async def caller(n):
+        for _ in range(n):
+            billing_tools.check_balance(USER_ID)
+            network_tools.check_outage(USER_ID)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(caller(calls // concurrency) for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def run_async(calls: int, concurrency: int) -> float:
+    async def caller(n):
+        for _ in range(n):
+            await async_tools.check_balance(USER_ID)
+            await async_tools.check_outage(USER_ID)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(caller(calls // concurrency) for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def main(calls: int, concurrency: int):
+    if db.client is None or not await async_db.ping():
+        sys.exit("Redis is not reachable (see REDIS_URL); start it and run seed_db.py first.")
+    if not db.get_user(USER_ID):
+        sys.exit(f"User {USER_ID} is missing; run seed_db.py first.")
+
+    # Warm up the async pool
+    await run_async(concurrency, concurrency)
+
+    for name, fn in (("sync", run_sync), ("async", run_async)):
+        elapsed = await fn(calls, concurrency)
+        # Each iteration is two tool calls (check_balance + check_outage)
+        print(f"{name:>6}: {2 * calls / elapsed:10.0f} tool calls/s ({elapsed:.2f}s)")
+
+    await async_db.close()
+
+
+if __name__ == "__main__":
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    asyncio.run(main(calls, concurrency))
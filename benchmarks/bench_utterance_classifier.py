@@ -0,0 +1,160 @@
+"""
+Utterance classification: accuracy on a labeled corpus and cost per
+utterance, for the old per-intent regexes (one search per intent, plus the
+goodbye normalization and checks) vs the compiled single-pass classifier
+(agents/utterance_classifier.py).
+
+The scaling table grows the intent count with synthetic phrase lists: the
+sequential cost grows with every intent, the compiled one stays close to flat.
+
+Run: python -m benchmarks.bench_utterance_classifier
+"""
+import random
+import re
+import string
+import timeit
+
+from agents.utterance_classifier import UtteranceClassifier, utterance_classifier
+
+# (utterance as speech-to-text delivers it, expected intent)
+CORPUS = (
+    ("Hi, I want to check my balance.", "billing"),
+    ("What is my current bill?", "billing"),
+    ("I'd like to pay 500 rupees", "billing"),
+    ("Can you tell me when my payment is due?", "billing"),
+    ("How much am I owing right now", "billing"),
+    ("Why does my plan cost so much", "billing"),
+    ("My internet is really slow today.", "network"),
+    ("The wifi keeps disconnecting every few minutes", "network"),
+    ("Is there an outage in my area?", "network"),
+    ("I can't connect to anything", "network"),
+    ("Everything has been down since morning", "network"),
+    ("I want to talk to a human", "human"),
+    ("Let me speak with an agent please.", "human"),
+    ("Escalate this, I've called three times already!", "human"),
+    ("Can I talk to a real person?", "human"),
+    ("Put an operator on the line", "human"),
+    ("Thanks, bye.", "goodbye"),
+    ("Thank you, goodbye!", "goodbye"),
+    ("Bye bye", "goodbye"),
+    ("Goodbye", "goodbye"),
+    ("Good bye.", "goodbye"),
+    ("See you", "goodbye"),
+    ("Talk to you later.", "goodbye"),
+    ("OK thanks bye", "goodbye"),
+    ("Cancel", "goodbye"),
+    ("hang up", "goodbye"),
+    ("Quit.", "goodbye"),
+    ("Yes", None),
+    ("No, that's all", None),
+    ("Hmm, I'm not sure", None),
+    ("Could you repeat that?", None),
+    ("Can you run a diagnostic on my router", None),
+)
+
+# --- The per-intent regexes server.py used before the classifier ---
+LEGACY_PATTERNS = {
+    "billing": re.compile(r"(balance|bill|pay|cost|owing|due)"),
+    "network": re.compile(r"(internet|slow|down|outage|wifi|connect)"),
+    "human": re.compile(r"(human|agent|operator|person|talk to|speak with|escalate)"),
+}
+
+
+def legacy_is_goodbye(text):
+    text = re.sub(r'[^\w\s]', '', text.lower()).strip()
+    if text in ["bye", "goodbye", "cancel", "end", "hang up", "exit", "quit", "thanks bye", "thank you bye"]:
+        return True
+    if re.search(r"^(goodbye|bye|bye\s+bye|see\s+you|talk\s+to\s+you\s+later)$", text):
+        return True
+    return bool(re.search(r"(thank\s+you|thanks)\s+(bye|goodbye)", text))
+
+
+def legacy_classify(text):
+    text = text.lower()
+    hits = {intent: len(pattern.findall(text)) for intent, pattern in LEGACY_PATTERNS.items()}
+    return max(hits, key=hits.get) if sum(hits.values()) else None
+
+
+def legacy_filler_intent(text):
+    text = text.lower()
+    for intent, pattern in LEGACY_PATTERNS.items():
+        if pattern.search(text):
+            return intent
+    return None
+
+
+def legacy_gather(text):
+    """What /gather_speech ran per utterance: goodbye check, intent, filler."""
+    if legacy_is_goodbye(text):
+        return "goodbye"
+    intent = legacy_classify(text)
+    legacy_filler_intent(text)
+    return intent
+
+
+def compiled_gather(text):
+    return utterance_classifier.classify(text).intent
+
+
+def accuracy(fn):
+    misses = [(text, expected, fn(text)) for text, expected in CORPUS if fn(text) != expected]
+    return 1 - len(misses) / len(CORPUS), misses
+
+
+def per_utterance_us(fn, texts, number=2000):
+    seconds = min(timeit.repeat(lambda: [fn(t) for t in texts], number=number, repeat=3))
+    return seconds / number / len(texts) * 1e6
+
+
+def synthetic_intents(count, phrases=8, seed=0):
+    rng = random.Random(seed)
+
+    def word():
+        return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9)))
+
+    return {
+        f"intent{i}": {"contains": [" ".join(word() for _ in range(rng.randint(1, 2))) for _ in range(phrases)]}
+        for i in range(count)
+    }
+
+
+def sequential(intents):
+    patterns = [
+        (name, re.compile("|".join(re.escape(p) for p in spec["contains"])))
+        for name, spec in intents.items()
+    ]
+
+    def classify(text):
+        text = text.lower()
+        hits = {name: len(pattern.findall(text)) for name, pattern in patterns}
+        return max(hits, key=hits.get) if sum(hits.values()) else None
+
+    return classify
+
+
+def main():
+    print("accuracy on the labeled corpus:")
+    for name, fn in (("legacy", legacy_gather), ("compiled", compiled_gather)):
+        score, misses = accuracy(fn)
+        print(f"{name:>9}: {score:6.1%}")
+        for text, expected, got in misses:
+            print(f"{'':>11}{text!r}: expected {expected}, got {got}")
+
+    texts = [text for text, _ in CORPUS]
+    print("\nper utterance (goodbye + intent + filler):")
+    legacy_us = per_utterance_us(legacy_gather, texts)
+    compiled_us = per_utterance_us(compiled_gather, texts)
+    print(f"   legacy: {legacy_us:6.2f} us")
+    print(f" compiled: {compiled_us:6.2f} us  ({legacy_us / compiled_us:.1f}x)")
+
+    print("\nscaling with intent count (8 phrases each):")
+    print(f"{'intents':>8} {'sequential':>12} {'compiled':>10}")
+    for count in (4, 16, 64, 256):
+        intents = synthetic_intents(count)
+        compiled = UtteranceClassifier(intents)
+        print(f"{count:>8} {per_utterance_us(sequential(intents), texts, 200):9.2f} us "
+              f"{per_utterance_us(compiled.classify, texts, 200):7.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Deterministic stand-in for Gemini, for offline load tests.
+
+It plays the agent graph the way the real model is prompted to:
+- the RootDispatcher transfers to the specialist for the caller's intent;
+- a specialist calls its tool for the caller;
+- after the tool responds, it answers from the tool result.
+Intents come from the keyword classifier, so a given utterance always takes
+the same path. Each call waits `latency` (+ up to `jitter`, seeded) seconds.
+
+It also counts the prompt bytes each call sends: system instruction, tools
+and contents, less whatever a (fake) cached content holds. Prompt caching
+goes through agents/prompt_cache.py as with the real model.
+"""
+import asyncio
+import random
+import re
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from pydantic import PrivateAttr
+
+from agents.intent_router import classify_intent, INTENT_AGENTS
+from agents.prompt_cache import prefix_bytes, prompt_cache
+
+# Tool a specialist calls for each intent
+INTENT_TOOLS = {
+    "billing": ("check_balance", {}),
+    "network": ("check_outage", {}),
+    "human": ("escalate_to_human", {"reason": "Caller asked for a human"}),
+}
+
+_USER_ID = re.compile(r"CURRENT USER ID: (\S+)")
+
+
+class FakeGemini(BaseLlm):
+    model: str = "fake-gemini"
+    latency: float = 0.2
+    jitter: float = 0.0
+    seed: int = 0
+
+    _rng: random.Random = PrivateAttr(default=None)
+    _calls: int = PrivateAttr(default=0)
+    _sent: list = PrivateAttr(default_factory=list)
+    _caches: dict = PrivateAttr(default_factory=dict)
+
+    @property
+    def calls(self) -> int:
+        return self._calls
+
+    @property
+    def prompt_bytes(self) -> list:
+        """(bytes sent, bytes served from a cached content) per call."""
+        return self._sent
+
+    async def create_cache(self, model: str, config: types.CreateCachedContentConfig) -> types.CachedContent:
+        name = f"cachedContents/fake-{len(self._caches)}"
+        self._caches[name] = len(prefix_bytes(config))
+        return types.CachedContent(name=name, model=model)
+
+    def _count_prompt(self, llm_request):
+        config = llm_request.config
+        sent = len(prefix_bytes(config)) + sum(
+            len(c.model_dump_json(exclude_none=True)) for c in llm_request.contents or ())
+        self._sent.append((sent, self._caches.get(config.cached_content, 0) if config else 0))
+
+    def _delay(self) -> float:
+        if self._rng is None:
+            self._rng = random.Random(self.seed)
+        return self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def _latest_turn(self, llm_request):
+        """(caller text, own tool response or None) for the turn being answered."""
+        for content in reversed(llm_request.contents or []):
+            parts = content.parts or []
+            for part in parts:
+                response = part.function_response
+                if response is not None and response.name in llm_request.tools_dict:
+                    return None, response
+            texts = [p.text for p in parts if p.text]
+            # Other agents' events are replayed as "For context:" user messages
+            if content.role == "user" and texts and texts[0] != "For context:":
+                return " ".join(texts), None
+        return "", None
+
+    def _respond(self, llm_request) -> types.Part:
+        text, tool_response = self._latest_turn(llm_request)
+        if tool_response is not None:
+            result = tool_response.response or {}
+            if "result" in result and isinstance(result["result"], dict):
+                result = result["result"]
+            if result.get("message"):
+                return types.Part(text=str(result["message"]))
+            details = ", ".join(f"{k.replace('_', ' ')} {v}" for k, v in result.items() if k != "status")
+            return types.Part(text=f"Here is what I found: {details}.")
+
+        intent, _ = classify_intent(text)
+        if intent is None:
+            return types.Part(text="I can help with billing, internet problems or a human agent. What do you need?")
+
+        tool, args = INTENT_TOOLS[intent]
+        if tool in llm_request.tools_dict:
+            # The caller context message, or the system instruction of an older prompt layout
+            prompt = [str(llm_request.config.system_instruction or "")] if llm_request.config else []
+            prompt += [p.text for c in llm_request.contents or () for p in c.parts or () if p.text]
+            match = _USER_ID.search("\n".join(prompt))
+            return types.Part(function_call=types.FunctionCall(
+                name=tool, args={"user_id": match.group(1) if match else "", **args}))
+        if "transfer_to_agent" in llm_request.tools_dict:
+            return types.Part(function_call=types.FunctionCall(
+                name="transfer_to_agent", args={"agent_name": INTENT_AGENTS[intent]}))
+        return types.Part(text="Let me connect you with the right team.")
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        self._calls += 1
+        llm_request = await prompt_cache.apply(llm_request, "fake", self.model, self.create_cache)
+        self._count_prompt(llm_request)
+        await asyncio.sleep(self._delay())
+        part = self._respond(llm_request)
+
+        if stream and part.text:
+            # Like SSE: partial chunks, then the aggregated response
+            words = part.text.split(" ")
+            for i in range(0, len(words), 4):
+                chunk = " ".join(words[i:i + 4]) + (" " if i + 4 < len(words) else "")
+                yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=chunk)]), partial=True)
+                await asyncio.sleep(0)
+
+        yield LlmResponse(content=types.Content(role="model", parts=[part]), turn_complete=True)
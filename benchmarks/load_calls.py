@@ -0,0 +1,258 @@
+"""
+Offline load test: many simulated callers run scripted multi-turn dialogs
+through /voice -> /gather_speech -> /process_speech (-> /await_result), the
+way Twilio drives the webhooks, against the in-process app.
+
+The agent graph runs on a deterministic fake Gemini (benchmarks/fake_llm.py)
+with configurable latency; Redis is fakeredis unless --redis is given; in
+"update" handoff mode live-call updates land in an in-process fake Twilio
+REST sink. Nothing leaves the machine.
+
+Reports throughput, time to first audio (the first <Say> after the caller
+stops speaking, usually the filler) and time to the agent's reply, with
+p50/p95/p99, plus shed turns and errors.
+
+Run: python -m benchmarks.load_calls [callers] [--latency=0.3] [--ramp=5]
+     [--think=0.5] [--handoff=await|update] [--redis]
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+from collections import Counter, defaultdict
+from urllib.parse import parse_qs
+from unittest.mock import patch
+
+import httpx
+
+# Importing server sets up logging; keep this run from writing a log file into the tree
+os.environ.setdefault("LOG_FILE", "")
+import server  # noqa: E402
+from agents.agent_factory import USER_ID_TEMPLATE, create_agent_graph
+from benchmarks.fake_llm import FakeGemini
+from services.database import AsyncRedisDatabase
+from services.session_store import RedisCallStore, RedisSessionService
+
+TENANT = "+15550001000"
+
+# Scripted dialogs; caller i runs SCRIPTS[i % len(SCRIPTS)]
+SCRIPTS = (
+    ("What is my balance", "Thanks, goodbye"),
+    ("My internet is down", "Is there an outage in my area", "bye"),
+    ("I want to talk to a human agent", "goodbye"),
+    ("How much is my bill due", "Is the internet down near me", "thank you bye"),
+)
+
+ERROR_REPLIES = ("I'm sorry, I encountered an error", "I lost your connection", "taking longer than expected")
+
+
+class FakeTwilioSink:
+    """Stands in for the Calls API: records each TwiML update and wakes that call's caller."""
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.updates = Counter()
+        self._waiters = defaultdict(asyncio.Queue)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(self.latency)
+        call_sid = request.url.path.rsplit("/", 1)[-1].removesuffix(".json")
+        twiml = parse_qs(request.content.decode("utf-8"))["Twiml"][0]
+        self.updates[call_sid] += 1
+        self._waiters[call_sid].put_nowait(twiml)
+        return httpx.Response(200, json={"sid": call_sid, "status": "in-progress"})
+
+    async def next_update(self, call_sid: str) -> str:
+        return await self._waiters[call_sid].get()
+
+
+class TwiML:
+    def __init__(self, xml: str):
+        root = ET.fromstring(xml)
+        self.says = [el.text or "" for el in root.iter("Say")]
+        gather = root.find(".//Gather")
+        self.gather_action = gather.get("action") if gather is not None else None
+        redirect = root.find("Redirect")
+        self.redirect = redirect.text if redirect is not None else None
+        self.hangup = root.find("Hangup") is not None
+
+
+class LoadStats:
+    def __init__(self):
+        self.first_audio = []
+        self.reply = []
+        self.counts = Counter()
+
+    @staticmethod
+    def percentiles(values) -> str:
+        if not values:
+            return "n/a"
+        values = sorted(values)
+
+        def pct(p):
+            return values[min(len(values) - 1, int(p / 100 * len(values)))] * 1000
+
+        return f"p50 {pct(50):7.0f} ms  p95 {pct(95):7.0f} ms  p99 {pct(99):7.0f} ms"
+
+
+class Caller:
+    def __init__(self, client: httpx.AsyncClient, sink: FakeTwilioSink, caller_id: int, stats: LoadStats,
+                 think: float):
+        self.client = client
+        self.sink = sink
+        self.stats = stats
+        self.think = think
+        self.form = {"From": f"+1555{caller_id:07d}", "CallSid": f"CAload{caller_id:08d}", "To": TENANT}
+        self.script = SCRIPTS[caller_id % len(SCRIPTS)]
+
+    async def post(self, url: str, **extra) -> TwiML:
+        response = await self.client.post(url, data={**self.form, **extra})
+        response.raise_for_status()
+        return TwiML(response.text)
+
+    async def follow(self, url: str) -> TwiML:
+        """Follows a <Redirect>; in "update" mode a pushed TwiML update wins the race."""
+        fetch = asyncio.ensure_future(self.post(url))
+        update = asyncio.ensure_future(self.sink.next_update(self.form["CallSid"]))
+        done, _ = await asyncio.wait((fetch, update), return_when=asyncio.FIRST_COMPLETED)
+        for task in (fetch, update):
+            if task not in done:
+                task.cancel()
+        return TwiML(update.result()) if update in done else fetch.result()
+
+    async def turn(self, utterance: str) -> bool:
+        """One caller utterance. Returns False once the call is over."""
+        started = time.perf_counter()
+        doc = await self.post("/gather_speech", SpeechResult=utterance)
+        first_audio = None
+        while True:
+            if doc.says and first_audio is None:
+                first_audio = time.perf_counter() - started
+            if doc.hangup and doc.gather_action is None:
+                self.stats.counts["goodbyes"] += 1
+                return False
+            if doc.gather_action and doc.gather_action.endswith("/callback_offer"):
+                self.stats.counts["shed"] += 1
+                await self.post("/callback_offer", SpeechResult="no")
+                return False
+            if doc.gather_action or doc.redirect is None:
+                break
+            doc = await self.follow(doc.redirect)
+
+        reply = " ".join(doc.says)
+        if any(marker in reply for marker in ERROR_REPLIES):
+            self.stats.counts["error_replies"] += 1
+        self.stats.first_audio.append(first_audio)
+        self.stats.reply.append(time.perf_counter() - started)
+        self.stats.counts["turns"] += 1
+        return True
+
+    async def run(self, start_delay: float):
+        await asyncio.sleep(start_delay)
+        try:
+            await self.post("/voice")
+            for utterance in self.script:
+                await asyncio.sleep(self.think)
+                if not await self.turn(utterance):
+                    break
+            self.stats.counts["calls"] += 1
+        except (httpx.HTTPError, ET.ParseError) as e:
+            self.stats.counts["failed_calls"] += 1
+            logging.getLogger("LoadTest").warning(f"Call {self.form['CallSid']} failed: {e}")
+
+
+async def seed(db: AsyncRedisDatabase, callers: int):
+    for i in range(callers):
+        await db.client.hset(f"user:+1555{i:07d}", mapping={
+            "name": f"Load Caller {i}", "balance": "1245.0",
+            "region": "India-West" if i % 2 else "India-South", "router_id": "CISCO-X99",
+        })
+    await db.set_network_status("India-West", "Operational")
+    await db.set_network_status("India-South", "Outage Detected")
+
+
+async def run_load(callers: int = 100, latency: float = 0.3, jitter: float = 0.1, ramp: float = 5.0,
+                   think: float = 0.5, handoff: str = "await", use_redis: bool = False) -> LoadStats:
+    if use_redis:
+        db = AsyncRedisDatabase()
+        if not await db.ping():
+            sys.exit("Redis is not reachable (see REDIS_URL).")
+    else:
+        import fakeredis
+        db = AsyncRedisDatabase(client=fakeredis.FakeAsyncRedis(decode_responses=True))
+    await seed(db, callers)
+
+    model = FakeGemini(latency=latency, jitter=jitter)
+    graph = create_agent_graph(USER_ID_TEMPLATE, model=model)
+    sink = FakeTwilioSink()
+    twilio_http = httpx.AsyncClient(transport=httpx.MockTransport(sink.handle), base_url="https://api.twilio.test")
+    stats = LoadStats()
+
+    with patch('server.get_agent_graph', lambda: graph), \
+         patch('server.session_service', RedisSessionService(db.client)), \
+         patch('server.call_store', RedisCallStore(db.client)), \
+         patch('server.RESULT_HANDOFF_MODE', handoff), \
+         patch('tools.async_tools.async_db', db), \
+         patch('services.prefetch.async_db', db), \
+         patch.object(server.twilio_updater, "account_sid", "ACload" if handoff == "update" else None), \
+         patch.object(server.twilio_updater, "auth_token", "load" if handoff == "update" else None), \
+         patch.object(server.twilio_updater, "_http", lambda: twilio_http):
+        server.runner_pool.clear()
+        for pool in server.specialist_runner_pools.values():
+            pool.clear()
+
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load", limits=limits,
+                                     timeout=120) as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(
+                Caller(client, sink, i, stats, think).run(ramp * i / max(1, callers))
+                for i in range(callers)
+            ))
+            stats.elapsed = time.perf_counter() - start
+
+        server.runner_pool.clear()
+        for pool in server.specialist_runner_pools.values():
+            pool.clear()
+
+    await twilio_http.aclose()
+    stats.llm_calls = model.calls
+    stats.twilio_updates = sum(sink.updates.values())
+    return stats
+
+
+def report(stats: LoadStats, callers: int):
+    c = stats.counts
+    print(f"callers: {callers}  completed calls: {c['calls']}  failed calls: {c['failed_calls']}  "
+          f"elapsed: {stats.elapsed:.1f}s")
+    print(f"throughput: {c['turns'] / stats.elapsed:.1f} turns/s, {c['calls'] / stats.elapsed:.1f} calls/s")
+    print(f"turns: {c['turns']}  shed: {c['shed']}  error replies: {c['error_replies']}  "
+          f"goodbyes: {c['goodbyes']}")
+    print(f"first audio: {LoadStats.percentiles(stats.first_audio)}")
+    print(f"reply:       {LoadStats.percentiles(stats.reply)}")
+    print(f"fake LLM calls: {stats.llm_calls}  Twilio updates: {stats.twilio_updates}")
+
+
+def main(argv):
+    args = [a for a in argv if not a.startswith("--")]
+    options = dict(a[2:].split("=", 1) for a in argv if a.startswith("--") and "=" in a)
+    callers = int(args[0]) if args else 100
+    # The server logs every turn (and every shed); keep the console for the report
+    logging.getLogger().setLevel(logging.ERROR)
+    stats = asyncio.run(run_load(
+        callers=callers,
+        latency=float(options.get("latency", 0.3)),
+        jitter=float(options.get("jitter", 0.1)),
+        ramp=float(options.get("ramp", 5)),
+        think=float(options.get("think", 0.5)),
+        handoff=options.get("handoff", "await"),
+        use_redis="--redis" in argv,
+    ))
+    report(stats, callers)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
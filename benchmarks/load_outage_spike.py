@@ -0,0 +1,97 @@
+"""
+Outage-spike load test: thousands of callers from one region run check_outage
+at once, while the region's status flips mid-spike.
+
+Reports Redis reads of network:{region}, throughput, and how many callers
+after the flip were still told the old status (freshness).
+
+Runs offline on fakeredis by default; pass --redis to use REDIS_URL.
+Run: python -m benchmarks.load_outage_spike [callers] [--redis]
+"""
+import asyncio
+import sys
+import time
+from unittest.mock import patch
+
+from services.database import AsyncRedisDatabase
+from services.network_cache import NetworkStatusCache, NETWORK_STATUS_CHANNEL, encode_status_update
+from tools import async_tools
+
+REGION = "Bench-Outage-Region"
+
+
+class NoCache:
+    """Pre-cache behaviour: every caller reads Redis."""
+
+    async def aget_or_load(self, region, loader):
+        return await loader()
+
+    def put(self, region, status):
+        pass
+
+
+async def spike(db, callers: int, status_cache):
+    network_reads = 0
+    original_get = db.client.get
+
+    async def counting_get(key, *args, **kwargs):
+        nonlocal network_reads
+        if key.startswith("network:"):
+            network_reads += 1
+        return await original_get(key, *args, **kwargs)
+
+    await db.set_network_status(REGION, "Outage Detected")
+    for i in range(callers):
+        await db.client.hset(f"user:bench-{i}", mapping={"region": REGION, "router_id": "R"})
+
+    with patch.object(db.client, "get", counting_get), \
+         patch('services.database.network_cache', status_cache), \
+         patch('tools.async_tools.async_db', db):
+        status_cache.put(REGION, "Outage Detected")
+        start = time.perf_counter()
+        first_half = [async_tools.check_outage(f"bench-{i}") for i in range(callers // 2)]
+        await asyncio.gather(*first_half)
+
+        # The outage is resolved mid-spike, by another server process
+        await db.client.set(f"network:{REGION}", "Operational")
+        await db.client.publish(NETWORK_STATUS_CHANNEL, encode_status_update(REGION, "Operational"))
+        await asyncio.sleep(0.01)  # let the pub/sub update land
+        second_half = [async_tools.check_outage(f"bench-{i}") for i in range(callers // 2, callers)]
+        results = await asyncio.gather(*second_half)
+        elapsed = time.perf_counter() - start
+
+    stale = sum(1 for r in results if r["status"] == "outage_confirmed")
+    return network_reads, callers / elapsed, stale
+
+
+async def main(callers: int, use_redis: bool):
+    if use_redis:
+        db = AsyncRedisDatabase()
+        if not await db.ping():
+            sys.exit("Redis is not reachable (see REDIS_URL).")
+        listener_client = db.client
+    else:
+        import fakeredis
+        server = fakeredis.FakeServer()
+        db = AsyncRedisDatabase(client=fakeredis.FakeAsyncRedis(
+            server=server, decode_responses=True, max_connections=callers * 2
+        ))
+        listener_client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+
+    cached = NetworkStatusCache(ttl=60)
+    listener = asyncio.create_task(cached.listen(listener_client))
+    await asyncio.sleep(0.05)
+
+    for name, status_cache in (("no cache", NoCache()), ("cache", cached)):
+        reads, rate, stale = await spike(db, callers, status_cache)
+        print(f"{name:>8}: {reads:6d} network reads, {rate:8.0f} callers/s, "
+              f"{stale} stale answers after the flip")
+
+    listener.cancel()
+    await db.client.delete(f"network:{REGION}", *[f"user:bench-{i}" for i in range(callers)])
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    callers = int(args[0]) if args else 2000
+    asyncio.run(main(callers, "--redis" in sys.argv))
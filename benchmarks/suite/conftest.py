@@ -0,0 +1,50 @@
+import asyncio
+import os
+
+import pytest
+
+# Importing server sets up logging and tracing; keep benchmark runs from writing files into the tree
+os.environ["LOG_FILE"] = ""
+os.environ["TRACE_EXPORT_PATH"] = ""
+
+pytest.importorskip("pytest_benchmark")
+
+# What callers actually say (speech-to-text output, punctuation and all)
+UTTERANCES = (
+    "Hi, I want to check my balance.",
+    "What is my current bill?",
+    "How much do I owe this month",
+    "I'd like to pay 500 rupees",
+    "Can you tell me when my payment is due?",
+    "My internet is really slow today.",
+    "The wifi keeps disconnecting every few minutes",
+    "Is there an outage in my area?",
+    "I can't connect to anything, is the network down?",
+    "Can you run a diagnostic on my router",
+    "I want to talk to a human",
+    "Let me speak with an agent please.",
+    "Escalate this, I've called three times already!",
+    "Can I talk to a real person?",
+    "Yes",
+    "No, that's all",
+    "Hmm, I'm not sure",
+    "Could you repeat that?",
+    "My name is Lucifer and I have a question about my account and my internet both",
+    "Thanks, bye.",
+    "Thank you, goodbye!",
+    "Bye bye",
+    "Goodbye",
+    "See you",
+    "Talk to you later.",
+    "OK thanks bye",
+    "Cancel",
+    "hang up",
+)
+
+
+@pytest.fixture(scope="module")
+def loop():
+    """One event loop per module, so rounds do not pay for loop setup."""
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
@@ -0,0 +1,56 @@
+import itertools
+from unittest.mock import patch
+
+import pytest
+
+import server
+from agents.agent_factory import USER_ID_TEMPLATE, create_agent_graph
+from benchmarks.fake_llm import FakeGemini
+from services.session_store import create_session_backend
+
+
+def test_create_agent_graph(benchmark):
+    root = benchmark(create_agent_graph, "+911234567890")
+    assert len(root.sub_agents) == 3
+
+
+@pytest.fixture
+def mocked_turn_env():
+    """Real graph, Runner and tools on a zero-latency fake model, fakeredis and in-memory sessions."""
+    fakeredis = pytest.importorskip("fakeredis")
+    from services.database import AsyncRedisDatabase
+    db = AsyncRedisDatabase(client=fakeredis.FakeAsyncRedis(decode_responses=True))
+    model = FakeGemini(latency=0)
+    graph = create_agent_graph(USER_ID_TEMPLATE, model=model)
+    session_service, call_store = create_session_backend("memory")
+    with patch('server.get_agent_graph', lambda: graph), \
+         patch('server.session_service', session_service), \
+         patch('server.call_store', call_store), \
+         patch('tools.async_tools.async_db', db), \
+         patch('services.prefetch.async_db', db):
+        server.runner_pool.clear()
+        for pool in server.specialist_runner_pools.values():
+            pool.clear()
+        yield db, model
+        server.runner_pool.clear()
+        for pool in server.specialist_runner_pools.values():
+            pool.clear()
+
+
+def test_mocked_turn(benchmark, loop, mocked_turn_env):
+    db, model = mocked_turn_env
+    callers = itertools.count()
+
+    def new_caller():
+        # A fresh caller per round keeps the session history (and the turn's cost) constant
+        user_id = f"+1555{next(callers):07d}"
+        loop.run_until_complete(db.client.hset(f"user:{user_id}", mapping={"balance": "1245.0"}))
+        return (user_id,), {}
+
+    def turn(user_id):
+        return loop.run_until_complete(server.get_agent_response(user_id, "What is my balance", f"CA{user_id}"))
+
+    reply = benchmark.pedantic(turn, setup=new_caller, rounds=200, warmup_rounds=5)
+    assert "1245" in reply
+    # Fast path to BillingAgent: the tool call, then the answer
+    assert model.calls == 2 * 205
@@ -0,0 +1,64 @@
+import itertools
+
+import pytest
+
+from services.database import RedisDatabase
+
+USER_ID = "bench-user"
+
+
+@pytest.fixture(scope="module")
+def db():
+    db = RedisDatabase()
+    if db.client is None:
+        pytest.skip("Redis is not reachable (see REDIS_URL)")
+    db.save_user(USER_ID, {"name": "Bench User", "balance": 10 ** 9, "region": "Bench-Region", "router_id": "R"})
+    db.set_network_status("Bench-Region", "Operational")
+    yield db
+    tickets = db.client.lrange(f"tickets:user:{USER_ID}", 0, -1)
+    for ticket_id in tickets:
+        db.client.lrem("tickets:open", 0, ticket_id)
+    db.client.delete(f"user:{USER_ID}", "network:Bench-Region", "payment:idem:bench-replay",
+                     f"tickets:user:{USER_ID}", *(f"ticket:{t}" for t in tickets))
+
+
+def test_get_user(benchmark, db):
+    assert benchmark(db.get_user, USER_ID)["name"] == "Bench User"
+
+
+def test_get_user_fields(benchmark, db):
+    assert benchmark(db.get_user, USER_ID, ("region",)) == {"region": "Bench-Region"}
+
+
+def test_update_balance(benchmark, db):
+    assert benchmark(db.update_balance, USER_ID, 0.01) is not None
+
+
+def test_update_balance_idempotent_replay(benchmark, db):
+    db.update_balance(USER_ID, 0.01, idempotency_key="bench-replay")
+    assert benchmark(db.update_balance, USER_ID, 0.01, idempotency_key="bench-replay") is not None
+
+
+def test_get_network_status(benchmark, db):
+    # Served by the process-wide status cache after the first read
+    assert benchmark(db.get_network_status, "Bench-Region") == "Operational"
+
+
+def test_get_network_status_uncached(benchmark, db):
+    assert benchmark(db.client.get, "network:Bench-Region") == "Operational"
+
+
+def test_next_ticket_seq(benchmark, db):
+    assert benchmark(db.next_ticket_seq) > 0
+
+
+def test_create_ticket(benchmark, db):
+    ids = itertools.count()
+
+    def create():
+        ticket_id = f"TKT-BENCH-{next(ids)}"
+        db.create_ticket(USER_ID, "Benchmark", ticket_id)
+        return ticket_id
+
+    ticket_id = benchmark(create)
+    assert db.client.exists(f"ticket:{ticket_id}")
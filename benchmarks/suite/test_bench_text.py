@@ -0,0 +1,12 @@
+from conftest import UTTERANCES
+from server import get_filler_message, is_goodbye
+
+
+def test_is_goodbye_corpus(benchmark):
+    hangups = benchmark(lambda: [u for u in UTTERANCES if is_goodbye(u)])
+    assert len(hangups) == 9
+
+
+def test_filler_message_corpus(benchmark):
+    fillers = benchmark(lambda: [get_filler_message(u) for u in UTTERANCES])
+    assert len(fillers) == len(UTTERANCES)
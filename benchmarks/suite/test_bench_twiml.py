@@ -0,0 +1,55 @@
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+import server
+from services.session_store import create_session_backend
+
+FORM = {"From": "+911234567890", "CallSid": "CAbench", "To": "+15550001000"}
+
+
+@pytest.fixture
+def client(loop):
+    session_service, call_store = create_session_backend("memory")
+    transport = httpx.ASGITransport(app=server.app)
+    client = httpx.AsyncClient(transport=transport, base_url="http://bench")
+    with patch('server.call_store', call_store), patch('server.SPECULATIVE_PREFETCH', False):
+        yield client, call_store
+    loop.run_until_complete(client.aclose())
+
+
+@pytest.mark.parametrize("path, extra", [
+    ("/voice", {}),
+    ("/gather_speech", {"SpeechResult": "What is my balance"}),
+    ("/gather_speech", {"SpeechResult": "Thanks, bye."}),
+    ("/gather_speech", {}),
+    ("/callback_offer", {"SpeechResult": "no thanks"}),
+], ids=["voice", "gather_filler", "gather_goodbye", "gather_silence", "callback_declined"])
+def test_endpoint_twiml(benchmark, loop, client, path, extra):
+    http, _ = client
+
+    def render():
+        return loop.run_until_complete(http.post(path, data={**FORM, **extra}))
+
+    response = benchmark(render)
+    assert response.status_code == 200
+    assert response.text.startswith("<?xml")
+
+
+def test_await_result_twiml(benchmark, loop, client):
+    http, call_store = client
+
+    def publish():
+        loop.run_until_complete(call_store.publish_result("turn-bench", "Your balance is 1245 rupees."))
+        return (), {}
+
+    def render():
+        return loop.run_until_complete(http.post("/await_result?turn=turn-bench&started=9999999999", data=FORM))
+
+    response = benchmark.pedantic(render, setup=publish, rounds=500)
+    assert "Your balance is 1245 rupees." in response.text
+
+
+def test_shed_response_twiml(benchmark):
+    assert "callback_offer" in benchmark(lambda: str(server.shed_response()))
@@ -0,0 +1,13 @@
+from services.database import db
+
+def migrate():
+    print("Migrating user profiles from JSON blobs to hashes...")
+    if not db.client:
+        print("Redis is not reachable, nothing migrated.")
+        return
+
+    migrated = db.migrate_user_profiles()
+    print(f"Migrated {migrated} profile(s).")
+
+if __name__ == "__main__":
+    migrate()
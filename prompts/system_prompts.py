@@ -44,7 +44,8 @@ DO NOT ask the user for their User ID if it is provided in the message.
 
 TOOLS:
 - check_balance(user_id): Returns current balance.
-- process_payment(user_id, amount): Processes a payment.
+- process_payment(user_id, amount): Processes a payment. "duplicate": true means the
+  payment was already made (same transaction_id); don't report it as a second one.
 
 Ensure clarity and accuracy.
 """
@@ -13,15 +13,13 @@ def seed():
         "region": "India-West",
         "router_id": "CISCO-X99"
     }
-    db.client.set(f"user:{user_id}", str(user_data).replace("'", '"')) # Simple JSON hack or import json
-    # Better: use json
-    import json
-    db.client.set(f"user:{user_id}", json.dumps(user_data))
+    # Profiles are stored as hashes (see RedisDatabase.save_user)
+    db.save_user(user_id, user_data)
     print(f"User {user_id} seeded.")
     
     # 2. Seed Local Tester
     user_id_local = "local_tester"
-    db.client.set(f"user:{user_id_local}", json.dumps(user_data))
+    db.save_user(user_id_local, user_data)
     print(f"User {user_id_local} seeded.")
 
     # 3. Network Status
@@ -1,27 +1,47 @@
+import asyncio
 import logging
 import sys
+import hashlib
 import uuid
 import os
 import re
+import time
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request, Form, BackgroundTasks
+from fastapi import FastAPI, Request, Form, WebSocket, WebSocketDisconnect
 from fastapi.responses import Response, PlainTextResponse
-from twilio.twiml.voice_response import VoiceResponse, Gather, Play
-from twilio.rest import Client
+from twilio.twiml.voice_response import VoiceResponse, Gather, Play, Connect
 
 # ADK Imports
 try:
     from agents.root_agent import root_agent
-    from google.adk.sessions.in_memory_session_service import InMemorySessionService
-    from agents.agent_factory import create_agent_graph
-    from google.adk.sessions.in_memory_session_service import InMemorySessionService
+    from agents.agent_factory import get_agent_graph, initial_session_state, RunnerPool, RoutedRunner
+    from agents.intent_router import intent_router, classify_intent, INTENT_AGENTS
+    from agents.utterance_classifier import utterance_classifier
+    from services.prefetch import prefetcher, SPECULATIVE_PREFETCH
+    from services.session_store import create_session_backend, SESSION_BACKEND
+    from utils.context import set_turn_context, set_call_cache
+    from services.call_cache import call_caches, CACHE_STATS
+    from services.database import async_db
+    from services.network_cache import network_cache
+    from services.response_stream import SentenceChunker
+    from services.twilio_updater import twilio_updater, TwilioUpdateError
+    from services.key_scheduler import key_scheduler
+    from services.admission import admission, AdmissionRejected
+    from services.tracing import tracer
+    from services.log_pipeline import setup_logging, VERBOSE
+    from services.metrics import metrics, TURN_DURATION, GOODBYE_FAST_PATH, BACKGROUND_TURNS
+    from services.database import REDIS_CLIENT_MODE
+    from tools.escalation_tools import escalate_to_human
+    from tools.async_tools import escalate_to_human as async_escalate_to_human
     from google.adk.agents.invocation_context import InvocationContext
-    from google.adk.agents.run_config import RunConfig
+    from google.adk.agents.run_config import RunConfig, StreamingMode
     from google.adk.runners import Runner
     
     # GenAI Types
     from google.genai.types import Content, Part
     from google.adk.models.google_llm import Gemini
+    from services.agent_executor import agent_executor, AgentExecutorBusy, check_backends
     
     # Load keys
     from dotenv import load_dotenv
@@ -36,95 +56,142 @@ except ImportError as e:
 if sys.platform == "win32":
     sys.stdout.reconfigure(encoding='utf-8')
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler("server.log")
-    ]
-)
+# Records are queued and written in batches by a background thread
+# (JSON lines, rotated server.log, per-turn lines sampled per call; see LOG_* settings)
+log_pipeline = setup_logging()
 logger = logging.getLogger("VoiceServer")
 
-app = FastAPI(title="ADK Voice Agent")
-
-# --- Twilio Client Setup (For Async Updates) ---
-TWILIO_ACCOUNT_SID = os.environ.get("TWILIO_ACCOUNT_SID")
-TWILIO_AUTH_TOKEN = os.environ.get("TWILIO_AUTH_TOKEN")
-twilio_client = None
-
-if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN:
-    try:
-        twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-        logger.info("Twilio Client initialized.")
-    except Exception as e:
-        logger.error(f"Failed to init Twilio Client: {e}")
-
-# --- API Key Rotation Setup ---
-# Expects CSV string: "key1,key2,key3"
-API_KEYS_STR = os.environ.get("GOOGLE_API_KEYS", "")
-API_KEYS = [k.strip() for k in API_KEYS_STR.split(",") if k.strip()]
-if not API_KEYS and os.environ.get("GOOGLE_API_KEY"):
-    API_KEYS.append(os.environ["GOOGLE_API_KEY"])
-
-import random
-
-def rotate_api_key():
-    """Selects a random API key from the available pool and sets it in env."""
-    if API_KEYS:
-        selected_key = random.choice(API_KEYS)
-        # Set into environment so Gemini / GoogleGenAI client picks it up
-        os.environ["GOOGLE_API_KEY"] = selected_key
-        logger.info(f"Rotated API Key: ...{selected_key[-4:]}")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Keep the process-wide network status cache in sync across servers
+    listener = None
+    if await async_db.ping():
+        listener = asyncio.create_task(network_cache.listen(async_db.client))
     else:
-        logger.warning("No API Keys configured for rotation.")
+        logger.warning("Redis unreachable; network status cache runs on TTL only.")
+    yield
+    if listener:
+        listener.cancel()
+    await twilio_updater.close()
+    tracer.flush()
+
+app = FastAPI(title="ADK Voice Agent", lifespan=lifespan)
+
+# --- Twilio REST Updates (For Async Updates) ---
+# Pooled, non-blocking calls().update with retries (see services/twilio_updater.py)
+if twilio_updater.enabled:
+    logger.info("Twilio call updater initialized.")
+
+# --- Voice Transport ---
+# "gather": <Gather> speech + filler/redirect loop, one <Say> per reply
+# "relay":  one ConversationRelay WebSocket per call (/media), replies streamed sentence by sentence with barge-in
+VOICE_TRANSPORT = os.environ.get("VOICE_TRANSPORT", "gather").lower()
+
+# --- Async Result Handoff ---
+# Async turns publish their reply to the call store; the call waits on /await_result.
+# "await":  the /await_result long-poll loop alone delivers the reply
+# "update": push the reply via the Twilio REST API first (needs credentials),
+#           falling back to the loop if the push fails
+RESULT_HANDOFF_MODE = os.environ.get("RESULT_HANDOFF_MODE", "await").lower()
+# Longest single wait inside /await_result (keep well under Twilio's 15s webhook timeout)
+RESULT_POLL_SECONDS = float(os.environ.get("RESULT_POLL_SECONDS", "8"))
+# Give up on the turn this long after /process_speech and ask the caller to repeat
+RESULT_DEADLINE_SECONDS = float(os.environ.get("RESULT_DEADLINE_SECONDS", "45"))
+
+# --- Gemini API Keys ---
+# Each model call leases a key (token bucket + 429 cooldown, see services/key_scheduler.py)
+if len(key_scheduler):
+    logger.info(f"API key scheduler managing {len(key_scheduler)} key(s).")
+else:
+    logger.warning("No API Keys configured; model clients fall back to the environment.")
+
+# Fail fast on an execution mode the Redis client can't serve (see AGENT_EXECUTION_MODE)
+check_backends(agent_executor.mode, REDIS_CLIENT_MODE, SESSION_BACKEND)
+
+# Initialize Session Service + Call Store (see SESSION_BACKEND)
+# "memory" is suitable for local dev/testing; "redis" lets several workers share calls.
+# call_store holds PhoneNumber -> SessionID and the input stash for the redirect loop.
+session_service, call_store = create_session_backend()
+
+# Reusable Runners bound to the process-wide template Agent Graph
+runner_pool = RunnerPool(lambda: Runner(
+    agent=get_agent_graph(),
+    app_name="voice-agent",
+    session_service=session_service
+))
+
+def _specialist_runner_pool(agent_name: str) -> RunnerPool:
+    # Whole-graph Runner that starts at a specialist: skips the RootDispatcher LLM hop
+    return RunnerPool(lambda: RoutedRunner(
+        agent=get_agent_graph(),
+        start_agent=agent_name,
+        app_name="voice-agent",
+        session_service=session_service
+    ))
+
+# Fast-path Runners per specialist agent (see agents/intent_router.py)
+specialist_runner_pools = {name: _specialist_runner_pool(name) for name in INTENT_AGENTS.values()}
+
+# --- Scrape-time gauges for /metrics (hot-path counters live in services/metrics.py) ---
+def _per_key(field: str):
+    return lambda: {key: int(state[field]) for key, state in key_scheduler.metrics()["keys"].items()}
+
+metrics.callback("voice_sessions", "Calls with a live session", "gauge", call_store.count_sessions)
+metrics.callback("voice_pending_inputs", "Utterances stashed for /process_speech", "gauge", call_store.count_pending)
+metrics.callback("voice_admission_active", "Agent turns holding an admission slot", "gauge",
+                 lambda: admission.active)
+metrics.callback("voice_admission_queue_depth", "Agent turns waiting for an admission slot", "gauge",
+                 lambda: admission.metrics()["queue_depth"])
+metrics.callback("voice_admission_shed_total", "Agent turns shed", "counter",
+                 lambda: {r: admission.stats[f"shed_{r}"] for r in ("queue_full", "timeout")}, labelname="reason")
+metrics.callback("voice_api_key_requests_total", "Model calls per API key", "counter",
+                 _per_key("requests"), labelname="key")
+metrics.callback("voice_api_key_rate_limited_total", "429s per API key", "counter",
+                 _per_key("rate_limited"), labelname="key")
+metrics.callback("voice_api_key_cooling_down", "1 while the key is on 429 cooldown", "gauge",
+                 _per_key("cooling_down"), labelname="key")
+metrics.callback("voice_log_records_dropped_total", "Log records dropped because the log queue was full", "counter",
+                 lambda: log_pipeline.handler.dropped)
+metrics.callback("voice_api_key_waits_total", "Model calls that waited for an API key token", "counter",
+                 lambda: key_scheduler.stats["waited"])
+metrics.callback("voice_api_key_rejected_total", "Model calls that found no API key in time", "counter",
+                 lambda: key_scheduler.stats["rejected"])
+metrics.callback("voice_intent_fast_path_ratio", "Share of turns per intent that skipped the RootDispatcher", "gauge",
+                 lambda: intent_router.hit_rates(), labelname="intent")
+metrics.callback("voice_prefetches_total", "Speculative profile / status prefetches by outcome", "counter",
+                 lambda: {o: prefetcher.stats[o] for o in ("started", "completed", "cancelled", "failed")},
+                 labelname="outcome")
+metrics.callback("voice_prefetch_keys_total", "Prefetched cache keys the turn read (used) or not (wasted)", "counter",
+                 lambda: {r: prefetcher.stats[r] for r in ("used", "wasted")}, labelname="result")
+metrics.callback("voice_call_cache_requests_total", "Profile / network status reads per call cache result", "counter",
+                 lambda: {"hit": CACHE_STATS["hits"], "miss": CACHE_STATS["misses"]}, labelname="result")
+
+# Run Config: token streaming for the ConversationRelay path (see /media);
+# webhook turns use the Runner's defaults
+stream_run_config = RunConfig(
+    response_modalities=["text"],
+    streaming_mode=StreamingMode.SSE
+)
 
-# Initialize Session Service
-# InMemoryService is suitable for local dev/testing.
-session_service = InMemorySessionService()
+FILLER_MESSAGES = {
+    "billing": "I am checking your account details, please wait a moment.",
+    "network": "I am checking the network status in your area, one moment please.",
+    "human": "I am connecting you to a human agent, please hold.",
+}
 
-# Global Session Map for Voice Users (PhoneNumber -> SessionID)
-USER_SESSION_MAP = {}
-# Temporary stash for inputs during redirect loop
-PENDING_INPUTS = {}
+DEFAULT_FILLER = "Thank you. Please bear with me for a moment."
 
-# Run Config
-run_config = RunConfig(
-    response_modalities=["text"]
-)
+goodbye_classifier = utterance_classifier.subset(["goodbye"])
 
 def get_filler_message(text: str) -> str:
     """Determines a context-aware filler message based on user input."""
-    text = text.lower()
-    
-    if re.search(r"(balance|bill|pay|cost|owing|due)", text):
-        return "I am checking your account details, please wait a moment."
-    
-    if re.search(r"(internet|slow|down|outage|wifi|connect)", text):
-        return "I am checking the network status in your area, one moment please."
-        
-    if re.search(r"(human|agent|operator|person|talk to|speak with|escalate)", text):
-        return "I am connecting you to a human agent, please hold."
-        
-    return "Thank you. Please bear with me for a moment."
+    # Same single-pass classifier the intent fast-path uses
+    intent, _ = classify_intent(text)
+    return FILLER_MESSAGES.get(intent, DEFAULT_FILLER)
 
 def is_goodbye(text: str) -> bool:
-    """Checks if the user wants to end the call."""
-    # Normalize: lowercase and remove punctuation (keep spaces)
-    text = re.sub(r'[^\w\s]', '', text.lower()).strip()
-    
-    # Simple explicit phrases
-    if text in ["bye", "goodbye", "cancel", "end", "hang up", "exit", "quit", "thanks bye", "thank you bye"]:
-        return True
-        
-    # Regex for phrases
-    if re.search(r"^(goodbye|bye|bye\s+bye|see\s+you|talk\s+to\s+you\s+later)$", text):
-        return True
-        
-    if re.search(r"(thank\s+you|thanks)\s+(bye|goodbye)", text):
-        return True
-        
-    return False
+    """Checks if the user wants to end the call (goodbye phrases in agents/intents.json)."""
+    return goodbye_classifier.classify(text).intent is not None
 
 @app.post("/voice")
 async def voice_start(request: Request):
@@ -135,11 +202,20 @@ async def voice_start(request: Request):
     logger.info("Received new call /voice")
     
     resp = VoiceResponse()
+    intro_message = "Welcome to the Support Line. How can I help you today?"
+
+    if VOICE_TRANSPORT == "relay":
+        # Twilio handles STT/TTS and keeps the conversation on one WebSocket (/media)
+        stream_url = str(request.base_url).replace("http", "ws", 1) + "media"
+        connect = Connect()
+        connect.conversation_relay(url=stream_url, welcome_greeting=intro_message)
+        resp.append(connect)
+        logger.info(f"Connecting call to ConversationRelay at {stream_url}")
+        return Response(content=str(resp), media_type="application/xml")
     
     # 1. Greet the User
-    intro_message = "Welcome to the Support Line. How can I help you today?"
     resp.say(intro_message)
-    logger.info(f"Greeting User: '{intro_message}'")
+    logger.info(f"Greeting User: '{intro_message}'", extra=VERBOSE)
 
     # 2. Listen for User Input
     gather = Gather(input='speech', action='/gather_speech', timeout=3)
@@ -150,6 +226,115 @@ async def voice_start(request: Request):
     
     return Response(content=str(resp), media_type="application/xml")
 
+@app.websocket("/media")
+async def media_stream(websocket: WebSocket):
+    """
+    Persistent ConversationRelay session for one call.
+    Twilio sends transcribed prompts; each reply is streamed back as
+    sentence-sized text tokens while the next caller message is already being read.
+    If the caller speaks over the agent (barge-in), the in-flight reply is
+    cancelled so no further tokens are generated or sent.
+    """
+    await websocket.accept()
+    user_id, call_sid, tenant = "local_tester", None, "default"
+    turn = None  # in-flight agent reply
+
+    async def speak_reply(user_text: str):
+        try:
+            async with admission.admit(tenant):
+                async for chunk in stream_agent_sentences(user_id, user_text, call_sid):
+                    await websocket.send_json({"type": "text", "token": chunk + " ", "last": False})
+        except AdmissionRejected:
+            await websocket.send_json({"type": "text", "token": SHED_MESSAGE, "last": False})
+        await websocket.send_json({"type": "text", "token": "", "last": True})
+
+    def barge_in():
+        if turn and not turn.done():
+            logger.info(f"Barge-in on CallSid {call_sid}: stopping agent reply")
+            turn.cancel()
+
+    try:
+        while True:
+            message = await websocket.receive_json()
+            kind = message.get("type")
+
+            if kind == "setup":
+                call_sid = message.get("callSid")
+                user_id = message.get("from") or user_id
+                tenant = message.get("to") or tenant
+                logger.info(f"Media session connected for {user_id} (CallSid: {call_sid})")
+
+            elif kind == "interrupt":
+                # Twilio already stopped playback; stop generating the rest
+                barge_in()
+
+            elif kind == "prompt":
+                if message.get("last") is False:
+                    continue  # partial transcript, wait for the final one
+                user_text = message.get("voicePrompt", "")
+                logger.info(f"Received Speech Input: '{user_text}' from {user_id}", extra=VERBOSE)
+                # A new utterance supersedes a reply still being spoken
+                barge_in()
+
+                if is_goodbye(user_text):
+                    GOODBYE_FAST_PATH.inc()
+                    logger.info(f"Detected Goodbye Intent from {user_id}. Hanging up.")
+                    await websocket.send_json({"type": "text", "token": "Thank you for calling. Goodbye!", "last": True})
+                    await websocket.send_json({"type": "end"})
+                    continue
+
+                turn = asyncio.create_task(speak_reply(user_text))
+
+            elif kind == "error":
+                logger.error(f"ConversationRelay error for {call_sid}: {message.get('description')}")
+
+    except WebSocketDisconnect:
+        logger.info(f"Media session closed for CallSid: {call_sid}")
+    finally:
+        barge_in()
+
+SHED_MESSAGE = "All of our lines are busy right now. Please try again in a few minutes."
+
+def shed_response() -> VoiceResponse:
+    """Canned TwiML for a shed turn: offers a callback instead of an agent reply."""
+    resp = VoiceResponse()
+    gather = Gather(input='speech', action='/callback_offer', timeout=3)
+    gather.say("All of our lines are busy right now. Would you like us to call you back? Please say yes or no.")
+    resp.append(gather)
+    resp.say("Please try again later. Goodbye!")
+    resp.hangup()
+    return resp
+
+async def create_callback_ticket(user_id: str) -> dict:
+    """Books a callback through the escalation tool, without an LLM turn."""
+    reason = "Callback requested: all lines busy"
+    if REDIS_CLIENT_MODE == "async":
+        return await async_escalate_to_human(user_id, reason)
+    return await asyncio.to_thread(escalate_to_human, user_id, reason)
+
+@app.post("/callback_offer")
+async def callback_offer(request: Request):
+    """Answer to the callback offer made when a turn was shed."""
+    form = await request.form()
+    user_id = form.get("From", "local_tester")
+    answer = (form.get("SpeechResult") or "").lower()
+
+    resp = VoiceResponse()
+    if re.search(r"\b(yes|yeah|yep|sure|please|okay|ok)\b", answer):
+        result = await create_callback_ticket(user_id)
+        ticket_id = result.get("ticket_id")
+        if ticket_id:
+            # Read the number digit by digit, twice
+            digits = " ".join(ticket_id.split("-")[-1])
+            resp.say(f"Your callback ticket number is {digits}. I repeat, {digits}. "
+                     "An agent will call you back shortly. Goodbye!")
+        else:
+            resp.say("Sorry, I could not book the callback. Please try again later. Goodbye!")
+    else:
+        resp.say("No problem. Please try again later. Goodbye!")
+    resp.hangup()
+    return Response(content=str(resp), media_type="application/xml")
+
 @app.post("/gather_speech")
 async def gather_speech(request: Request):
     """
@@ -161,209 +346,362 @@ async def gather_speech(request: Request):
     user_text = form.get("SpeechResult")
     # For local testing, 'From' might not be present or unique, so use a static ID or 'From'
     user_id = form.get("From", "local_tester")
-    
-    logger.info(f"Received Speech Input: '{user_text}' from {user_id}")
-
-    resp = VoiceResponse()
-
-    if not user_text:
-        resp.say("I didn't hear anything.")
-        gather = Gather(input='speech', action='/gather_speech', timeout=3)
-        resp.append(gather)
-        return Response(content=str(resp), media_type="application/xml")
+    call_sid = form.get("CallSid")
 
-    # Store input for the processing step
-    PENDING_INPUTS[user_id] = user_text
+    with tracer.span("gather_speech", call_sid=call_sid or user_id):
+        logger.info(f"Received Speech Input: '{user_text}' from {user_id}", extra=VERBOSE)
 
-    # --- INSTANT HANGUP CHECK ---
-    # If user says "Goodbye", hang up immediately without invoking LLM
-    if is_goodbye(user_text):
-        logger.info(f"Detected Goodbye Intent from {user_id}. Hanging up.")
-        resp.say("Thank you for calling. Goodbye!")
-        resp.hangup()
-        return Response(content=str(resp), media_type="application/xml")
+        resp = VoiceResponse()
 
-    # --- LATENCY MASKING ---
-    # Instead of processing immediately (silence), we say something nice,
-    # then Redirect to the actual processing endpoint.
+        if not user_text:
+            resp.say("I didn't hear anything.")
+            gather = Gather(input='speech', action='/gather_speech', timeout=3)
+            resp.append(gather)
+            return Response(content=str(resp), media_type="application/xml")
+
+        # Store input for the processing step
+        await call_store.stash_input(user_id, user_text)
+
+        # One pass over the utterance decides hangup, prefetch and filler.
+        # Goodbye outranks every other intent, so any other result is also the routable intent.
+        intent = utterance_classifier.classify(user_text).intent
+
+        # --- INSTANT HANGUP CHECK ---
+        # If user says "Goodbye", hang up immediately without invoking LLM
+        if intent == "goodbye":
+            GOODBYE_FAST_PATH.inc()
+            logger.info(f"Detected Goodbye Intent from {user_id}. Hanging up.")
+            resp.say("Thank you for calling. Goodbye!")
+            resp.hangup()
+            return Response(content=str(resp), media_type="application/xml")
+
+        # --- LATENCY MASKING ---
+        # Instead of processing immediately (silence), we say something nice,
+        # then Redirect to the actual processing endpoint.
     
     
-    # Professional filler phrase
-    filler = get_filler_message(user_text)
-    resp.say(filler)
-    resp.redirect('/process_speech')
+        # --- SPECULATIVE PREFETCH ---
+        # While the filler plays, warm the call cache with what the likely tools read.
+        if SPECULATIVE_PREFETCH:
+            prefetcher.start(call_sid or user_id, user_id, intent)
+
+        # Professional filler phrase
+        filler = FILLER_MESSAGES.get(intent, DEFAULT_FILLER)
+        resp.say(filler)
+        resp.redirect('/process_speech')
     
-    return Response(content=str(resp), media_type="application/xml")
+        return Response(content=str(resp), media_type="application/xml")
 
-async def get_agent_response(user_id: str, user_text: str) -> str:
-    """Core logic to run the ADK Agent (Session + Runner)."""
-    try:
-        content_obj = Content(role="user", parts=[Part(text=user_text)])
-        agent_reply = ""
-        
-        
-        # 1. Get or Create Session (and Truncate History)
-        if user_id in USER_SESSION_MAP:
-            session_id = USER_SESSION_MAP[user_id]
-            logger.info(f"Resuming session: {session_id}")
-            
-            # --- CONTEXT TRUNCATION ---
-            try:
-                current_session = await session_service.get_session(session_id)
-                if current_session and hasattr(current_session, 'events'):
-                    MAX_EVENTS = 15
-                    if len(current_session.events) > MAX_EVENTS:
-                        logger.info(f"Truncating history: {len(current_session.events)} -> {MAX_EVENTS}")
-                        current_session.events = current_session.events[-MAX_EVENTS:]
-            except Exception as e:
-                logger.warning(f"Failed to truncate history: {e}")
-        else:
-            logger.info("Creating new session...")
-            session = await session_service.create_session(
-                app_name="voice-agent",
-                user_id=user_id
-            )
-            session_id = session.id
-            USER_SESSION_MAP[user_id] = session_id
-            logger.info(f"Created new session: {session_id}")
-
-        # 2. Key Rotation
-        rotate_api_key()
+def _event_text(event) -> str:
+    """Extracts the speakable text of a Runner event."""
+    if hasattr(event, "text") and event.text:
+        return event.text
+    if hasattr(event, "delta") and hasattr(event.delta, "text") and event.delta.text:
+        return event.delta.text
+    text = ""
+    if hasattr(event, "content") and event.content:
+        if hasattr(event.content, "parts") and event.content.parts:
+            for part in event.content.parts:
+                if hasattr(part, "text") and part.text:
+                    text += part.text
+                elif hasattr(part, "function_call") and part.function_call:
+                    logger.info(f"Runner executing FunctionCall: {part.function_call.name}", extra=VERBOSE)
+    return text
+
+def turn_id_for(call_sid: str, session_id: str, user_text: str) -> str:
+    """
+    Turn id for payment idempotency keys. Twilio retries and re-posts carry the
+    same CallSid and SpeechResult, so they get the same id. Without a CallSid
+    nothing is stable across deliveries; each turn gets a fresh id in its session.
+    """
+    if call_sid:
+        return f"{call_sid}:{hashlib.sha1(user_text.encode('utf-8')).hexdigest()[:16]}"
+    return f"{session_id}:{uuid.uuid4().hex[:16]}"
+
+async def stream_agent_response(user_id: str, user_text: str, call_sid: str = None, streaming: bool = False):
+    """
+    Core logic to run the ADK Agent (Session + Runner).
+    Yields reply text as Runner events arrive; with streaming=True the model
+    streams (SSE) and partial text is yielded before the response completes.
+    """
+    turn_started = time.perf_counter()
+    turn_agent = "RootDispatcher"
+    with tracer.span("agent_turn", call_sid=call_sid or user_id, streaming=streaming):
+        try:
+            content_obj = Content(role="user", parts=[Part(text=user_text)])
+            replied = False
+
+            # Tools share one read-through cache per call, so a turn hits Redis once per key
+            set_call_cache(call_caches.for_call(call_sid or user_id))
         
-        # 3. Create Agent (Dynamic Graph with User ID injected)
-        agent_instance = create_agent_graph(user_id)
         
-        # 4. Initialize Runner
-        runner = Runner(
-            agent=agent_instance,
-            app_name="voice-agent",
-            session_service=session_service
-        )
-
-        # 4. Execute Runner Loop
-        logger.info("Starting Agent Execution...")
-        for event in runner.run(
-            user_id=user_id,
-            session_id=session_id,
-            new_message=content_obj
-        ):
-             # Extract text
-             if hasattr(event, "text") and event.text:
-                 agent_reply += event.text
-             elif hasattr(event, "delta") and hasattr(event.delta, "text") and event.delta.text:
-                 agent_reply += event.delta.text
-             elif hasattr(event, "content") and event.content:
-                 if hasattr(event.content, "parts") and event.content.parts:
-                     for part in event.content.parts:
-                         if hasattr(part, "text") and part.text:
-                             agent_reply += part.text
-                         elif hasattr(part, "function_call") and part.function_call:
-                             logger.info(f"Runner executing FunctionCall: {part.function_call.name}")
+            # 1. Get or Create Session
+            # (history sent to the model is token-budgeted per call, see agents/context_compactor.py)
+            lookup_started = time.time_ns()
+            session_id = await call_store.get_session_id(user_id)
+            current_session = None
+            if session_id:
+                current_session = await session_service.get_session(
+                    app_name="voice-agent",
+                    user_id=user_id,
+                    session_id=session_id
+                )
+
+            if current_session:
+                logger.info(f"Resuming session: {session_id}", extra=VERBOSE)
+            else:
+                logger.info("Creating new session...", extra=VERBOSE)
+                session = await session_service.create_session(
+                    app_name="voice-agent",
+                    user_id=user_id,
+                    state=initial_session_state(user_id)
+                )
+                session_id = session.id
+                await call_store.set_session_id(user_id, session_id)
+                logger.info(f"Created new session: {session_id}", extra=VERBOSE)
+            tracer.record("session_lookup", lookup_started)
+
+            # Identify the turn so a retried webhook (or a payment the model repeats) charges once
+            set_turn_context(turn_id_for(call_sid, session_id, user_text))
+
+            # 2. Borrow a Runner bound to the shared template graph
+            # (User ID is resolved from session state, not baked into the graph).
+            # Confident keyword intents start directly at the specialist agent.
+            routed_agent = intent_router.route(user_text)
+            pool = specialist_runner_pools[routed_agent] if routed_agent else runner_pool
+            if routed_agent:
+                turn_agent = routed_agent
+                logger.info(f"Fast-path routing to {routed_agent}", extra=VERBOSE)
+            with pool.runner() as runner:
+
+                # 3. Execute Runner Loop
+                # (each model call leases an API key, see services/key_scheduler.py)
+                logger.info("Starting Agent Execution...", extra=VERBOSE)
+                # Events are streamed back without blocking the event loop
+                # (run_async or bounded worker pool, see AGENT_EXECUTION_MODE)
+                streamed_partial = False
+                event_started = time.time_ns()
+                async for event in agent_executor.stream(
+                    runner,
+                    user_id=user_id,
+                    session_id=session_id,
+                    new_message=content_obj,
+                    run_config=stream_run_config if streaming else None
+                ):
+                    text = _event_text(event)
+                    if getattr(event, "partial", None) is not True:
+                        # One span per complete event: the LLM hop or tool step that produced it
+                        tracer.record(f"event:{getattr(event, 'author', None) or 'agent'}", event_started)
+                        event_started = time.time_ns()
+                    # In SSE mode the final event repeats the partials it aggregates
+                    if getattr(event, "partial", None) is True:
+                        streamed_partial = True
+                    elif streamed_partial:
+                        streamed_partial = False
+                        continue
+                    if text:
+                        replied = True
+                        yield text
         
-        if not agent_reply:
-             agent_reply = "I'm thinking, but I have no response."
-             
-        return agent_reply
-
-    except Exception as e:
-        logger.error(f"Error in agent execution: {e}", exc_info=True)
-        return "I'm sorry, I encountered an error while processing your request."
-
-async def handle_async_agent(user_id: str, user_text: str, call_sid: str, base_url: str):
-    """Background Task: Runs agent -> Updates Live Call."""
-    logger.info(f"Starting Async Agent logic for CallSid: {call_sid}")
-    
-    agent_response_text = await get_agent_response(user_id, user_text)
-    
-    logger.info(f"Async Agent Response Ready: '{agent_response_text}'")
+            if not replied:
+                 yield "I'm thinking, but I have no response."
+
+        except AgentExecutorBusy as e:
+            logger.warning(f"Agent executor busy: {e}")
+            yield "We are experiencing high call volumes. Please try again in a moment."
+        except Exception as e:
+            logger.error(f"Error in agent execution: {e}", exc_info=True)
+            yield "I'm sorry, I encountered an error while processing your request."
+        finally:
+            prefetcher.finish(call_sid or user_id)
+            call_caches.release(call_sid or user_id)
+            TURN_DURATION.observe(time.perf_counter() - turn_started, turn_agent)
+
+async def stream_agent_sentences(user_id: str, user_text: str, call_sid: str = None):
+    """Streams the agent reply as sentence-sized chunks, ready for TTS."""
+    chunker = SentenceChunker()
+    async for text in stream_agent_response(user_id, user_text, call_sid, streaming=True):
+        for chunk in chunker.feed(text):
+            yield chunk
+    for chunk in chunker.flush():
+        yield chunk
+
+async def get_agent_response(user_id: str, user_text: str, call_sid: str = None) -> str:
+    """Runs the agent turn and returns the whole reply."""
+    agent_reply = ""
+    async for text in stream_agent_response(user_id, user_text, call_sid):
+        agent_reply += text
+    return agent_reply
+
+# Async turns in flight (the event loop only keeps weak references to tasks)
+async_turns = set()
+
+def start_async_turn(user_id: str, user_text: str, call_sid: str, base_url: str, turn_id: str, tenant: str):
+    """
+    Runs handle_async_agent as a task that owns the admission slot taken by
+    /process_speech. The done-callback releases it however the task ends,
+    even when it is cancelled before it starts.
+    """
+    def _finished(task):
+        async_turns.discard(task)
+        admission.release(tenant)
+        BACKGROUND_TURNS.dec()
+
+    BACKGROUND_TURNS.inc()
+    task = asyncio.create_task(handle_async_agent(user_id, user_text, call_sid, base_url, turn_id))
+    async_turns.add(task)
+    task.add_done_callback(_finished)
+    return task
+
+async def handle_async_agent(user_id: str, user_text: str, call_sid: str, base_url: str, turn_id: str):
+    """Background Task: Runs agent -> Hands the reply to the waiting call."""
+    logger.info(f"Starting Async Agent logic for CallSid: {call_sid}", extra=VERBOSE)
+    agent_response_text = await get_agent_response(user_id, user_text, call_sid)
     
-    try:
-        # Build TwiML to interrupt the hold music and speak result
-        # NOTE: When pushing TwiML via API, relative URLs might fail. 
-        # We must use the absolute URL for the Gather action.
-        # Ensure base_url ends with slash or handle it
-        if not base_url.endswith("/"):
-            base_url += "/"
-        gather_action_url = f"{base_url}gather_speech"
-        
-        new_twiml = VoiceResponse()
-        new_twiml.say(agent_response_text)
-        gather = Gather(input='speech', action=gather_action_url, timeout=3)
-        new_twiml.append(gather)
-        
-        # Fallback if no speech
-        new_twiml.redirect(gather_action_url)
-        
-        # Update the live call
-        call = twilio_client.calls(call_sid).update(twiml=str(new_twiml))
-        logger.info(f"Successfully updated Call {call_sid} with Agent Response.")
-        
-    except Exception as e:
-        logger.error(f"Failed to update Twilio Call {call_sid}: {e}")
+    logger.info(f"Async Agent Response Ready: '{agent_response_text}'", extra=VERBOSE)
+
+    if RESULT_HANDOFF_MODE == "update" and twilio_updater.enabled:
+        try:
+            # Build TwiML to interrupt the hold loop and speak result
+            # NOTE: When pushing TwiML via API, relative URLs might fail. 
+            # We must use the absolute URL for the Gather action.
+            # Ensure base_url ends with slash or handle it
+            if not base_url.endswith("/"):
+                base_url += "/"
+            gather_action_url = f"{base_url}gather_speech"
+            
+            new_twiml = VoiceResponse()
+            new_twiml.say(agent_response_text)
+            gather = Gather(input='speech', action=gather_action_url, timeout=3)
+            new_twiml.append(gather)
+            
+            # Fallback if no speech
+            new_twiml.redirect(gather_action_url)
+            
+            # Update the live call (retried with backoff, in order per call)
+            await twilio_updater.update(call_sid, str(new_twiml))
+            logger.info(f"Successfully updated Call {call_sid} with Agent Response.", extra=VERBOSE)
+            return
+            
+        except TwilioUpdateError as e:
+            logger.error(f"Failed to update Twilio Call {call_sid}: {e}")
+
+    # Wakes the /await_result long-poll for this turn
+    # (in "update" mode only when the REST push failed, so the reply is spoken once)
+    await call_store.publish_result(turn_id, agent_response_text)
+
+
+def _await_result_url(turn_id: str, started: float) -> str:
+    return f"/await_result?turn={turn_id}&started={started:.3f}"
+
+@app.post("/await_result")
+async def await_result(turn: str, started: float):
+    """
+    Hold loop for an async turn.
+    Long-polls the call store and speaks the reply the moment it is published;
+    otherwise redirects back to itself until RESULT_DEADLINE_SECONDS have passed.
+    """
+    remaining = RESULT_DEADLINE_SECONDS - (time.time() - started)
+    agent_reply = await call_store.wait_result(turn, timeout=max(0.0, min(RESULT_POLL_SECONDS, remaining)))
+
+    resp = VoiceResponse()
+    if agent_reply is not None:
+        resp.say(agent_reply)
+        gather = Gather(input='speech', action='/gather_speech', timeout=3)
+        resp.append(gather)
+        return Response(content=str(resp), media_type="application/xml")
+
+    if remaining <= RESULT_POLL_SECONDS:
+        # Deadline reached (or the background task died): keep the caller on the line
+        logger.warning(f"No agent result for turn {turn} within {RESULT_DEADLINE_SECONDS}s")
+        resp.say("I am sorry, that is taking longer than expected. Could you please say that again?")
+        gather = Gather(input='speech', action='/gather_speech', timeout=3)
+        resp.append(gather)
+        return Response(content=str(resp), media_type="application/xml")
+
+    resp.say("Still checking, thank you for your patience.")
+    resp.redirect(_await_result_url(turn, started))
+    return Response(content=str(resp), media_type="application/xml")
 
 
 @app.post("/process_speech")
-async def process_speech(request: Request, background_tasks: BackgroundTasks):
+async def process_speech(request: Request):
     """
     Decides between Sync (Local) and Async (Twilio) processing.
     """
     form = await request.form()
     user_id = form.get("From", "local_tester")
     call_sid = form.get("CallSid")
-    
-    # Retrieve stashed input
-    user_text = PENDING_INPUTS.get(user_id)
-    
-    if not user_text:
-        logging.warning(f"No pending input found for {user_id}")
-        resp = VoiceResponse()
-        resp.say("I lost your connection. Please say that again.")
-        resp.redirect('/voice') # Restart loop
-        return Response(content=str(resp), media_type="application/xml")
-
-    # Clear stash
-    del PENDING_INPUTS[user_id]
 
-    # --- DECISION: SYNC OR ASYNC? ---
-    # use Sync if Local Tester OR Twilio Client not configured OR CallSid missing due to some reason
-    is_local_test = (user_id == "local_tester") or ("local_tester" in user_id)
-    can_use_async = (twilio_client is not None) and (call_sid is not None)
+    with tracer.span("process_speech", call_sid=call_sid or user_id):
+        # Retrieve (and clear) stashed input
+        user_text = await call_store.pop_input(user_id)
     
-    if is_local_test or not can_use_async:
-        logger.info(f"Running SYNCHRONOUSLY for {user_id}")
-        # Blocking call
-        agent_reply = await get_agent_response(user_id, user_text)
-        
-        resp = VoiceResponse()
-        resp.say(agent_reply)
-        gather = Gather(input='speech', action='/gather_speech', timeout=3)
-        resp.append(gather)
-        return Response(content=str(resp), media_type="application/xml")
-        
-    else:
-        logger.info(f"Running ASYNCHRONOUSLY for {user_id} (CallSid: {call_sid})")
-        
-        # 1. Trigger Background Task
-        # Pass the base_url so we can construct absolute callbacks
-        base_url = str(request.base_url)
-        background_tasks.add_task(handle_async_agent, user_id, user_text, call_sid, base_url)
-        
-        # 2. Return Hold Music TwiML immediately
-        resp = VoiceResponse()
-        # You can replace this logic with <Play>url_to_music</Play>
-        # Loop the 'Please hold' message or pause
-        resp.say("I am checking that for you, please hold on...")
-        # Pause for 30 seconds
-        resp.pause(length=30)
-        # If 30s passes and nothing happens:
-        resp.say("I am still thinking...")
-        resp.pause(length=30)
-        
-        # Eventually give up if background task failed to update
-        resp.say("I am taking longer than expected. Please try again later.")
-        resp.hangup()
-        
-        return Response(content=str(resp), media_type="application/xml")
+        if not user_text:
+            logging.warning(f"No pending input found for {user_id}")
+            resp = VoiceResponse()
+            resp.say("I lost your connection. Please say that again.")
+            resp.redirect('/voice') # Restart loop
+            return Response(content=str(resp), media_type="application/xml")
+
+        # --- ADMISSION CONTROL ---
+        # Bounded wait for a turn slot (global + per dialed number); overflow is shed
+        tenant = form.get("To") or "default"
+        try:
+            await admission.acquire(tenant)
+        except AdmissionRejected:
+            return Response(content=str(shed_response()), media_type="application/xml")
+
+        # The slot is released below, unless an async turn task takes it over
+        slot_handed_off = False
+        try:
+            # --- DECISION: SYNC OR ASYNC? ---
+            # use Sync if Local Tester OR CallSid missing due to some reason
+            # OR "update" handoff without Twilio credentials
+            is_local_test = (user_id == "local_tester") or ("local_tester" in user_id)
+            can_use_async = (call_sid is not None) and (twilio_updater.enabled or RESULT_HANDOFF_MODE == "await")
+
+            if is_local_test or not can_use_async:
+                logger.info(f"Running SYNCHRONOUSLY for {user_id}", extra=VERBOSE)
+                # Blocking call
+                agent_reply = await get_agent_response(user_id, user_text, call_sid)
+
+                resp = VoiceResponse()
+                resp.say(agent_reply)
+                gather = Gather(input='speech', action='/gather_speech', timeout=3)
+                resp.append(gather)
+                return Response(content=str(resp), media_type="application/xml")
+
+            else:
+                logger.info(f"Running ASYNCHRONOUSLY for {user_id} (CallSid: {call_sid})", extra=VERBOSE)
+
+                # 1. Start the turn task (it releases the slot when it ends)
+                # Pass the base_url so we can construct absolute callbacks
+                base_url = str(request.base_url)
+                turn_id = uuid.uuid4().hex
+                start_async_turn(user_id, user_text, call_sid, base_url, turn_id, tenant)
+                slot_handed_off = True
+
+                # 2. Hold the caller on the result loop; it plays the reply as soon as it is ready
+                resp = VoiceResponse()
+                resp.say("I am checking that for you, please hold on...")
+                resp.redirect(_await_result_url(turn_id, time.time()))
+
+                return Response(content=str(resp), media_type="application/xml")
+        finally:
+            if not slot_handed_off:
+                admission.release(tenant)
+
+@app.get("/stats")
+async def stats():
+    """Operational counters for capacity planning."""
+    return {"api_keys": key_scheduler.metrics(), "admission": admission.metrics(), "latency_ms": tracer.summary(),
+            "intent_fast_path": intent_router.hit_rates()}
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint (text exposition format 0.0.4)."""
+    return PlainTextResponse(await metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import os
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("Admission")
+
+# --- Admission Settings ---
+# Agent turns running at once, process-wide and per tenant (the dialed number)
+ADMISSION_MAX_CONCURRENT = int(os.environ.get("ADMISSION_MAX_CONCURRENT", "32"))
+ADMISSION_MAX_PER_TENANT = int(os.environ.get("ADMISSION_MAX_PER_TENANT", "16"))
+# Turns allowed to wait for a slot, and how long each may wait, before being shed
+ADMISSION_QUEUE_DEPTH = int(os.environ.get("ADMISSION_QUEUE_DEPTH", "64"))
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", "5"))
+
+
+class AdmissionRejected(RuntimeError):
+    """The turn was shed: the wait queue was full or the wait timed out."""
+
+    def __init__(self, reason: str, tenant: str):
+        super().__init__(f"Turn shed ({reason}) for tenant {tenant}")
+        self.reason = reason
+        self.tenant = tenant
+
+
+class AdmissionController:
+    """
+    Global + per-tenant concurrency limit with a bounded FIFO wait queue.
+    A waiter whose tenant is at its limit does not hold up other tenants.
+    Lives on the server's event loop (not thread-safe).
+    """
+
+    def __init__(self, max_concurrent: int = ADMISSION_MAX_CONCURRENT,
+                 max_per_tenant: int = ADMISSION_MAX_PER_TENANT,
+                 queue_depth: int = ADMISSION_QUEUE_DEPTH,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.max_concurrent = max_concurrent
+        self.max_per_tenant = max_per_tenant
+        self.queue_depth = queue_depth
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.active_by_tenant = Counter()
+        self.stats = Counter()
+        self._waiters = deque()  # (tenant, future) in arrival order
+
+    def _has_room(self, tenant: str) -> bool:
+        return self.active < self.max_concurrent and self.active_by_tenant[tenant] < self.max_per_tenant
+
+    def _start(self, tenant: str):
+        self.active += 1
+        self.active_by_tenant[tenant] += 1
+        self.stats["admitted"] += 1
+
+    def _shed(self, reason: str, tenant: str):
+        self.stats[f"shed_{reason}"] += 1
+        logger.warning(f"Shedding turn for tenant {tenant}: {reason}")
+        return AdmissionRejected(reason, tenant)
+
+    def _wake(self):
+        for entry in list(self._waiters):
+            tenant, future = entry
+            if self.active >= self.max_concurrent:
+                return
+            if not future.done() and self._has_room(tenant):
+                self._waiters.remove(entry)
+                self._start(tenant)
+                future.set_result(None)
+
+    async def acquire(self, tenant: str = "default"):
+        """Takes a slot, waiting in the queue if needed. Raises AdmissionRejected."""
+        queued_ahead = any(t == tenant for t, _ in self._waiters)
+        if not queued_ahead and self._has_room(tenant):
+            self._start(tenant)
+            return
+        if len(self._waiters) >= self.queue_depth:
+            raise self._shed("queue_full", tenant)
+
+        entry = (tenant, asyncio.get_running_loop().create_future())
+        self._waiters.append(entry)
+        self.stats["queued"] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(entry[1]), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if entry[1].done():
+                return  # admitted right at the deadline
+            self._waiters.remove(entry)
+            raise self._shed("timeout", tenant)
+        except asyncio.CancelledError:
+            if entry[1].done():
+                self.release(tenant)  # admitted just as the caller went away
+            else:
+                self._waiters.remove(entry)
+            raise
+
+    def release(self, tenant: str = "default"):
+        self.active -= 1
+        self.active_by_tenant[tenant] -= 1
+        if not self.active_by_tenant[tenant]:
+            del self.active_by_tenant[tenant]
+        self._wake()
+
+    @asynccontextmanager
+    async def admit(self, tenant: str = "default"):
+        await self.acquire(tenant)
+        try:
+            yield
+        finally:
+            self.release(tenant)
+
+    def metrics(self) -> dict:
+        return {
+            "active": self.active,
+            "queue_depth": len(self._waiters),
+            "admitted": self.stats["admitted"],
+            "queued": self.stats["queued"],
+            "shed_queue_full": self.stats["shed_queue_full"],
+            "shed_timeout": self.stats["shed_timeout"],
+            "active_by_tenant": dict(self.active_by_tenant),
+        }
+
+
+# Global Controller Instance
+admission = AdmissionController()
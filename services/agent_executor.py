@@ -0,0 +1,144 @@
+import os
+import asyncio
+import contextvars
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("AgentExecutor")
+
+# --- Execution Settings ---
+# "async":  drive the Runner through run_async() on the server event loop.
+# "thread": drive each turn on a private event loop in a bounded worker pool
+#           (requires REDIS_CLIENT_MODE=sync and SESSION_BACKEND=memory: asyncio
+#           Redis pools are loop-bound, see check_backends).
+AGENT_EXECUTION_MODE = os.environ.get("AGENT_EXECUTION_MODE", "async").lower()
+AGENT_POOL_SIZE = int(os.environ.get("AGENT_POOL_SIZE", "8"))
+# Turns allowed to wait for a free worker before new ones are rejected
+AGENT_QUEUE_DEPTH = int(os.environ.get("AGENT_QUEUE_DEPTH", "32"))
+
+# Sentinel pushed by the worker thread once the Runner generator is exhausted
+_DONE = object()
+
+
+class AgentExecutorBusy(RuntimeError):
+    """Raised when the worker pool and its wait queue are both full."""
+
+
+def check_backends(mode: str, redis_client_mode: str, session_backend: str = "memory"):
+    """
+    Refuses settings a thread-mode turn can't run with: its tools and session
+    reads/writes run on the worker's event loop, and an asyncio Redis client
+    only works on the loop it was first used on.
+    """
+    if mode != "thread":
+        return
+    if redis_client_mode == "async":
+        raise ValueError(
+            "AGENT_EXECUTION_MODE=thread needs REDIS_CLIENT_MODE=sync "
+            "(the asyncio Redis client is bound to the server event loop)"
+        )
+    if session_backend == "redis":
+        raise ValueError(
+            "AGENT_EXECUTION_MODE=thread needs SESSION_BACKEND=memory "
+            "(the Redis session store uses an asyncio client bound to the server event loop)"
+        )
+
+
+class AgentExecutor:
+    def __init__(self, mode: str = AGENT_EXECUTION_MODE,
+                 pool_size: int = AGENT_POOL_SIZE,
+                 queue_depth: int = AGENT_QUEUE_DEPTH):
+        if mode not in ("async", "thread"):
+            raise ValueError(f"Unknown agent execution mode: {mode}")
+        self.mode = mode
+        self.pool_size = pool_size
+        self.queue_depth = queue_depth
+        self._pool = None
+        # Running + waiting turns may never exceed pool_size + queue_depth
+        self._slots = threading.BoundedSemaphore(pool_size + queue_depth)
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.pool_size,
+                thread_name_prefix="agent-turn"
+            )
+        return self._pool
+
+    async def stream(self, runner, *, user_id: str, session_id: str, new_message, run_config=None):
+        """Yields Runner events without blocking the event loop."""
+        if self.mode == "async":
+            async for event in runner.run_async(
+                user_id=user_id,
+                session_id=session_id,
+                new_message=new_message,
+                run_config=run_config
+            ):
+                yield event
+            return
+
+        if not self._slots.acquire(blocking=False):
+            raise AgentExecutorBusy(
+                f"Agent pool saturated ({self.pool_size} workers, {self.queue_depth} queued)"
+            )
+
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+
+        def _publish(item):
+            loop.call_soon_threadsafe(events.put_nowait, item)
+
+        async def _drive():
+            async for event in runner.run_async(
+                user_id=user_id,
+                session_id=session_id,
+                new_message=new_message,
+                run_config=run_config
+            ):
+                if cancelled.is_set():
+                    break
+                _publish(event)
+
+        def _worker():
+            # Each worker drives the turn on its own private event loop
+            try:
+                asyncio.run(_drive())
+            except BaseException as e:
+                _publish(e)
+            finally:
+                self._slots.release()
+                _publish(_DONE)
+
+        try:
+            # Copy the caller's context so ContextVars (user / turn) reach the tools
+            self._get_pool().submit(contextvars.copy_context().run, _worker)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        try:
+            while True:
+                item = await events.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # Consumer went away (error / cancellation): stop forwarding events
+            cancelled.set()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+# Global Executor Instance
+agent_executor = AgentExecutor()
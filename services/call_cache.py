@@ -0,0 +1,234 @@
+import os
+import time
+import asyncio
+import threading
+from collections import Counter
+
+from dotenv import load_dotenv
+
+from utils.context import get_call_cache
+
+load_dotenv()
+
+# Max age of a cached profile / network status inside one call
+CALL_CACHE_TTL_SECONDS = float(os.environ.get("CALL_CACHE_TTL_SECONDS", "30"))
+
+# Process-wide hit/miss totals across all call caches
+CACHE_STATS = Counter()
+
+_MISSING = object()
+
+
+def user_cache_key(user_id: str) -> tuple:
+    return ("user", user_id)
+
+def user_fields_cache_key(user_id: str, fields) -> tuple:
+    return ("user", user_id, tuple(fields))
+
+def network_cache_key(region: str) -> tuple:
+    return ("network", region)
+
+def _project(profile, fields):
+    if not profile or not fields:
+        return profile
+    return {field: profile[field] for field in fields if field in profile} or None
+
+
+class CallCache:
+    """
+    Read-through cache for one call (CallSid).
+    Tools cache the profile fields they read (one HMGET per projection); a
+    whole profile, e.g. from a prefetch, serves every projection from memory.
+    """
+
+    def __init__(self, ttl: float = CALL_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.created_at = time.monotonic()
+        # Keys served from memory at least once (used to score prefetches)
+        self.hit_keys = set()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                return entry[0]
+            self._entries.pop(key, None)
+        return _MISSING
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+
+    def has(self, key) -> bool:
+        """True if `key` is cached, or being loaded on the running event loop."""
+        if self.get(key) is not _MISSING:
+            return True
+        pending = self._inflight.get(key)
+        try:
+            return pending is not None and pending.get_loop() is asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+
+    def invalidate(self, key):
+        """Drops `key` and every key under it (e.g. a user's cached projections)."""
+        with self._lock:
+            for cached_key in [k for k in self._entries if k[:len(key)] == key]:
+                del self._entries[cached_key]
+
+    def _record(self, key, hit: bool):
+        if hit:
+            self.hits += 1
+            self.hit_keys.add(key)
+            CACHE_STATS["hits"] += 1
+        else:
+            self.misses += 1
+            CACHE_STATS["misses"] += 1
+
+    def get_or_load(self, key, loader):
+        value = self.get(key)
+        self._record(key, value is not _MISSING)
+        if value is _MISSING:
+            value = loader()
+            self.put(key, value)
+        return value
+
+    async def aget_or_load(self, key, loader):
+        value = self.get(key)
+        if value is not _MISSING:
+            self._record(key, True)
+            return value
+
+        # Concurrent loads of one key (parallel tool calls, a running prefetch)
+        # share one round-trip; futures from another event loop can't be awaited.
+        pending = self._inflight.get(key)
+        if pending is not None and pending.get_loop() is asyncio.get_running_loop():
+            self._record(key, True)
+            return await asyncio.shield(pending)
+
+        self._record(key, False)
+        pending = asyncio.ensure_future(loader())
+        self._inflight[key] = pending
+
+        def _settle(done):
+            self._inflight.pop(key, None)
+            if not done.cancelled() and done.exception() is None:
+                self.put(key, done.result())
+
+        pending.add_done_callback(_settle)
+        # Shielded so cancelling one waiter (e.g. a prefetch) doesn't fail the others
+        return await asyncio.shield(pending)
+
+
+class CachedDatabase:
+    """RedisDatabase view that reads through a CallCache and invalidates on writes."""
+
+    def __init__(self, db, cache: CallCache):
+        self.db = db
+        self.cache = cache
+
+    def get_user(self, user_id: str, fields=None):
+        if fields and not self.cache.has(user_cache_key(user_id)):
+            # Only the fields asked for go over the wire (HMGET)
+            return self.cache.get_or_load(user_fields_cache_key(user_id, fields),
+                                          lambda: self.db.get_user(user_id, fields))
+        profile = self.cache.get_or_load(user_cache_key(user_id), lambda: self.db.get_user(user_id))
+        return _project(profile, fields)
+
+    def get_network_status(self, region: str):
+        return self.cache.get_or_load(network_cache_key(region), lambda: self.db.get_network_status(region))
+
+    def apply_payment(self, user_id: str, amount_paid: float, idempotency_key: str = None,
+                      transaction_id: str = None):
+        try:
+            return self.db.apply_payment(user_id, amount_paid, idempotency_key, transaction_id)
+        finally:
+            self.cache.invalidate(user_cache_key(user_id))
+
+    def set_network_status(self, region: str, status: str):
+        try:
+            return self.db.set_network_status(region, status)
+        finally:
+            self.cache.invalidate(network_cache_key(region))
+
+    def create_ticket(self, user_id: str, reason: str, ticket_id: str):
+        return self.db.create_ticket(user_id, reason, ticket_id)
+
+
+class AsyncCachedDatabase(CachedDatabase):
+    """AsyncRedisDatabase view that reads through a CallCache and invalidates on writes."""
+
+    async def get_user(self, user_id: str, fields=None):
+        if fields and not self.cache.has(user_cache_key(user_id)):
+            return await self.cache.aget_or_load(user_fields_cache_key(user_id, fields),
+                                                 lambda: self.db.get_user(user_id, fields))
+        profile = await self.cache.aget_or_load(user_cache_key(user_id), lambda: self.db.get_user(user_id))
+        return _project(profile, fields)
+
+    async def get_network_status(self, region: str):
+        return await self.cache.aget_or_load(network_cache_key(region), lambda: self.db.get_network_status(region))
+
+    async def apply_payment(self, user_id: str, amount_paid: float, idempotency_key: str = None,
+                            transaction_id: str = None):
+        try:
+            return await self.db.apply_payment(user_id, amount_paid, idempotency_key, transaction_id)
+        finally:
+            self.cache.invalidate(user_cache_key(user_id))
+
+    async def set_network_status(self, region: str, status: str):
+        try:
+            return await self.db.set_network_status(region, status)
+        finally:
+            self.cache.invalidate(network_cache_key(region))
+
+    async def create_ticket(self, user_id: str, reason: str, ticket_id: str):
+        return await self.db.create_ticket(user_id, reason, ticket_id)
+
+
+def cached(db):
+    """Returns `db` wrapped in the current call's cache, or `db` itself outside a call."""
+    cache = get_call_cache()
+    return CachedDatabase(db, cache) if cache is not None else db
+
+def cached_async(async_db):
+    """Async counterpart of cached()."""
+    cache = get_call_cache()
+    return AsyncCachedDatabase(async_db, cache) if cache is not None else async_db
+
+
+class CallCacheRegistry:
+    """CallSid -> CallCache, so work started before a turn can park results for it."""
+
+    def __init__(self, ttl: float = CALL_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self._caches = {}
+        self._lock = threading.Lock()
+
+    def for_call(self, call_sid: str) -> CallCache:
+        with self._lock:
+            cache = self._caches.get(call_sid)
+            if cache is None:
+                self._purge()
+                cache = self._caches[call_sid] = CallCache(self.ttl)
+            return cache
+
+    def _purge(self):
+        # Caches whose turn never ran (e.g. caller hung up) outlive their entries
+        cutoff = time.monotonic() - self.ttl
+        for call_sid in [sid for sid, c in self._caches.items() if c.created_at < cutoff]:
+            del self._caches[call_sid]
+
+    def release(self, call_sid: str):
+        with self._lock:
+            self._caches.pop(call_sid, None)
+
+    def __len__(self):
+        return len(self._caches)
+
+
+# Global Registry Instance
+call_caches = CallCacheRegistry()
@@ -1,83 +1,415 @@
 import os
 import json
 import redis
+import redis.asyncio as aioredis
 import time
+import asyncio
+import logging
+import threading
+from urllib.parse import urlparse
 from dotenv import load_dotenv
 
+from services.metrics import REDIS_ROUND_TRIPS
+from services.network_cache import network_cache, encode_status_update, NETWORK_STATUS_CHANNEL
+
 load_dotenv()
 
-class RedisDatabase:
+logger = logging.getLogger("Database")
+
+# --- Redis Client Settings ---
+# "sync": tools call the blocking RedisDatabase (db)
+# "async": tools await AsyncRedisDatabase (async_db) on the event loop
+REDIS_CLIENT_MODE = os.environ.get("REDIS_CLIENT_MODE", "async").lower()
+REDIS_MAX_CONNECTIONS = int(os.environ.get("REDIS_MAX_CONNECTIONS", "50"))
+# Seconds to wait for a free pooled connection before failing
+REDIS_POOL_TIMEOUT = float(os.environ.get("REDIS_POOL_TIMEOUT", "5"))
+REDIS_SOCKET_TIMEOUT = float(os.environ.get("REDIS_SOCKET_TIMEOUT", "2"))
+REDIS_CONNECT_TIMEOUT = float(os.environ.get("REDIS_CONNECT_TIMEOUT", "2"))
+# Idle connections are PINGed before reuse once this many seconds have passed
+REDIS_HEALTH_CHECK_INTERVAL = int(os.environ.get("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+# How long a processed payment's idempotency key is remembered
+PAYMENT_IDEMPOTENCY_TTL_SECONDS = int(os.environ.get("PAYMENT_IDEMPOTENCY_TTL_SECONDS", "86400"))
+
+# Ticket IDs come from one Redis counter; each process reserves this many per INCRBY
+# (1 = a round-trip per ticket). IDs stay unique and short enough to read out digit by digit.
+TICKET_ID_BLOCK_SIZE = int(os.environ.get("TICKET_ID_BLOCK_SIZE", "20"))
+TICKET_SEQUENCE_KEY = "tickets:seq"
+
+class CountingConnection(redis.Connection):
+    """Counts every command or pipeline written to Redis (one round-trip each) for /metrics."""
+
+    def send_packed_command(self, command, check_health=True):
+        REDIS_ROUND_TRIPS.inc()
+        return super().send_packed_command(command, check_health)
+
+
+class AsyncCountingConnection(aioredis.Connection):
+    async def send_packed_command(self, command, check_health=True):
+        REDIS_ROUND_TRIPS.inc()
+        return await super().send_packed_command(command, check_health)
+
+
+def counting_connection(redis_url: str, is_async: bool = False) -> dict:
+    """connection_class kwargs for plain redis:// URLs (rediss:// and unix:// keep their own class)."""
+    if urlparse(redis_url).scheme != "redis":
+        return {}
+    return {"connection_class": AsyncCountingConnection if is_async else CountingConnection}
+
+
+# Debits a user's balance (floored at zero) in one server-side step.
+# Works on hash profiles and on legacy JSON blobs that are not migrated yet.
+# KEYS[1] = user key, KEYS[2] (optional) = idempotency key
+# ARGV[1] = amount paid, ARGV[2] = idempotency TTL, ARGV[3] (optional) = transaction id
+# Returns {new balance as a string (Lua numbers would be truncated to
+# integers), transaction id, "0"}, the recorded {balance, transaction id, "1"}
+# for a replayed key, or nil for unknown users.
+UPDATE_BALANCE_LUA = """
+if #KEYS > 1 then
+    local replay = redis.call('GET', KEYS[2])
+    if replay then
+        local record = cjson.decode(replay)
+        -- Keys recorded before transaction ids were kept hold just the balance
+        if type(record) ~= 'table' then record = {balance = replay, transaction_id = ''} end
+        return {record['balance'], record['transaction_id'], '1'}
+    end
+end
+local key_type = redis.call('TYPE', KEYS[1])['ok']
+local new_balance
+if key_type == 'hash' then
+    new_balance = (tonumber(redis.call('HGET', KEYS[1], 'balance')) or 0) - tonumber(ARGV[1])
+    if new_balance < 0 then new_balance = 0 end
+    redis.call('HSET', KEYS[1], 'balance', tostring(new_balance))
+elseif key_type == 'string' then
+    local user = cjson.decode(redis.call('GET', KEYS[1]))
+    new_balance = (tonumber(user['balance']) or 0) - tonumber(ARGV[1])
+    if new_balance < 0 then new_balance = 0 end
+    user['balance'] = new_balance
+    redis.call('SET', KEYS[1], cjson.encode(user))
+else
+    return false
+end
+local result = tostring(new_balance)
+local transaction_id = ARGV[3] or ''
+if #KEYS > 1 then
+    redis.call('SET', KEYS[2], cjson.encode({balance = result, transaction_id = transaction_id}), 'EX', ARGV[2])
+end
+return {result, transaction_id, '0'}
+"""
+
+# Converts one legacy JSON profile blob into a hash, atomically.
+# Non-string values are stored JSON-encoded and listed in the _typed field
+# (see _encode_profile). Returns 1 if the key was converted, 0 if it was
+# already a hash / missing.
+MIGRATE_PROFILE_LUA = """
+if redis.call('TYPE', KEYS[1])['ok'] ~= 'string' then return 0 end
+local user = cjson.decode(redis.call('GET', KEYS[1]))
+redis.call('DEL', KEYS[1])
+local typed = {}
+for field, value in pairs(user) do
+    if type(value) ~= 'string' then
+        value = cjson.encode(value)
+        table.insert(typed, field)
+    end
+    redis.call('HSET', KEYS[1], field, value)
+end
+if #typed > 0 then
+    redis.call('HSET', KEYS[1], '_typed', cjson.encode(typed))
+end
+return 1
+"""
+
+# Profile fields stored as hash strings that need converting back on read
+PROFILE_FIELD_TYPES = {"balance": float}
+# Hash field listing the profile fields stored as JSON (numbers, booleans, lists, ...)
+PROFILE_TYPED_FIELD = "_typed"
+
+def _encode_profile(profile: dict) -> dict:
+    typed = [field for field, value in profile.items() if not isinstance(value, str)]
+    mapping = {field: value if isinstance(value, str) else json.dumps(value) for field, value in profile.items()}
+    if typed:
+        mapping[PROFILE_TYPED_FIELD] = json.dumps(typed)
+    return mapping
+
+def _profile_fields(fields) -> list:
+    """HMGET field list: the requested fields plus the typed-field index."""
+    return [*fields, PROFILE_TYPED_FIELD]
+
+def _decode_profile(fields, values):
+    data = dict(zip(fields, values))
+    typed = json.loads(data.pop(PROFILE_TYPED_FIELD, None) or "[]")
+    profile = {}
+    for field, value in data.items():
+        if value is None:
+            continue
+        if field in PROFILE_FIELD_TYPES:
+            profile[field] = PROFILE_FIELD_TYPES[field](value)
+        elif field in typed:
+            profile[field] = json.loads(value)
+        else:
+            profile[field] = value
+    return profile or None
+
+def _decode_legacy_profile(data, fields=None):
+    if not data:
+        return None
+    user = json.loads(data)
+    if fields:
+        user = {field: user[field] for field in fields if field in user}
+    return user or None
+
+def _is_wrong_type(error: redis.ResponseError) -> bool:
+    return str(error).startswith("WRONGTYPE")
+
+class _IdBlock:
+    """Hi/lo allocator state: sequence numbers in (next, end] belong to this process."""
+
     def __init__(self):
-        redis_url = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
-        try:
-            self.client = redis.from_url(redis_url, decode_responses=True)
-            self.client.ping() # Check connection
-            print(f"Connected to Redis at {redis_url}")
-        except redis.ConnectionError as e:
-            print(f"Failed to connect to Redis: {e}")
-            self.client = None
-
-    def get_user(self, user_id: str):
+        self.next = 0
+        self.end = 0
+
+    def take(self):
+        if self.next >= self.end:
+            return None
+        self.next += 1
+        return self.next
+
+    def refill(self, end: int, size: int):
+        self.next = end - size
+        self.end = end
+
+def _ticket_data(user_id: str, reason: str, ticket_id: str) -> str:
+    return json.dumps({
+        "ticket_id": ticket_id,
+        "user_id": user_id,
+        "reason": reason,
+        "status": "OPEN",
+        "created_at": time.time()
+    })
+
+def _payment_result(reply):
+    """UPDATE_BALANCE_LUA reply -> {balance, transaction_id, duplicate}, or None for unknown users."""
+    if reply is None:
+        return None
+    balance, transaction_id, duplicate = reply
+    return {"balance": float(balance), "transaction_id": transaction_id or None, "duplicate": duplicate == "1"}
+
+def _payment_args(amount_paid: float, transaction_id: str = None) -> list:
+    args = [amount_paid, PAYMENT_IDEMPOTENCY_TTL_SECONDS]
+    return args + [transaction_id] if transaction_id else args
+
+def _balance_keys(user_id: str, idempotency_key: str = None) -> list:
+    keys = [f"user:{user_id}"]
+    if idempotency_key:
+        keys.append(f"payment:idem:{idempotency_key}")
+    return keys
+
+class RedisDatabase:
+    def __init__(self, client=None):
+        self.client = client
+        if client is None:
+            redis_url = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+            try:
+                self.client = redis.from_url(redis_url, decode_responses=True, **counting_connection(redis_url))
+                self.client.ping() # Check connection
+                print(f"Connected to Redis at {redis_url}")
+            except redis.ConnectionError as e:
+                print(f"Failed to connect to Redis: {e}")
+                self.client = None
+        if self.client:
+            self._update_balance = self.client.register_script(UPDATE_BALANCE_LUA)
+        self._ticket_ids = _IdBlock()
+        self._ticket_lock = threading.Lock()
+
+    def get_user(self, user_id: str, fields=None):
+        """
+        Reads a user profile; `fields` limits the read to those hash fields (HMGET).
+        Falls back to the legacy JSON blob layout for keys not migrated yet.
+        """
         if not self.client: return None
-        data = self.client.get(f"user:{user_id}")
-        return json.loads(data) if data else None
+        key = f"user:{user_id}"
+        try:
+            if fields:
+                names = _profile_fields(fields)
+                return _decode_profile(names, self.client.hmget(key, names))
+            data = self.client.hgetall(key)
+            return _decode_profile(data.keys(), data.values())
+        except redis.ResponseError as e:
+            if not _is_wrong_type(e):
+                raise
+            return _decode_legacy_profile(self.client.get(key), fields)
 
-    def update_balance(self, user_id: str, amount_paid: float):
-        """Atomically updates user balance."""
+    def save_user(self, user_id: str, profile: dict):
+        """Writes a full user profile as a hash, replacing any previous layout."""
         if not self.client: return None
-        
         key = f"user:{user_id}"
-        
         with self.client.pipeline() as pipe:
-            while True:
-                try:
-                    pipe.watch(key)
-                    data = pipe.get(key)
-                    if not data:
-                        return None
-                    
-                    user = json.loads(data)
-                    current_balance = float(user.get("balance", 0))
-                    new_balance = max(0, current_balance - amount_paid)
-                    user["balance"] = new_balance
-                    
-                    pipe.multi()
-                    pipe.set(key, json.dumps(user))
-                    pipe.execute()
-                    return new_balance
-                except redis.WatchError:
-                    continue # Retry on conflict
+            pipe.delete(key)
+            pipe.hset(key, mapping=_encode_profile(profile))
+            pipe.execute()
+
+    def migrate_user_profiles(self, batch_size: int = 500) -> int:
+        """Converts every legacy JSON `user:*` blob into a hash. Safe to re-run."""
+        if not self.client: return 0
+        migrate = self.client.register_script(MIGRATE_PROFILE_LUA)
+        migrated = 0
+        for key in self.client.scan_iter(match="user:*", count=batch_size, _type="string"):
+            migrated += migrate(keys=[key])
+        return migrated
+
+    def apply_payment(self, user_id: str, amount_paid: float, idempotency_key: str = None,
+                      transaction_id: str = None):
+        """
+        Atomically debits a payment (single Lua call, floored at zero).
+        Returns {"balance", "transaction_id", "duplicate"}, or None for unknown users.
+        Repeating an idempotency_key returns the first payment's balance and
+        transaction id, flagged as a duplicate, without charging again.
+        """
+        if not self.client: return None
+
+        return _payment_result(self._update_balance(
+            keys=_balance_keys(user_id, idempotency_key),
+            args=_payment_args(amount_paid, transaction_id)
+        ))
+
+    def update_balance(self, user_id: str, amount_paid: float, idempotency_key: str = None):
+        """Atomically updates user balance (see apply_payment); returns the new balance."""
+        payment = self.apply_payment(user_id, amount_paid, idempotency_key)
+        return payment["balance"] if payment else None
 
     def set_network_status(self, region: str, status: str):
+        """Stores a region's status and notifies every server's network_cache."""
         if not self.client: return None
-        self.client.set(f"network:{region}", status)
+        with self.client.pipeline() as pipe:
+            pipe.set(f"network:{region}", status)
+            pipe.publish(NETWORK_STATUS_CHANNEL, encode_status_update(region, status))
+            pipe.execute()
+        network_cache.put(region, status)
 
     def get_network_status(self, region: str):
         if not self.client: return "Unknown"
-        return self.client.get(f"network:{region}") or "Unknown"
+        return network_cache.get_or_load(
+            region, lambda: self.client.get(f"network:{region}") or "Unknown"
+        )
+
+    def next_ticket_seq(self):
+        """Allocates a unique, monotonically increasing ticket sequence number."""
+        if not self.client: return None
+        with self._ticket_lock:
+            seq = self._ticket_ids.take()
+            if seq is None:
+                end = self.client.incrby(TICKET_SEQUENCE_KEY, TICKET_ID_BLOCK_SIZE)
+                self._ticket_ids.refill(end, TICKET_ID_BLOCK_SIZE)
+                seq = self._ticket_ids.take()
+            return seq
 
     def create_ticket(self, user_id: str, reason: str, ticket_id: str):
-        """Creates a support ticket in Redis."""
+        """Creates a support ticket in Redis (one MULTI/EXEC round-trip)."""
         if not self.client: return False
-        
-        ticket_data = {
-            "ticket_id": ticket_id,
-            "user_id": user_id,
-            "reason": reason,
-            "status": "OPEN",
-            "created_at": time.time()
-        }
-        
-        # Store ticket details
-        self.client.set(f"ticket:{ticket_id}", json.dumps(ticket_data))
-        
-        # Add to global list of open tickets
-        self.client.rpush("tickets:open", ticket_id)
-        
-        # Add to user's ticket list
-        self.client.rpush(f"tickets:user:{user_id}", ticket_id)
-        
+
+        with self.client.pipeline(transaction=True) as pipe:
+            # Store ticket details
+            pipe.set(f"ticket:{ticket_id}", _ticket_data(user_id, reason, ticket_id))
+            # Add to global list of open tickets
+            pipe.rpush("tickets:open", ticket_id)
+            # Add to user's ticket list
+            pipe.rpush(f"tickets:user:{user_id}", ticket_id)
+            pipe.execute()
+
         return True
 
-# Global DB Instance
+class AsyncRedisDatabase:
+    """asyncio counterpart of RedisDatabase backed by a bounded connection pool."""
+
+    def __init__(self, client=None):
+        if client is None:
+            redis_url = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+            # Connections are opened lazily on first use, inside the running loop
+            pool = aioredis.BlockingConnectionPool.from_url(
+                redis_url,
+                decode_responses=True,
+                max_connections=REDIS_MAX_CONNECTIONS,
+                timeout=REDIS_POOL_TIMEOUT,
+                socket_timeout=REDIS_SOCKET_TIMEOUT,
+                socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+                health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+                **counting_connection(redis_url, is_async=True)
+            )
+            client = aioredis.Redis(connection_pool=pool)
+        self.client = client
+        self._update_balance = self.client.register_script(UPDATE_BALANCE_LUA)
+        self._ticket_ids = _IdBlock()
+        self._ticket_lock = asyncio.Lock()
+
+    async def ping(self) -> bool:
+        try:
+            return await self.client.ping()
+        except redis.RedisError as e:
+            logger.warning(f"Redis health check failed: {e}")
+            return False
+
+    async def get_user(self, user_id: str, fields=None):
+        """Reads a user profile (see RedisDatabase.get_user)."""
+        key = f"user:{user_id}"
+        try:
+            if fields:
+                names = _profile_fields(fields)
+                return _decode_profile(names, await self.client.hmget(key, names))
+            data = await self.client.hgetall(key)
+            return _decode_profile(data.keys(), data.values())
+        except redis.ResponseError as e:
+            if not _is_wrong_type(e):
+                raise
+            return _decode_legacy_profile(await self.client.get(key), fields)
+
+    async def apply_payment(self, user_id: str, amount_paid: float, idempotency_key: str = None,
+                            transaction_id: str = None):
+        """Atomically debits a payment (see RedisDatabase.apply_payment)."""
+        return _payment_result(await self._update_balance(
+            keys=_balance_keys(user_id, idempotency_key),
+            args=_payment_args(amount_paid, transaction_id)
+        ))
+
+    async def update_balance(self, user_id: str, amount_paid: float, idempotency_key: str = None):
+        """Atomically updates user balance (see RedisDatabase.update_balance)."""
+        payment = await self.apply_payment(user_id, amount_paid, idempotency_key)
+        return payment["balance"] if payment else None
+
+    async def set_network_status(self, region: str, status: str):
+        """Stores a region's status and notifies every server's network_cache."""
+        async with self.client.pipeline() as pipe:
+            pipe.set(f"network:{region}", status)
+            pipe.publish(NETWORK_STATUS_CHANNEL, encode_status_update(region, status))
+            await pipe.execute()
+        network_cache.put(region, status)
+
+    async def get_network_status(self, region: str):
+        async def _load():
+            return await self.client.get(f"network:{region}") or "Unknown"
+        return await network_cache.aget_or_load(region, _load)
+
+    async def next_ticket_seq(self):
+        """Allocates a unique, monotonically increasing ticket sequence number."""
+        async with self._ticket_lock:
+            seq = self._ticket_ids.take()
+            if seq is None:
+                end = await self.client.incrby(TICKET_SEQUENCE_KEY, TICKET_ID_BLOCK_SIZE)
+                self._ticket_ids.refill(end, TICKET_ID_BLOCK_SIZE)
+                seq = self._ticket_ids.take()
+            return seq
+
+    async def create_ticket(self, user_id: str, reason: str, ticket_id: str):
+        """Creates a support ticket in Redis (one MULTI/EXEC round-trip)."""
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.set(f"ticket:{ticket_id}", _ticket_data(user_id, reason, ticket_id))
+            pipe.rpush("tickets:open", ticket_id)
+            pipe.rpush(f"tickets:user:{user_id}", ticket_id)
+            await pipe.execute()
+
+        return True
+
+    async def close(self):
+        await self.client.aclose()
+
+# Global DB Instances
 db = RedisDatabase()
+async_db = AsyncRedisDatabase()
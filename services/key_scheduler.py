@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("KeyScheduler")
+
+# --- API Key Pool Settings ---
+# Expects CSV string: "key1,key2,key3" (falls back to GOOGLE_API_KEY)
+API_KEYS = [k.strip() for k in os.environ.get("GOOGLE_API_KEYS", "").split(",") if k.strip()]
+if not API_KEYS and os.environ.get("GOOGLE_API_KEY"):
+    API_KEYS.append(os.environ["GOOGLE_API_KEY"])
+# Per-key request budget (token bucket refill rate) and burst size
+API_KEY_RPM = float(os.environ.get("API_KEY_RPM", "15"))
+API_KEY_BURST = int(os.environ.get("API_KEY_BURST", str(int(API_KEY_RPM))))
+# A key answering 429 / RESOURCE_EXHAUSTED is skipped for this long
+API_KEY_COOLDOWN_SECONDS = float(os.environ.get("API_KEY_COOLDOWN_SECONDS", "30"))
+# Longest a model call waits for any key to have budget before failing
+API_KEY_WAIT_SECONDS = float(os.environ.get("API_KEY_WAIT_SECONDS", "5"))
+
+
+class NoApiKeyAvailable(RuntimeError):
+    """Every key is cooling down or out of budget for longer than the wait limit."""
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self, now: float) -> float:
+        self._refill(now)
+        return self.tokens
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until one token is available."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+
+class _KeyState:
+    def __init__(self, key: str, rpm: float, burst: int):
+        self.key = key
+        self.bucket = TokenBucket(rpm / 60.0, burst)
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.stats = Counter()
+
+
+class ApiKeyScheduler:
+    """
+    Hands out Gemini API keys per model call.
+    Picks the least-loaded key that has budget and is not cooling down after a
+    429; waits (bounded) when every key is exhausted.
+    """
+
+    def __init__(self, keys=None, rpm: float = API_KEY_RPM, burst: int = API_KEY_BURST,
+                 cooldown: float = API_KEY_COOLDOWN_SECONDS, max_wait: float = API_KEY_WAIT_SECONDS):
+        self.cooldown = cooldown
+        self.max_wait = max_wait
+        self._keys = [_KeyState(k, rpm, burst) for k in (API_KEYS if keys is None else keys)]
+        self._lock = threading.Lock()
+        # Calls that had to wait for budget, and calls that gave up
+        self.stats = Counter()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _try_acquire(self, now: float):
+        """Returns (key state, 0) on success, or (None, seconds until a key may free up)."""
+        with self._lock:
+            ready = [s for s in self._keys if s.cooldown_until <= now and s.bucket.available(now) >= 1]
+            if ready:
+                state = min(ready, key=lambda s: (s.in_flight, -s.bucket.available(now)))
+                state.bucket.take(now)
+                state.in_flight += 1
+                state.stats["requests"] += 1
+                return state, 0.0
+            return None, min(
+                max(s.cooldown_until - now, s.bucket.wait_time(now)) for s in self._keys
+            )
+
+    @asynccontextmanager
+    async def lease(self):
+        """Yields a key for one model call, or None when no keys are configured."""
+        if not self._keys:
+            yield None
+            return
+
+        deadline = time.monotonic() + self.max_wait
+        waited = False
+        while True:
+            now = time.monotonic()
+            state, retry_in = self._try_acquire(now)
+            if state:
+                break
+            if not waited:
+                waited = True
+                self.stats["waited"] += 1
+            if now + retry_in > deadline:
+                self.stats["rejected"] += 1
+                raise NoApiKeyAvailable(f"No API key has budget within {self.max_wait}s")
+            await asyncio.sleep(retry_in)
+
+        try:
+            yield state.key
+        finally:
+            with self._lock:
+                state.in_flight -= 1
+
+    def report_rate_limited(self, key: str, retry_after: float = None):
+        """Puts a key on cooldown after the API answered 429 / RESOURCE_EXHAUSTED."""
+        with self._lock:
+            for state in self._keys:
+                if state.key == key:
+                    state.cooldown_until = time.monotonic() + (retry_after or self.cooldown)
+                    state.stats["rate_limited"] += 1
+                    logger.warning(f"API key ...{key[-4:]} rate limited; cooling down")
+
+    def metrics(self) -> dict:
+        """Per-key usage and throttling (keys shown by their last 4 characters)."""
+        now = time.monotonic()
+        with self._lock:
+            keys = {
+                f"...{s.key[-4:]}": {
+                    "requests": s.stats["requests"],
+                    "rate_limited": s.stats["rate_limited"],
+                    "in_flight": s.in_flight,
+                    "tokens": round(s.bucket.available(now), 2),
+                    "cooling_down": s.cooldown_until > now,
+                }
+                for s in self._keys
+            }
+        return {"keys": keys, "waited": self.stats["waited"], "rejected": self.stats["rejected"]}
+
+
+# Global Scheduler Instance
+key_scheduler = ApiKeyScheduler()
@@ -0,0 +1,243 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from logging.handlers import QueueHandler, RotatingFileHandler
+
+from dotenv import load_dotenv
+
+from utils.context import get_trace_span
+
+load_dotenv()
+
+# --- Logging Settings ---
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+# Rotated log file; "" writes to stdout only
+LOG_FILE = os.environ.get("LOG_FILE", "server.log")
+# "json": one structured record per line; "text": the classic console format
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json").lower()
+LOG_MAX_BYTES = int(os.environ.get("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.environ.get("LOG_BACKUP_COUNT", "5"))
+# Records buffered for the writer thread; when full, new records are dropped (and counted)
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+# The writer wakes every LOG_FLUSH_INTERVAL seconds and writes up to LOG_BATCH_SIZE records per write()
+LOG_BATCH_SIZE = int(os.environ.get("LOG_BATCH_SIZE", "256"))
+LOG_FLUSH_INTERVAL = float(os.environ.get("LOG_FLUSH_INTERVAL", "0.2"))
+# Share of calls whose per-turn INFO logs are kept (1 = all, the default; 0 = none)
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", "1.0"))
+
+# Pass as extra= on chatty per-turn lines so they are sampled
+VERBOSE = {"verbose": True}
+
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "verbose", "call_sid"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; fields passed via extra= are kept."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "call_sid", None):
+            entry["call_sid"] = record.call_sid
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class CallSampler(logging.Filter):
+    """
+    Tags records with the current CallSid and keeps VERBOSE records for a
+    fixed share of calls, so a sampled call's turns are logged in full.
+    Records outside a call (no CallSid) are always kept.
+    """
+
+    def __init__(self, rate: float = LOG_SAMPLE_RATE):
+        super().__init__()
+        self.rate = rate
+
+    def _keeps(self, call_sid: str) -> bool:
+        if call_sid is None:
+            return True
+        return int(hashlib.md5(call_sid.encode("utf-8")).hexdigest()[:8], 16) < self.rate * 0x100000000
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        span = get_trace_span()
+        record.call_sid = span.call_sid if span is not None else None
+        if getattr(record, "verbose", False) and record.levelno < logging.WARNING:
+            return self._keeps(record.call_sid)
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Enqueues without ever waiting; a full queue drops the record."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message (and traceback) now: args may change once the caller moves on
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class StdoutHandler(logging.StreamHandler):
+    """Writes to whatever sys.stdout is at write time (it may be swapped after setup)."""
+
+    def __init__(self):
+        super().__init__(sys.stdout)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class BatchWriter:
+    """Writes a batch of records to a stream or rotating file with one write() and flush()."""
+
+    def __init__(self, handler: logging.StreamHandler):
+        self.handler = handler
+
+    def write(self, records):
+        handler = self.handler
+        text = "".join(handler.format(r) + handler.terminator for r in records)
+        handler.acquire()
+        try:
+            if isinstance(handler, RotatingFileHandler):
+                if handler.stream is None:
+                    handler.stream = handler._open()
+                size = handler.stream.tell()
+                if handler.maxBytes and size and size + len(text) >= handler.maxBytes:
+                    handler.doRollover()
+                    if handler.stream is None:  # delay=True leaves it closed
+                        handler.stream = handler._open()
+            handler.stream.write(text)
+            handler.stream.flush()
+        except Exception:
+            handler.handleError(records[-1])
+        finally:
+            handler.release()
+
+    def close(self):
+        self.handler.close()
+
+
+class LogPipeline:
+    """
+    Logging off the request path: callers only enqueue; one writer thread
+    formats and writes records in batches.
+    """
+
+    def __init__(self, writers, queue_size: int = LOG_QUEUE_SIZE, batch_size: int = LOG_BATCH_SIZE,
+                 flush_interval: float = LOG_FLUSH_INTERVAL, sample_rate: float = LOG_SAMPLE_RATE):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.handler = NonBlockingQueueHandler(self.queue)
+        self.handler.addFilter(CallSampler(sample_rate))
+        self.writers = list(writers)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.batches = 0
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _drain(self) -> list:
+        batch = []
+        try:
+            while len(batch) < self.batch_size:
+                batch.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write(self, batch: list):
+        self.batches += 1
+        for writer in self.writers:
+            writer.write(batch)
+
+    def _run(self):
+        # Wakes on a timer rather than per record, so a busy loop is not
+        # interrupted for every line and each wake-up writes a full batch
+        stopping = False
+        while not stopping:
+            stopping = self._stopping.wait(self.flush_interval)
+            while batch := self._drain():
+                self._write(batch)
+
+    def stop(self):
+        if self._thread.is_alive():
+            self._stopping.set()
+            self._thread.join()
+        for writer in self.writers:
+            writer.close()
+
+
+_pipeline = None
+
+
+def setup_logging(level: str = LOG_LEVEL, log_file: str = LOG_FILE, log_format: str = LOG_FORMAT,
+                  stream=None, **pipeline_options) -> LogPipeline:
+    """Routes the root logger through a LogPipeline (replacing any earlier setup)."""
+    global _pipeline
+    shutdown_logging()
+
+    formatter = JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler(stream) if stream else StdoutHandler()]
+    if log_file:
+        handlers.append(RotatingFileHandler(log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+                                            encoding="utf-8", delay=True))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    _pipeline = LogPipeline([BatchWriter(h) for h in handlers], **pipeline_options).start()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_pipeline.handler)
+    root.setLevel(level)
+    return _pipeline
+
+
+def shutdown_logging():
+    """Flushes queued records and stops the writer thread."""
+    global _pipeline
+    if _pipeline is None:
+        return
+    logging.getLogger().removeHandler(_pipeline.handler)
+    _pipeline.stop()
+    _pipeline = None
+
+
+atexit.register(shutdown_logging)
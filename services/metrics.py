@@ -0,0 +1,179 @@
+import bisect
+import inspect
+import threading
+
+# Seconds; covers a Redis read up to a slow multi-hop agent turn
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                     for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _ShardedMetric:
+    """
+    Each thread writes only to its own shard (a plain dict), so the hot path
+    takes no lock; a scrape sums the shards.
+    """
+    type = None
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:  # once per thread
+                self._shards.append(shard)
+        return shard
+
+    def _snapshots(self):
+        with self._shards_lock:
+            shards = list(self._shards)
+        # dict.copy() is atomic under the GIL, so a writer cannot break the iteration
+        return [shard.copy() for shard in shards]
+
+
+class Counter(_ShardedMetric):
+    type = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def values(self) -> dict:
+        totals = {}
+        for snapshot in self._snapshots():
+            for labels, value in snapshot.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def render(self) -> list:
+        return [f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in sorted(self.values().items())]
+
+
+class Gauge(Counter):
+    """Up/down value (e.g. tasks in flight), sharded like Counter."""
+    type = "gauge"
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_ShardedMetric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        shard = self._shard()
+        state = shard.get(labels)
+        if state is None:
+            # [per-bucket counts (+Inf last), sum]; a scrape may see one observation half-applied
+            state = shard[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    def render(self) -> list:
+        merged = {}
+        for snapshot in self._snapshots():
+            for labels, (counts, total) in snapshot.items():
+                acc = merged.setdefault(labels, [[0] * len(counts), 0.0])
+                acc[0] = [a + b for a, b in zip(acc[0], counts)]
+                acc[1] += total
+
+        lines = []
+        for labels, (counts, total) in sorted(merged.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames + ('le',), labels + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class CallbackMetric:
+    """Value read from elsewhere at scrape time (sync or async callable)."""
+
+    def __init__(self, name: str, help: str, type: str, fn, labelname: str = None):
+        self.name = name
+        self.help = help
+        self.type = type
+        self.fn = fn
+        self.labelname = labelname
+
+    async def collect(self) -> list:
+        value = self.fn()
+        if inspect.isawaitable(value):
+            value = await value
+        if self.labelname is None:
+            return [f"{self.name} {value}"]
+        return [f"{self.name}{_labels((self.labelname,), (k,))} {v}" for k, v in sorted(value.items())]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def callback(self, name, help, type, fn, labelname=None) -> CallbackMetric:
+        return self.register(CallbackMetric(name, help, type, fn, labelname))
+
+    async def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            try:
+                samples = await metric.collect() if isinstance(metric, CallbackMetric) else metric.render()
+            except Exception as e:
+                lines.append(f"# {metric.name} unavailable: {type(e).__name__}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+# Global Registry + hot-path metrics
+metrics = MetricsRegistry()
+
+TURN_DURATION = metrics.histogram(
+    "voice_turn_duration_seconds", "Agent turn latency by the agent the turn started at", ("agent",))
+TOOL_CALLS = metrics.counter("voice_tool_calls_total", "Tool function calls", ("tool",))
+TOOL_DURATION = metrics.histogram("voice_tool_duration_seconds", "Tool function latency", ("tool",))
+REDIS_ROUND_TRIPS = metrics.counter("voice_redis_round_trips_total", "Commands/pipelines sent to Redis")
+GOODBYE_FAST_PATH = metrics.counter("voice_goodbye_fast_path_total", "Calls ended by the goodbye check without an LLM turn")
+BACKGROUND_TURNS = metrics.gauge("voice_background_turns", "Async agent turns scheduled and not yet finished")
+PROMPT_HISTORY_TOKENS = metrics.histogram(
+    "voice_prompt_history_tokens", "Estimated tokens of conversation sent with each model call", ("agent",),
+    buckets=(100, 250, 500, 1000, 2000, 4000, 8000, 16000))
+CONTEXT_COMPACTIONS = metrics.counter(
+    "voice_context_compactions_total", "Times older turns were folded into the call summary")
+PROMPT_CACHE_REQUESTS = metrics.counter(
+    "voice_prompt_cache_requests_total", "Model requests by explicit prompt cache result", ("result",))
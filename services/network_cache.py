@@ -0,0 +1,137 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+
+import redis
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("NetworkCache")
+
+# Upper bound on how stale a region status may be if a pub/sub update is missed
+NETWORK_CACHE_TTL_SECONDS = float(os.environ.get("NETWORK_CACHE_TTL_SECONDS", "10"))
+# Channel set_network_status publishes on
+NETWORK_STATUS_CHANNEL = os.environ.get("NETWORK_STATUS_CHANNEL", "network:status")
+
+
+def encode_status_update(region: str, status: str) -> str:
+    return json.dumps({"region": region, "status": status})
+
+
+class NetworkStatusCache:
+    """
+    Process-wide region -> status cache.
+    Entries expire after `ttl`; a Redis pub/sub listener overwrites them as soon
+    as set_network_status publishes, so outage storms are answered from memory.
+    """
+
+    def __init__(self, ttl: float = NETWORK_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.updates = 0
+        self._entries = {}
+        self._inflight = {}
+        # Bumped by every write (per region) and by clear() (all regions), so a
+        # load that raced a pub/sub update doesn't overwrite it with what it read
+        self._generations = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def get(self, region: str):
+        with self._lock:
+            entry = self._entries.get(region)
+            if entry is not None and entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def put(self, region: str, status: str):
+        with self._lock:
+            self._entries[region] = (status, time.monotonic() + self.ttl)
+            self._generations[region] = self._generations.get(region, 0) + 1
+
+    def generation(self, region: str) -> tuple:
+        with self._lock:
+            return self._epoch, self._generations.get(region, 0)
+
+    def put_if_unchanged(self, region: str, status: str, generation: tuple) -> bool:
+        """Caches a loaded status unless the region was written since `generation`."""
+        with self._lock:
+            if (self._epoch, self._generations.get(region, 0)) != generation:
+                return False
+            self._entries[region] = (status, time.monotonic() + self.ttl)
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._epoch += 1
+
+    def apply_update(self, payload: str):
+        """Applies a message published by set_network_status."""
+        try:
+            update = json.loads(payload)
+            self.put(update["region"], update["status"])
+            self.updates += 1
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring malformed network status update {payload!r}: {e}")
+
+    def get_or_load(self, region: str, loader):
+        status = self.get(region)
+        if status is None:
+            generation = self.generation(region)
+            status = loader()
+            self.put_if_unchanged(region, status, generation)
+        return status
+
+    async def aget_or_load(self, region: str, loader):
+        status = self.get(region)
+        if status is not None:
+            return status
+
+        # A spike of callers from one region shares a single Redis read
+        pending = self._inflight.get(region)
+        if pending is None:
+            generation = self.generation(region)
+            pending = asyncio.ensure_future(loader())
+            self._inflight[region] = pending
+
+            def _settle(done):
+                self._inflight.pop(region, None)
+                if not done.cancelled() and done.exception() is None:
+                    self.put_if_unchanged(region, done.result(), generation)
+
+            pending.add_done_callback(_settle)
+        return await asyncio.shield(pending)
+
+    async def listen(self, client, channel: str = NETWORK_STATUS_CHANNEL, retry_delay: float = 1.0):
+        """Keeps the cache in sync with published status changes until cancelled."""
+        while True:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(channel)
+                logger.info(f"Listening for network status updates on '{channel}'")
+                async for message in pubsub.listen():
+                    self.apply_update(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Updates may have been missed while disconnected
+                if isinstance(e, redis.RedisError):
+                    logger.warning(f"Network status listener lost Redis: {e}")
+                else:
+                    logger.exception("Network status listener failed; resubscribing")
+                self.clear()
+                await asyncio.sleep(retry_delay)
+            finally:
+                await pubsub.aclose()
+
+
+# Global Cache Instance
+network_cache = NetworkStatusCache()
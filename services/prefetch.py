@@ -0,0 +1,108 @@
+import os
+import time
+import asyncio
+import logging
+from collections import Counter
+
+from dotenv import load_dotenv
+
+from services.call_cache import (
+    call_caches, CachedDatabase, AsyncCachedDatabase, user_cache_key, network_cache_key
+)
+from services.database import db, async_db, REDIS_CLIENT_MODE
+
+load_dotenv()
+
+logger = logging.getLogger("Prefetch")
+
+# Start fetching what the likely tools need while the filler is playing
+SPECULATIVE_PREFETCH = os.environ.get("SPECULATIVE_PREFETCH", "1") == "1"
+
+# Intents whose tools read the caller's profile (and, for network, the region status)
+PREFETCH_INTENTS = {"billing", "network"}
+
+
+class Prefetcher:
+    """
+    Speculatively loads a caller's profile / regional network status into the
+    call's CallCache during the filler phase of /gather_speech, so the agent's
+    tool calls in /process_speech are served from memory.
+    """
+
+    def __init__(self, registry=call_caches, mode: str = REDIS_CLIENT_MODE):
+        self.registry = registry
+        self.mode = mode
+        self.stats = Counter()
+        self._pending = {}
+
+    def start(self, call_key: str, user_id: str, intent: str):
+        if intent not in PREFETCH_INTENTS:
+            return None
+        # A newer utterance supersedes the previous speculation for this call
+        self._cancel(call_key)
+        self._purge()
+
+        cache = self.registry.for_call(call_key)
+        keys = {user_cache_key(user_id)}
+        task = asyncio.create_task(self._prefetch(cache, keys, user_id, intent))
+        self._pending[call_key] = (task, cache, keys)
+        self.stats["started"] += 1
+        return task
+
+    async def _prefetch(self, cache, keys: set, user_id: str, intent: str):
+        try:
+            if self.mode == "async":
+                view = AsyncCachedDatabase(async_db, cache)
+                profile = await view.get_user(user_id)
+                if intent == "network" and profile:
+                    region = profile.get("region", "Unknown")
+                    keys.add(network_cache_key(region))
+                    await view.get_network_status(region)
+            else:
+                view = CachedDatabase(db, cache)
+                profile = await asyncio.to_thread(view.get_user, user_id)
+                if intent == "network" and profile:
+                    region = profile.get("region", "Unknown")
+                    keys.add(network_cache_key(region))
+                    await asyncio.to_thread(view.get_network_status, region)
+            self.stats["completed"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Speculation only: the tools will simply fetch for themselves
+            self.stats["failed"] += 1
+            logger.warning(f"Prefetch for {user_id} failed: {e}")
+
+    def _cancel(self, call_key: str):
+        pending = self._pending.pop(call_key, None)
+        if pending and not pending[0].done():
+            pending[0].cancel()
+            self.stats["cancelled"] += 1
+
+    def _purge(self):
+        # Calls that never reached /process_speech (e.g. the caller hung up)
+        cutoff = time.monotonic() - self.registry.ttl
+        for call_key, (task, cache, keys) in list(self._pending.items()):
+            if task.done() and cache.created_at < cutoff:
+                del self._pending[call_key]
+                self.stats["wasted"] += len(keys)
+
+    def finish(self, call_key: str):
+        """Called when the turn ends: cancels leftovers and scores what was used."""
+        pending = self._pending.pop(call_key, None)
+        if not pending:
+            return
+        task, cache, keys = pending
+        if not task.done():
+            task.cancel()
+            self.stats["cancelled"] += 1
+        used = keys & cache.hit_keys
+        self.stats["used"] += len(used)
+        self.stats["wasted"] += len(keys - used)
+
+    def __len__(self):
+        return len(self._pending)
+
+
+# Global Prefetcher Instance
+prefetcher = Prefetcher()
@@ -0,0 +1,46 @@
+import os
+import re
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- Streaming Settings ---
+# Longest chunk sent to TTS when the agent has not finished a sentence yet
+STREAM_MAX_CHUNK_CHARS = int(os.environ.get("STREAM_MAX_CHUNK_CHARS", "200"))
+
+# Sentence end (with trailing quotes/brackets) followed by whitespace, or a line break.
+# Amounts like "1,245.50" stay whole: the decimal point is not followed by a space.
+_BOUNDARY = re.compile(r"[.!?]+[\"')\]]*\s+|\n+")
+
+
+class SentenceChunker:
+    """
+    Re-cuts streamed agent text into sentence-sized chunks for playback.
+    feed() returns the chunks completed by a fragment; flush() returns the rest.
+    """
+
+    def __init__(self, max_chars: int = STREAM_MAX_CHUNK_CHARS):
+        self.max_chars = max_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> list:
+        self._buffer += text
+        chunks = []
+        while True:
+            match = _BOUNDARY.search(self._buffer)
+            if match and match.start() < self.max_chars:
+                cut = match.end()
+            elif len(self._buffer) > self.max_chars:
+                # No sentence end in sight: break at the last space before the cap
+                cut = self._buffer.rfind(" ", 0, self.max_chars) + 1 or self.max_chars
+            else:
+                break
+            chunk, self._buffer = self._buffer[:cut].strip(), self._buffer[cut:]
+            if chunk:
+                chunks.append(chunk)
+        return chunks
+
+    def flush(self) -> list:
+        chunk, self._buffer = self._buffer.strip(), ""
+        return [chunk] if chunk else []
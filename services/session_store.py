@@ -0,0 +1,362 @@
+import asyncio
+import os
+import time
+import uuid
+import logging
+from typing import Any, Optional
+
+from dotenv import load_dotenv
+from google.adk.events.event import Event
+from google.adk.sessions.base_session_service import (
+    BaseSessionService, GetSessionConfig, ListSessionsResponse
+)
+from google.adk.sessions.in_memory_session_service import InMemorySessionService
+from google.adk.sessions.session import Session
+
+load_dotenv()
+
+logger = logging.getLogger("SessionStore")
+
+# --- Session Settings ---
+# "memory": process-local (single worker, dev/testing)
+# "redis":  shared across uvicorn workers and nodes (AGENT_EXECUTION_MODE=async only:
+#           its asyncio client is bound to the server event loop)
+SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "memory").lower()
+# Sliding expiry for a caller's ADK session and its phone -> session mapping
+SESSION_TTL_SECONDS = int(os.environ.get("SESSION_TTL_SECONDS", "1800"))
+# Input stashed by /gather_speech only has to survive the redirect to /process_speech
+PENDING_INPUT_TTL_SECONDS = int(os.environ.get("PENDING_INPUT_TTL_SECONDS", "120"))
+# Keeps keys of different deployments sharing one Redis apart
+SESSION_KEY_PREFIX = os.environ.get("SESSION_KEY_PREFIX", "voice")
+# Events kept per Redis session; older ones are trimmed so a long call's reads stay bounded
+SESSION_MAX_EVENTS = int(os.environ.get("SESSION_MAX_EVENTS", "200"))
+
+_COMPACT = {"exclude_none": True, "by_alias": True}
+
+
+class RedisSessionService(BaseSessionService):
+    """
+    ADK session service backed by Redis.
+
+    Layout (all keys expire after `ttl` seconds of inactivity):
+      {prefix}:adk:{session_id}          -> session JSON without events
+      {prefix}:adk:{session_id}:events   -> list of event JSON (last `max_events` kept)
+      {prefix}:adk:idx:{app}:{user_id}   -> set of session IDs
+    """
+
+    def __init__(self, client, ttl: int = SESSION_TTL_SECONDS, prefix: str = SESSION_KEY_PREFIX,
+                 max_events: int = SESSION_MAX_EVENTS):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.max_events = max_events
+
+    def _meta_key(self, session_id: str) -> str:
+        return f"{self.prefix}:adk:{session_id}"
+
+    def _events_key(self, session_id: str) -> str:
+        return f"{self.prefix}:adk:{session_id}:events"
+
+    def _index_key(self, app_name: str, user_id: str) -> str:
+        return f"{self.prefix}:adk:idx:{app_name}:{user_id}"
+
+    @staticmethod
+    def _dump_meta(session: Session) -> str:
+        return session.model_dump_json(exclude={"events"}, **_COMPACT)
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session = Session(
+            id=(session_id or "").strip() or str(uuid.uuid4()),
+            app_name=app_name,
+            user_id=user_id,
+            state=state or {},
+            last_update_time=time.time(),
+        )
+        index_key = self._index_key(app_name, user_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.set(self._meta_key(session.id), self._dump_meta(session), ex=self.ttl)
+            pipe.sadd(index_key, session.id)
+            pipe.expire(index_key, self.ttl)
+            await pipe.execute()
+        return session
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        meta_key = self._meta_key(session_id)
+        events_key = self._events_key(session_id)
+        start = 0
+        if config and config.num_recent_events:
+            start = -config.num_recent_events
+
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.get(meta_key)
+            pipe.lrange(events_key, start, -1)
+            # Reading a session counts as activity
+            pipe.expire(meta_key, self.ttl)
+            pipe.expire(events_key, self.ttl)
+            pipe.expire(self._index_key(app_name, user_id), self.ttl)
+            meta, raw_events, *_ = await pipe.execute()
+
+        if not meta:
+            return None
+        session = Session.model_validate_json(meta)
+        if session.app_name != app_name or session.user_id != user_id:
+            return None
+
+        events = [Event.model_validate_json(e) for e in raw_events]
+        if config and config.after_timestamp:
+            events = [e for e in events if e.timestamp >= config.after_timestamp]
+        session.events = events
+        return session
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        session_ids = await self.client.smembers(self._index_key(app_name, user_id))
+        sessions = []
+        for session_id in session_ids:
+            meta = await self.client.get(self._meta_key(session_id))
+            if meta:
+                sessions.append(Session.model_validate_json(meta))
+        return ListSessionsResponse(sessions=sessions)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(self._meta_key(session_id), self._events_key(session_id))
+            pipe.srem(self._index_key(app_name, user_id), session_id)
+            await pipe.execute()
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        await super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+
+        meta_key = self._meta_key(session.id)
+        events_key = self._events_key(session.id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            # Meta is small (ids + state), so rewrite it; events are only appended
+            pipe.set(meta_key, self._dump_meta(session), ex=self.ttl)
+            pipe.rpush(events_key, event.model_dump_json(**_COMPACT))
+            pipe.ltrim(events_key, -self.max_events, -1)
+            pipe.expire(events_key, self.ttl)
+            await pipe.execute()
+        return event
+
+
+class InMemoryCallStore:
+    """
+    Phone -> session mapping, pending-input stash and turn results for a single process, with TTLs.
+
+    When a mapping expires its ADK session is deleted from `session_service`, so the
+    in-memory session service doesn't keep every caller's history for the process lifetime.
+    """
+
+    def __init__(self, session_ttl: int = SESSION_TTL_SECONDS,
+                 pending_ttl: int = PENDING_INPUT_TTL_SECONDS,
+                 session_service: Optional[BaseSessionService] = None, app_name: str = "voice-agent"):
+        self.session_ttl = session_ttl
+        self.pending_ttl = pending_ttl
+        self.session_service = session_service
+        self.app_name = app_name
+        self._sessions = {}
+        self._pending = {}
+        self._results = {}
+        self._result_events = {}
+
+    @staticmethod
+    def _get(table: dict, key: str):
+        entry = table.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            table.pop(key, None)
+            return None
+        return value
+
+    @staticmethod
+    def _purge(table: dict):
+        now = time.monotonic()
+        for key in [k for k, (_, exp) in table.items() if exp <= now]:
+            table.pop(key, None)
+
+    async def _drop_session(self, user_id: str, session_id: str):
+        if self.session_service is not None:
+            await self.session_service.delete_session(
+                app_name=self.app_name, user_id=user_id, session_id=session_id
+            )
+
+    async def _sweep_sessions(self):
+        """Removes expired mappings together with their ADK sessions."""
+        now = time.monotonic()
+        expired = [(k, sid) for k, (sid, exp) in self._sessions.items() if exp <= now]
+        for user_id, session_id in expired:
+            self._sessions.pop(user_id, None)
+            await self._drop_session(user_id, session_id)
+
+    async def get_session_id(self, user_id: str) -> Optional[str]:
+        entry = self._sessions.get(user_id)
+        if entry is None:
+            return None
+        session_id, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._sessions.pop(user_id, None)
+            await self._drop_session(user_id, session_id)
+            return None
+        self._sessions[user_id] = (session_id, time.monotonic() + self.session_ttl)
+        return session_id
+
+    async def set_session_id(self, user_id: str, session_id: str):
+        await self._sweep_sessions()
+        previous = self._sessions.get(user_id)
+        self._sessions[user_id] = (session_id, time.monotonic() + self.session_ttl)
+        if previous is not None and previous[0] != session_id:
+            await self._drop_session(user_id, previous[0])
+
+    async def stash_input(self, user_id: str, text: str):
+        self._purge(self._pending)
+        self._pending[user_id] = (text, time.monotonic() + self.pending_ttl)
+
+    async def pop_input(self, user_id: str) -> Optional[str]:
+        text = self._get(self._pending, user_id)
+        self._pending.pop(user_id, None)
+        return text
+
+    async def publish_result(self, turn_id: str, text: str):
+        self._purge(self._results)
+        self._results[turn_id] = (text, time.monotonic() + self.pending_ttl)
+        event = self._result_events.pop(turn_id, None)
+        if event:
+            event.set()
+
+    async def wait_result(self, turn_id: str, timeout: float) -> Optional[str]:
+        """Pops the turn's agent reply, waiting up to `timeout` seconds for it."""
+        text = self._get(self._results, turn_id)
+        if text is None and timeout > 0:
+            event = self._result_events.setdefault(turn_id, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                self._result_events.pop(turn_id, None)
+            text = self._get(self._results, turn_id)
+        self._results.pop(turn_id, None)
+        return text
+
+    async def count_sessions(self) -> int:
+        # Runs on every /metrics scrape, which doubles as the periodic sweep
+        await self._sweep_sessions()
+        return len(self._sessions)
+
+    async def count_pending(self) -> int:
+        self._purge(self._pending)
+        return len(self._pending)
+
+
+class RedisCallStore:
+    """
+    Phone -> session mapping, pending-input stash and turn results shared through Redis.
+
+    Live callers and stashed inputs are also tracked in sorted sets scored by expiry time
+    ({prefix}:callers, {prefix}:pendings), so /metrics counts them without scanning the keyspace.
+    """
+
+    def __init__(self, client, session_ttl: int = SESSION_TTL_SECONDS,
+                 pending_ttl: int = PENDING_INPUT_TTL_SECONDS, prefix: str = SESSION_KEY_PREFIX):
+        self.client = client
+        self.session_ttl = session_ttl
+        self.pending_ttl = pending_ttl
+        self.prefix = prefix
+
+    async def get_session_id(self, user_id: str) -> Optional[str]:
+        async with self.client.pipeline(transaction=False) as pipe:
+            # GETEX refreshes the sliding expiry in the same round-trip
+            pipe.getex(f"{self.prefix}:caller:{user_id}", ex=self.session_ttl)
+            pipe.zadd(f"{self.prefix}:callers", {user_id: time.time() + self.session_ttl}, xx=True)
+            session_id, _ = await pipe.execute()
+        return session_id
+
+    async def set_session_id(self, user_id: str, session_id: str):
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(f"{self.prefix}:caller:{user_id}", session_id, ex=self.session_ttl)
+            pipe.zadd(f"{self.prefix}:callers", {user_id: time.time() + self.session_ttl})
+            await pipe.execute()
+
+    async def stash_input(self, user_id: str, text: str):
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(f"{self.prefix}:pending:{user_id}", text, ex=self.pending_ttl)
+            pipe.zadd(f"{self.prefix}:pendings", {user_id: time.time() + self.pending_ttl})
+            await pipe.execute()
+
+    async def pop_input(self, user_id: str) -> Optional[str]:
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.getdel(f"{self.prefix}:pending:{user_id}")
+            pipe.zrem(f"{self.prefix}:pendings", user_id)
+            text, _ = await pipe.execute()
+        return text
+
+    async def publish_result(self, turn_id: str, text: str):
+        # The key covers a poller that is between long-polls; the message wakes a waiting one
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.set(f"{self.prefix}:result:{turn_id}", text, ex=self.pending_ttl)
+            pipe.publish(f"{self.prefix}:result:{turn_id}", "ready")
+            await pipe.execute()
+
+    async def wait_result(self, turn_id: str, timeout: float) -> Optional[str]:
+        """Pops the turn's agent reply, waiting up to `timeout` seconds for it."""
+        key = f"{self.prefix}:result:{turn_id}"
+        pubsub = self.client.pubsub()
+        try:
+            # Subscribe before checking the key so a result published in between is not missed
+            await pubsub.subscribe(key)
+            text = await self.client.getdel(key)
+            deadline = time.monotonic() + timeout
+            while text is None and time.monotonic() < deadline:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=max(0.0, deadline - time.monotonic())
+                )
+                if message:
+                    text = await self.client.getdel(key)
+            return text
+        finally:
+            await pubsub.aclose()
+
+    async def _count(self, tracked_key: str) -> int:
+        # Drop members whose key has expired, then count the rest
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.zremrangebyscore(tracked_key, "-inf", time.time())
+            pipe.zcard(tracked_key)
+            _, count = await pipe.execute()
+        return count
+
+    async def count_sessions(self) -> int:
+        return await self._count(f"{self.prefix}:callers")
+
+    async def count_pending(self) -> int:
+        return await self._count(f"{self.prefix}:pendings")
+
+
+def create_session_backend(backend: str = SESSION_BACKEND):
+    """Returns (session_service, call_store) for the configured backend."""
+    if backend == "redis":
+        import redis.asyncio as aioredis
+        from services.database import counting_connection
+        redis_url = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+        client = aioredis.from_url(redis_url, decode_responses=True, **counting_connection(redis_url, is_async=True))
+        logger.info(f"Using Redis session backend at {redis_url}")
+        return RedisSessionService(client), RedisCallStore(client)
+    if backend != "memory":
+        raise ValueError(f"Unknown session backend: {backend}")
+    session_service = InMemorySessionService()
+    return session_service, InMemoryCallStore(session_service=session_service)
@@ -0,0 +1,221 @@
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+from services.metrics import TOOL_CALLS, TOOL_DURATION
+from utils.context import get_trace_span, set_trace_span
+
+load_dotenv()
+
+logger = logging.getLogger("Tracing")
+
+# --- Tracing Settings ---
+TRACING_ENABLED = os.environ.get("TRACING_ENABLED", "true").lower() == "true"
+# Finished spans are appended here in batches, e.g. traces.jsonl ("" keeps only the summary)
+TRACE_EXPORT_PATH = os.environ.get("TRACE_EXPORT_PATH", "")
+# "jsonl": one flat span per line; "otlp": one OTLP/JSON ExportTraceServiceRequest per batch
+TRACE_EXPORT_FORMAT = os.environ.get("TRACE_EXPORT_FORMAT", "jsonl").lower()
+TRACE_BATCH_SIZE = int(os.environ.get("TRACE_BATCH_SIZE", "200"))
+# Recent spans kept per phase for the percentile summary
+TRACE_SUMMARY_WINDOW = int(os.environ.get("TRACE_SUMMARY_WINDOW", "5000"))
+
+
+def trace_id_for(call_sid: str) -> str:
+    """Stable 128-bit trace ID per call, so every turn of a call shares one trace."""
+    return hashlib.md5(str(call_sid).encode("utf-8")).hexdigest()
+
+
+class Span:
+    __slots__ = ("name", "call_sid", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, call_sid: str, parent=None, start_ns: int = None, attributes=None):
+        self.name = name
+        self.call_sid = call_sid
+        self.trace_id = trace_id_for(call_sid)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent is not None and parent.call_sid == call_sid else None
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes or {}
+        self.error = None
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "call_sid": self.call_sid,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+    def to_otlp(self) -> dict:
+        attributes = {"call_sid": self.call_sid, **self.attributes}
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": k, "value": {"stringValue": str(v)}} for k, v in attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class Tracer:
+    """
+    Records spans per CallSid and exports them in batches.
+    The current span travels in a ContextVar, so spans opened inside a turn
+    (Runner events, tools, Twilio updates) nest under it.
+    """
+
+    def __init__(self, enabled: bool = TRACING_ENABLED, path: str = TRACE_EXPORT_PATH,
+                 export_format: str = TRACE_EXPORT_FORMAT, batch_size: int = TRACE_BATCH_SIZE,
+                 window: int = TRACE_SUMMARY_WINDOW):
+        self.enabled = enabled
+        self.path = path
+        self.export_format = export_format
+        self.batch_size = batch_size
+        self._durations = defaultdict(lambda: deque(maxlen=window))
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def _call_sid(self, call_sid):
+        if call_sid:
+            return call_sid
+        parent = get_trace_span()
+        return parent.call_sid if parent is not None else "unknown"
+
+    @contextmanager
+    def span(self, name: str, call_sid: str = None, **attributes):
+        """Times the block as a span (a child of the current span of the same call)."""
+        if not self.enabled:
+            yield None
+            return
+        parent = get_trace_span()
+        span = Span(name, self._call_sid(call_sid), parent, attributes=attributes)
+        # Restore (rather than reset a token) so closing from another context is safe
+        set_trace_span(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            set_trace_span(parent)
+            self._finish(span)
+
+    def record(self, name: str, start_ns: int, end_ns: int = None, call_sid: str = None, **attributes):
+        """Adds an already-timed span, e.g. the wait for one Runner event."""
+        if not self.enabled:
+            return
+        span = Span(name, self._call_sid(call_sid), get_trace_span(), start_ns=start_ns, attributes=attributes)
+        span.end_ns = end_ns or time.time_ns()
+        self._finish(span)
+
+    def _finish(self, span: Span):
+        if span.end_ns is None:
+            span.end_ns = time.time_ns()
+        with self._lock:
+            self._durations[span.name].append(span.duration_ms)
+            if self.path:
+                self._pending.append(span)
+                if len(self._pending) < self.batch_size:
+                    return
+                batch, self._pending = self._pending, []
+            else:
+                return
+        self._export(batch)
+
+    def _export(self, batch):
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                if self.export_format == "otlp":
+                    f.write(json.dumps({"resourceSpans": [{
+                        "resource": {"attributes": [
+                            {"key": "service.name", "value": {"stringValue": "voice-agent"}}
+                        ]},
+                        "scopeSpans": [{"scope": {"name": "voice-agent"},
+                                        "spans": [s.to_otlp() for s in batch]}],
+                    }]}) + "\n")
+                else:
+                    f.writelines(json.dumps(s.to_dict()) + "\n" for s in batch)
+        except OSError as e:
+            logger.warning(f"Failed to export {len(batch)} spans: {e}")
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if batch:
+            self._export(batch)
+
+    def summary(self) -> dict:
+        """p50/p95/p99 (ms) per phase over the recent window."""
+        with self._lock:
+            snapshot = {name: sorted(d) for name, d in self._durations.items() if d}
+
+        def pct(values, p):
+            return round(values[min(len(values) - 1, int(p / 100 * len(values)))], 3)
+
+        return {
+            name: {"count": len(v), "p50": pct(v, 50), "p95": pct(v, 95), "p99": pct(v, 99)}
+            for name, v in sorted(snapshot.items())
+        }
+
+
+# Global Tracer Instance
+tracer = Tracer()
+
+
+def traced_tool(func):
+    """
+    Wraps a tool function in a `tool:<name>` span and counts/times it for
+    /metrics, keeping its name and signature for ADK.
+    """
+    name = f"tool:{func.__name__}"
+    tool = func.__name__
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                with tracer.span(name):
+                    return await func(*args, **kwargs)
+            finally:
+                TOOL_CALLS.inc(tool)
+                TOOL_DURATION.observe(time.perf_counter() - started, tool)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            with tracer.span(name):
+                return func(*args, **kwargs)
+        finally:
+            TOOL_CALLS.inc(tool)
+            TOOL_DURATION.observe(time.perf_counter() - started, tool)
+    return wrapper
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import os
+import random
+from collections import Counter
+from contextlib import asynccontextmanager
+
+import httpx
+from dotenv import load_dotenv
+
+from services.tracing import tracer
+
+load_dotenv()
+
+logger = logging.getLogger("TwilioUpdater")
+
+# --- Twilio REST Settings ---
+TWILIO_ACCOUNT_SID = os.environ.get("TWILIO_ACCOUNT_SID")
+TWILIO_AUTH_TOKEN = os.environ.get("TWILIO_AUTH_TOKEN")
+TWILIO_API_BASE_URL = os.environ.get("TWILIO_API_BASE_URL", "https://api.twilio.com")
+# Shared keep-alive pool for all live-call updates
+TWILIO_HTTP_MAX_CONNECTIONS = int(os.environ.get("TWILIO_HTTP_MAX_CONNECTIONS", "20"))
+TWILIO_HTTP_TIMEOUT = float(os.environ.get("TWILIO_HTTP_TIMEOUT", "5"))
+# Retries after the first attempt, on 5xx / 429 / timeouts / connection errors
+TWILIO_UPDATE_RETRIES = int(os.environ.get("TWILIO_UPDATE_RETRIES", "3"))
+# Full-jitter backoff: sleep uniform(0, base * 2**attempt), capped
+TWILIO_RETRY_BASE_DELAY = float(os.environ.get("TWILIO_RETRY_BASE_DELAY", "0.2"))
+TWILIO_RETRY_MAX_DELAY = float(os.environ.get("TWILIO_RETRY_MAX_DELAY", "2"))
+
+
+class TwilioUpdateError(RuntimeError):
+    """A live-call update failed permanently (4xx) or ran out of retries."""
+
+
+class TwilioCallUpdater:
+    """
+    Non-blocking `calls(sid).update(twiml=...)` over a pooled httpx client.
+    Updates to the same call are applied one at a time, in the order they
+    were submitted; different calls proceed concurrently.
+    """
+
+    def __init__(self, account_sid: str = TWILIO_ACCOUNT_SID, auth_token: str = TWILIO_AUTH_TOKEN,
+                 base_url: str = TWILIO_API_BASE_URL,
+                 max_connections: int = TWILIO_HTTP_MAX_CONNECTIONS,
+                 timeout: float = TWILIO_HTTP_TIMEOUT,
+                 retries: int = TWILIO_UPDATE_RETRIES,
+                 base_delay: float = TWILIO_RETRY_BASE_DELAY,
+                 max_delay: float = TWILIO_RETRY_MAX_DELAY):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = Counter()
+        self._clients = {}  # event loop -> its pooled client
+        self._calls = {}  # call_sid -> (lock, number of queued updates)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.account_sid and self.auth_token)
+
+    def _http(self) -> httpx.AsyncClient:
+        # The pool's connections belong to the loop that opened them, so each loop gets its own
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            for stale in [l for l in self._clients if l.is_closed()]:
+                # Nothing can close it now; close() has to run before the loop ends
+                logger.warning("Dropping a Twilio HTTP client whose event loop closed before close()")
+                del self._clients[stale]
+            client = self._clients[loop] = httpx.AsyncClient(
+                base_url=self.base_url,
+                auth=(self.account_sid, self.auth_token),
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return client
+
+    @asynccontextmanager
+    async def _in_call_order(self, call_sid: str):
+        # asyncio.Lock wakes waiters first-in first-out
+        lock, queued = self._calls.get(call_sid, (None, 0))
+        lock = lock or asyncio.Lock()
+        self._calls[call_sid] = (lock, queued + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, queued = self._calls[call_sid]
+            if queued == 1:
+                del self._calls[call_sid]
+            else:
+                self._calls[call_sid] = (lock, queued - 1)
+
+    async def update(self, call_sid: str, twiml: str) -> dict:
+        """Replaces the live call's TwiML. Raises TwilioUpdateError on failure."""
+        if not self.enabled:
+            raise TwilioUpdateError("Twilio credentials are not configured")
+        async with self._in_call_order(call_sid):
+            with tracer.span("twilio:calls_update", call_sid=call_sid):
+                return await self._post(f"/2010-04-01/Accounts/{self.account_sid}/Calls/{call_sid}.json",
+                                        {"Twiml": twiml})
+
+    async def _post(self, path: str, data: dict) -> dict:
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.stats["retries"] += 1
+                await asyncio.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1))))
+            try:
+                # Re-sending the same TwiML is harmless if a timed-out attempt did land
+                response = await self._http().post(path, data=data)
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {e}"
+                logger.warning(f"Twilio update attempt {attempt + 1} failed: {error}")
+                continue
+
+            if response.status_code < 400:
+                self.stats["ok"] += 1
+                return response.json()
+            error = f"HTTP {response.status_code}: {response.text[:200]}"
+            if response.status_code < 500 and response.status_code != 429:
+                self.stats["failed"] += 1
+                raise TwilioUpdateError(error)
+            logger.warning(f"Twilio update attempt {attempt + 1} failed: {error}")
+
+        self.stats["failed"] += 1
+        raise TwilioUpdateError(f"Gave up after {self.retries + 1} attempts: {error}")
+
+    async def close(self):
+        """Closes every loop's client, each on its own loop (call on shutdown)."""
+        current = asyncio.get_running_loop()
+        clients, self._clients = self._clients, {}
+        for loop, client in clients.items():
+            if loop is current:
+                await client.aclose()
+            elif loop.is_running():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.aclose(), loop))
+            elif not loop.is_closed():
+                logger.warning("Twilio HTTP client left open: its event loop is not running")
+
+
+# Global Updater Instance
+twilio_updater = TwilioCallUpdater()
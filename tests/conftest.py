@@ -0,0 +1,5 @@
+import os
+
+# Importing server sets up logging and tracing; keep test runs from writing files into the tree
+os.environ["LOG_FILE"] = ""
+os.environ["TRACE_EXPORT_PATH"] = ""
@@ -0,0 +1,125 @@
+"""Local stand-ins for Twilio: the ConversationRelay WebSocket client and the REST Calls API."""
+import asyncio
+import contextlib
+import socket
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Recorded call: the caller talks over the first reply and asks something else
+BARGE_IN_CALL = [
+    {"after": 0.0, "message": {"type": "setup", "callSid": "CA-replay", "from": "local_tester"}},
+    {"after": 0.0, "message": {"type": "prompt", "voicePrompt": "Check my balance", "last": True}},
+    {"after": 0.15, "message": {"type": "interrupt", "utteranceUntilInterrupt": "Your balance is",
+                                "durationUntilInterruptMs": 150}},
+    {"after": 0.0, "message": {"type": "prompt", "voicePrompt": "Is the internet down", "last": True}},
+]
+
+
+class FakeConversationRelay:
+    """Drives a Starlette TestClient WebSocket the way Twilio would."""
+
+    def __init__(self, websocket, caller="local_tester", call_sid="CA-test"):
+        self.websocket = websocket
+        self.caller = caller
+        self.call_sid = call_sid
+
+    def setup(self):
+        self.websocket.send_json({"type": "setup", "callSid": self.call_sid, "from": self.caller})
+
+    def say(self, text):
+        """Sends a transcript and collects (arrival_seconds, token) until last=True."""
+        start = time.perf_counter()
+        self.websocket.send_json({"type": "prompt", "voicePrompt": text, "last": True})
+        tokens = []
+        while True:
+            message = self.websocket.receive_json()
+            if message["type"] != "text":
+                continue
+            if message["token"]:
+                tokens.append((time.perf_counter() - start, message["token"]))
+            if message["last"]:
+                return tokens
+
+    def replay(self, script, timeout=5.0):
+        """
+        Sends a recorded script with its original pacing while reading replies.
+        Returns the (sent, received) message log once a reply completes after
+        the last scripted message.
+        """
+        log = []
+        script_done = threading.Event()
+        finished = threading.Event()
+
+        def read():
+            while True:
+                try:
+                    message = self.websocket.receive_json()
+                except Exception:
+                    return
+                log.append(("received", message))
+                if message.get("last") and script_done.is_set():
+                    finished.set()
+                    return
+
+        reader = threading.Thread(target=read, daemon=True)
+        reader.start()
+        for i, step in enumerate(script):
+            time.sleep(step["after"])
+            if i == len(script) - 1:
+                script_done.set()
+            log.append(("sent", step["message"]))
+            self.websocket.send_json(step["message"])
+        finished.wait(timeout)
+        return log
+
+
+class FakeTwilioApi:
+    """
+    Local HTTP stand-in for the Twilio REST Calls API.
+    `faults` is consumed one entry per request: {"delay": seconds, "status": code}.
+    Successful updates are recorded in `applied` as (call_sid, twiml).
+    """
+
+    def __init__(self, faults=None):
+        self.faults = list(faults or [])
+        self.applied = []
+        self.requests = 0
+        self.client_ports = set()
+        self.app = FastAPI()
+
+        @self.app.post("/2010-04-01/Accounts/{account_sid}/Calls/{call_sid}.json")
+        async def update_call(account_sid: str, call_sid: str, request: Request):
+            self.requests += 1
+            self.client_ports.add(request.client.port)
+            fault = self.faults.pop(0) if self.faults else {}
+            if fault.get("delay"):
+                await asyncio.sleep(fault["delay"])
+            status = fault.get("status", 200)
+            if status >= 400:
+                return JSONResponse({"code": status, "message": "injected"}, status_code=status)
+            form = await request.form()
+            self.applied.append((call_sid, form["Twiml"]))
+            return JSONResponse({"sid": call_sid, "status": "in-progress"})
+
+    def serve(self):
+        """Context manager: runs the stand-in on a free local port, yields its base URL."""
+        @contextlib.contextmanager
+        def running():
+            sock = socket.socket()
+            sock.bind(("127.0.0.1", 0))
+            server = uvicorn.Server(uvicorn.Config(self.app, log_level="warning"))
+            thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+            thread.start()
+            while not server.started:
+                time.sleep(0.01)
+            try:
+                yield f"http://127.0.0.1:{sock.getsockname()[1]}"
+            finally:
+                server.should_exit = True
+                thread.join(5)
+
+        return running()
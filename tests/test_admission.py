@@ -0,0 +1,148 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+import server
+from agents.agent_factory import RunnerPool
+from services.admission import AdmissionController, AdmissionRejected
+
+
+def test_bounded_queue_sheds_overflow():
+    controller = AdmissionController(max_concurrent=2, max_per_tenant=10, queue_depth=1, queue_timeout=1)
+
+    async def scenario():
+        await controller.acquire()
+        await controller.acquire()
+        waiting = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as shed:
+            await controller.acquire()
+        depth = controller.metrics()["queue_depth"]
+        controller.release()
+        await waiting
+        return shed.value.reason, depth
+
+    reason, depth = asyncio.run(scenario())
+    assert reason == "queue_full"
+    assert depth == 1
+    metrics = controller.metrics()
+    assert metrics["active"] == 2
+    assert metrics["queue_depth"] == 0
+    assert metrics["shed_queue_full"] == 1
+
+
+def test_queue_wait_times_out():
+    controller = AdmissionController(max_concurrent=1, queue_depth=5, queue_timeout=0.05)
+
+    async def scenario():
+        await controller.acquire()
+        with pytest.raises(AdmissionRejected, match="timeout"):
+            await controller.acquire()
+
+    asyncio.run(scenario())
+    assert controller.metrics()["shed_timeout"] == 1
+    assert controller.metrics()["queue_depth"] == 0
+
+
+def test_busy_tenant_does_not_block_others():
+    controller = AdmissionController(max_concurrent=4, max_per_tenant=1, queue_depth=5, queue_timeout=1)
+
+    async def scenario():
+        await controller.acquire("+18005550001")
+        waiting = asyncio.create_task(controller.acquire("+18005550001"))
+        await asyncio.sleep(0)
+        # Another tenant is admitted straight away despite the queued waiter
+        await asyncio.wait_for(controller.acquire("+18005550002"), 0.1)
+        assert not waiting.done()
+        controller.release("+18005550001")
+        await waiting
+
+    asyncio.run(scenario())
+    assert controller.metrics()["active_by_tenant"] == {"+18005550001": 1, "+18005550002": 1}
+
+
+class SlowRunner:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def run_async(self, **kwargs):
+        await asyncio.sleep(0.3)
+        yield SimpleNamespace(text="Your balance is 500 rupees.")
+
+
+def test_spike_is_shed_to_callback_offer():
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for caller in ("local_tester_1", "local_tester_2"):
+                await server.call_store.stash_input(caller, "Check my balance")
+            return await asyncio.gather(*(
+                client.post("/process_speech", data={"From": caller, "To": "+18005550001"})
+                for caller in ("local_tester_1", "local_tester_2")
+            ))
+
+    controller = AdmissionController(max_concurrent=1, queue_depth=0)
+    with patch('server.admission', controller), \
+         patch('server.runner_pool', RunnerPool(SlowRunner)), \
+         patch('server.intent_router.mode', "llm"):
+        responses = asyncio.run(scenario())
+
+    texts = sorted(r.text for r in responses)
+    assert "Your balance is 500 rupees." in texts[1]
+    assert "/callback_offer" in texts[0]
+    assert controller.metrics()["shed_queue_full"] == 1
+    assert controller.metrics()["active"] == 0
+
+
+def test_async_turn_releases_its_slot_however_it_ends():
+    async def scenario():
+        # Cancelled before it ever ran, e.g. on shutdown right after the webhook returned
+        await controller.acquire("+18005550001")
+        never_ran = server.start_async_turn(
+            "+911111111111", "Check my balance", "CA-cancelled", "http://test/", "t-cancelled", "+18005550001"
+        )
+        never_ran.cancel()
+        cancelled, = await asyncio.gather(never_ran, return_exceptions=True)
+        active_after_cancel = controller.metrics()["active"]
+
+        # Started by /process_speech and run to the end
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await server.call_store.stash_input("+912222222222", "Check my balance")
+            await client.post("/process_speech", data={"From": "+912222222222", "CallSid": "CA-done", "To": "+18005550001"})
+        await asyncio.gather(*list(server.async_turns))
+        return cancelled, active_after_cancel, controller.metrics()["active"], server.async_turns
+
+    controller = AdmissionController(max_concurrent=2, queue_depth=0)
+    with patch('server.admission', controller), \
+         patch('server.runner_pool', RunnerPool(SlowRunner)), \
+         patch('server.intent_router.mode', "llm"):
+        cancelled, active_after_cancel, active, in_flight = asyncio.run(scenario())
+
+    assert isinstance(cancelled, asyncio.CancelledError)
+    assert active_after_cancel == 0
+    assert active == 0
+    assert not in_flight
+
+
+def test_accepted_callback_offer_books_a_ticket():
+    fakeredis = pytest.importorskip("fakeredis")
+    from services.database import AsyncRedisDatabase
+    fake = AsyncRedisDatabase(client=fakeredis.FakeAsyncRedis(decode_responses=True))
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            resp = await client.post("/callback_offer", data={"From": "+911234567890", "SpeechResult": "Yes please"})
+        return resp, await fake.client.lrange("tickets:user:+911234567890", 0, -1)
+
+    with patch('tools.async_tools.async_db', fake), patch('server.REDIS_CLIENT_MODE', "async"):
+        resp, tickets = asyncio.run(scenario())
+
+    assert len(tickets) == 1
+    digits = " ".join(tickets[0].split("-")[-1])
+    assert f"ticket number is {digits}" in resp.text
+    assert "<Hangup" in resp.text
@@ -0,0 +1,167 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+import server
+from agents.agent_factory import RunnerPool
+from services.agent_executor import AgentExecutor, AgentExecutorBusy
+
+SLOW_TURN_SECONDS = 0.5
+
+
+class SlowRunner:
+    """Stand-in for google.adk Runner whose turn takes SLOW_TURN_SECONDS."""
+    started = None
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def run_async(self, **kwargs):
+        SlowRunner.started.set()
+        await asyncio.sleep(SLOW_TURN_SECONDS)
+        yield SimpleNamespace(text="Your balance is 500 rupees.")
+
+
+
+class BlockingRunner(SlowRunner):
+    """Runner whose turn blocks its thread, like sync tools / sync Redis calls."""
+
+    async def run_async(self, **kwargs):
+        SlowRunner.started.set()
+        time.sleep(SLOW_TURN_SECONDS)
+        yield SimpleNamespace(text="Your balance is 500 rupees.")
+
+
+async def _voice_latency_during_slow_turn():
+    SlowRunner.started = threading.Event()
+    await server.call_store.stash_input("local_tester", "Check my balance")
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        turn = asyncio.create_task(
+            client.post("/process_speech", data={"From": "local_tester"})
+        )
+        while not SlowRunner.started.is_set():
+            await asyncio.sleep(0.001)
+
+        start = time.perf_counter()
+        voice = await client.post("/voice")
+        elapsed = time.perf_counter() - start
+
+        assert not turn.done()
+        turn_resp = await turn
+
+    return voice, elapsed, turn_resp
+
+
+@pytest.mark.parametrize("mode, runner_cls", [("async", SlowRunner), ("thread", BlockingRunner)])
+def test_voice_responsive_during_slow_agent_turn(mode, runner_cls):
+    executor = AgentExecutor(mode=mode, pool_size=2, queue_depth=0)
+    fast_path_pools = {name: RunnerPool(runner_cls) for name in server.specialist_runner_pools}
+    with patch('server.runner_pool', RunnerPool(runner_cls)), \
+         patch('server.specialist_runner_pools', fast_path_pools), \
+         patch('server.agent_executor', executor):
+        voice, elapsed, turn_resp = asyncio.run(_voice_latency_during_slow_turn())
+    executor.shutdown()
+
+    assert voice.status_code == 200
+    assert "Welcome to the Support Line" in voice.text
+    # /voice must not wait behind the agent turn
+    assert elapsed < 0.05
+    assert "Your balance is 500 rupees." in turn_resp.text
+
+
+def test_thread_mode_rejects_when_saturated():
+    executor = AgentExecutor(mode="thread", pool_size=1, queue_depth=0)
+    SlowRunner.started = threading.Event()
+
+    async def _two_turns():
+        async def _drain():
+            return [e async for e in executor.stream(
+                BlockingRunner(), user_id="u", session_id="s", new_message=None
+            )]
+
+        first = asyncio.create_task(_drain())
+        await asyncio.sleep(0.01)
+        with pytest.raises(AgentExecutorBusy):
+            await _drain()
+        return await first
+
+    events = asyncio.run(_two_turns())
+    executor.shutdown()
+    assert len(events) == 1
+
+
+def test_thread_mode_propagates_context_to_tools():
+    from utils.context import set_turn_context, get_turn_context
+    executor = AgentExecutor(mode="thread", pool_size=1, queue_depth=0)
+
+    class ContextRunner:
+        async def run_async(self, **kwargs):
+            yield get_turn_context()
+
+    async def _turn():
+        set_turn_context("CA123:abc")
+        return [e async for e in executor.stream(
+            ContextRunner(), user_id="u", session_id="s", new_message=None
+        )]
+
+    assert asyncio.run(_turn()) == ["CA123:abc"]
+    executor.shutdown()
+
+
+def test_thread_mode_refuses_asyncio_redis_client():
+    from services.agent_executor import check_backends
+    with pytest.raises(ValueError, match="REDIS_CLIENT_MODE=sync"):
+        check_backends("thread", "async")
+    check_backends("thread", "sync")
+    check_backends("async", "async")
+
+
+def test_thread_mode_refuses_redis_sessions():
+    from services.agent_executor import check_backends
+    with pytest.raises(ValueError, match="SESSION_BACKEND=memory"):
+        check_backends("thread", "sync", "redis")
+    check_backends("async", "async", "redis")
+
+
+def test_thread_mode_runs_a_billing_turn():
+    fakeredis = pytest.importorskip("fakeredis")
+    from google.adk.runners import Runner
+    from google.adk.sessions.in_memory_session_service import InMemorySessionService
+    from google.genai.types import Content, Part
+
+    from agents.agent_factory import create_agent_graph, initial_session_state
+    from benchmarks.fake_llm import FakeGemini
+    from services.database import RedisDatabase
+    from tools.billing_tools import check_balance, process_payment
+
+    user_id = "+15550000000"
+    db = RedisDatabase(client=fakeredis.FakeRedis(decode_responses=True))
+    db.client.hset(f"user:{user_id}", mapping={"name": "Thread Caller", "balance": "1245.0"})
+    executor = AgentExecutor(mode="thread", pool_size=1, queue_depth=0)
+
+    async def _turn():
+        sessions = InMemorySessionService()
+        session = await sessions.create_session(app_name="voice-agent", user_id=user_id,
+                                                state=initial_session_state(user_id))
+        # REDIS_CLIENT_MODE=sync tools, as thread mode requires
+        with patch('agents.agent_factory.check_balance', check_balance), \
+             patch('agents.agent_factory.process_payment', process_payment):
+            graph = create_agent_graph(user_id, model=FakeGemini(latency=0))
+        runner = Runner(agent=graph, app_name="voice-agent", session_service=sessions)
+        message = Content(role="user", parts=[Part(text="What is my balance")])
+        return [e async for e in executor.stream(runner, user_id=user_id, session_id=session.id,
+                                                 new_message=message)]
+
+    with patch('tools.billing_tools.db', db):
+        events = asyncio.run(_turn())
+    executor.shutdown()
+
+    answer = " ".join(p.text for e in events if e.content for p in e.content.parts or () if p.text)
+    assert "balance amount 1245.0" in answer
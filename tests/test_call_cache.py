@@ -0,0 +1,127 @@
+import asyncio
+import contextvars
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from services.call_cache import CallCache, CallCacheRegistry
+from tools.billing_tools import check_balance, process_payment
+from tools.network_tools import check_outage, run_diagnostics
+from utils.context import set_call_cache
+
+PROFILE = {"name": "A", "balance": 500.0, "region": "India-South", "router_id": "R1"}
+
+
+def _in_call(fn, cache):
+    """Runs fn with `cache` as the current call cache, without leaking it."""
+    def _run():
+        set_call_cache(cache)
+        return fn()
+    return contextvars.copy_context().run(_run)
+
+
+@pytest.fixture
+def mock_db():
+    db = MagicMock()
+    db.get_user.side_effect = lambda user_id, fields=None: dict(PROFILE)
+    db.get_network_status.return_value = "Outage Detected"
+    db.apply_payment.return_value = {"balance": 300.0, "transaction_id": "TXN-1", "duplicate": False}
+    with patch('tools.billing_tools.db', db), patch('tools.network_tools.db', db):
+        yield db
+
+
+def test_turn_hits_redis_once_per_key(mock_db):
+    cache = CallCache()
+
+    def turn():
+        return check_outage("u1"), run_diagnostics("u1"), check_balance("u1"), check_balance("u1")
+
+    outage, diagnostics, balance, _ = _in_call(turn, cache)
+
+    assert outage["status"] == "outage_confirmed"
+    assert diagnostics["device"] == "R1"
+    assert balance["balance_amount"] == 500.0
+    # Each projection is read once, and only its fields (HMGET)
+    assert [c.args for c in mock_db.get_user.call_args_list] == [
+        ("u1", ("region",)), ("u1", ("router_id",)), ("u1", ("name", "balance"))]
+    assert mock_db.get_network_status.call_count == 1
+    assert (cache.hits, cache.misses) == (1, 4)
+
+
+def test_whole_profile_serves_every_projection(mock_db):
+    cache = CallCache()
+    # e.g. loaded by the prefetcher during the filler
+    cache.put(("user", "u1"), dict(PROFILE))
+
+    def turn():
+        return run_diagnostics("u1"), check_balance("u1")
+
+    diagnostics, balance = _in_call(turn, cache)
+    assert diagnostics["device"] == "R1"
+    assert balance["balance_amount"] == 500.0
+    assert mock_db.get_user.call_count == 0
+
+
+def test_write_invalidates_cached_profile(mock_db):
+    cache = CallCache()
+
+    def turn():
+        check_balance("u1")
+        process_payment("u1", 200.0)
+        return check_balance("u1")
+
+    _in_call(turn, cache)
+    assert mock_db.get_user.call_count == 2
+
+
+def test_no_cache_outside_a_call(mock_db):
+    check_balance("u1")
+    check_balance("u1")
+    assert mock_db.get_user.call_count == 2
+    mock_db.get_user.assert_called_with("u1", ("name", "balance"))
+
+
+def test_async_tools_share_one_round_trip():
+    fakeredis = pytest.importorskip("fakeredis")
+    from services.database import AsyncRedisDatabase
+    from tools import async_tools
+
+    class CountingDatabase(AsyncRedisDatabase):
+        round_trips = 0
+
+        async def get_user(self, user_id, fields=None):
+            CountingDatabase.round_trips += 1
+            await asyncio.sleep(0.01)
+            return await super().get_user(user_id, fields)
+
+    fake = CountingDatabase(client=fakeredis.FakeAsyncRedis(decode_responses=True))
+    cache = CallCache()
+
+    async def turn():
+        set_call_cache(cache)
+        await fake.client.hset("user:u1", mapping={"region": "India-West", "router_id": "R1", "balance": "5"})
+        # Parallel function calls from one model response
+        return await asyncio.gather(
+            async_tools.check_outage("u1"),
+            async_tools.check_outage("u1"),
+            async_tools.run_diagnostics("u1"),
+            async_tools.check_balance("u1"),
+        )
+
+    with patch('tools.async_tools.async_db', fake):
+        outage, _, diagnostics, balance = asyncio.run(turn())
+
+    assert outage["region"] == "India-West"
+    assert diagnostics["device"] == "R1"
+    assert balance["balance_amount"] == 5.0
+    # One round-trip per projection, shared by the parallel calls that need it
+    assert CountingDatabase.round_trips == 3
+
+
+def test_registry_hands_same_cache_until_released():
+    registry = CallCacheRegistry()
+    cache = registry.for_call("CA1")
+    assert registry.for_call("CA1") is cache
+    assert registry.for_call("CA2") is not cache
+    registry.release("CA1")
+    assert registry.for_call("CA1") is not cache
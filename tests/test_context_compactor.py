@@ -0,0 +1,103 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from google.genai import types
+
+from agents.context_compactor import (
+    CALL_FACTS_KEY, DROPPED_TURNS_KEY, ContextCompactor, estimate_tokens, split_turns,
+)
+
+
+def caller(text):
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+
+def tool_turn(text, tool="check_balance", padding=0):
+    """A caller message, the model's tool call, the tool's response and the answer."""
+    return [
+        caller(text),
+        types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(
+            id=f"call-{text}", name=tool, args={"user_id": "+1555"}))]),
+        types.Content(role="user", parts=[types.Part(function_response=types.FunctionResponse(
+            id=f"call-{text}", name=tool, response={"status": "success", "notes": "x" * padding}))]),
+        types.Content(role="model", parts=[types.Part(text=f"Answer to {text}")]),
+    ]
+
+
+def texts(contents):
+    return [p.text for c in contents for p in c.parts if p.text]
+
+
+def test_turns_keep_tool_calls_with_their_responses():
+    contents = tool_turn("one") + [caller("For context:")] + tool_turn("two")
+    turns = split_turns(contents)
+    assert [len(t) for t in turns] == [5, 4]
+    for turn in turns:
+        calls = {p.function_call.id for c in turn for p in c.parts if p.function_call}
+        responses = {p.function_response.id for c in turn for p in c.parts if p.function_response}
+        assert calls == responses
+
+
+def test_compaction_drops_whole_old_turns_and_keeps_the_cut():
+    compactor = ContextCompactor(budget=400, compact_to=0.5)
+    state = {CALL_FACTS_KEY: {"check_balance": "balance checked: 1245.0 INR, due 2026-10-24"}}
+    contents = [c for i in range(6) for c in tool_turn(f"turn {i}", padding=400)] + [caller("what now")]
+
+    kept = compactor.compact(contents, state)
+    dropped = state[DROPPED_TURNS_KEY]
+    assert 0 < dropped < 6
+    # A summary note, then whole turns, then the current message
+    assert texts(kept)[:2] == ["For context:", "Earlier turns of this call were summarized. "
+                                                "So far: balance checked: 1245.0 INR, due 2026-10-24."]
+    assert texts(kept)[2] == f"turn {dropped}"
+    assert texts(kept)[-1] == "what now"
+    assert sum(estimate_tokens(c) for c in kept[1:-1]) <= 400
+
+    # Under budget on the next turn: the cut stays where it was
+    kept = compactor.compact(contents + [types.Content(role="model", parts=[types.Part(text="ok")])], state)
+    assert state[DROPPED_TURNS_KEY] == dropped
+    assert texts(kept)[2] == f"turn {dropped}"
+
+
+def test_current_turn_and_short_calls_are_sent_whole():
+    compactor = ContextCompactor(budget=10)
+    state = {}
+    contents = tool_turn("only turn", padding=1000)
+    assert compactor.compact(contents, state) == contents
+    assert ContextCompactor(budget=0).compact(contents * 3, state) == contents * 3
+    assert DROPPED_TURNS_KEY not in state
+
+
+def test_tool_results_become_call_facts():
+    compactor = ContextCompactor()
+    context = SimpleNamespace(state={})
+    balance = SimpleNamespace(name="check_balance")
+    compactor.after_tool(balance, {}, context, {
+        "status": "success", "balance_amount": 1245.0, "currency": "INR", "due_date": "2026-10-24"})
+    compactor.after_tool(SimpleNamespace(name="escalate_to_human"), {}, context, {"ticket_id": "TICKET-7"})
+    compactor.after_tool(balance, {}, context, {"status": "error", "message": "User not found"})
+    compactor.after_tool(SimpleNamespace(name="transfer_to_agent"), {}, context, {})
+
+    assert context.state[CALL_FACTS_KEY] == {
+        "check_balance": "balance checked: 1245.0 INR, due 2026-10-24",
+        "escalate_to_human": "escalated to a human, ticket TICKET-7",
+    }
+
+
+def test_long_call_prompts_stay_bounded():
+    pytest.importorskip("fakeredis")
+    from benchmarks.bench_context_compaction import history_tokens, run_call
+
+    whole, _ = asyncio.run(run_call(turns=15, budget=0))
+    model, state = asyncio.run(run_call(turns=15, budget=600))
+
+    assert len(model.requests) == len(whole.requests)
+    assert max(history_tokens(model)) < max(history_tokens(whole)) / 2
+    assert state[DROPPED_TURNS_KEY] > 0
+    assert "balance checked" in state[CALL_FACTS_KEY]["check_balance"]
+    # Every tool response the model sees comes with its call
+    for contents in model.requests:
+        calls = {p.function_call.id for c in contents for p in c.parts or () if p.function_call}
+        responses = {p.function_response.id for c in contents for p in c.parts or () if p.function_response}
+        assert responses <= calls
@@ -0,0 +1,220 @@
+import asyncio
+import json
+
+import pytest
+
+from services import database
+from services.database import AsyncRedisDatabase
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def async_db():
+    return AsyncRedisDatabase(client=fakeredis.FakeAsyncRedis(decode_responses=True))
+
+
+def test_async_db_uses_bounded_pool():
+    db = AsyncRedisDatabase()
+    pool = db.client.connection_pool
+    assert pool.max_connections == database.REDIS_MAX_CONNECTIONS
+    assert pool.connection_kwargs["socket_timeout"] == database.REDIS_SOCKET_TIMEOUT
+    assert pool.connection_kwargs["health_check_interval"] == database.REDIS_HEALTH_CHECK_INTERVAL
+
+
+def test_async_update_balance_floors_at_zero(async_db):
+    async def scenario():
+        await async_db.client.set("user:u1", json.dumps({"balance": 100.0}))
+        first = await async_db.update_balance("u1", 40)
+        second = await async_db.update_balance("u1", 500)
+        missing = await async_db.update_balance("nobody", 10)
+        return first, second, missing
+
+    assert asyncio.run(scenario()) == (60.0, 0, None)
+
+
+def test_async_create_ticket(async_db):
+    async def scenario():
+        await async_db.create_ticket("u1", "router broken", "TICKET-1")
+        return (
+            json.loads(await async_db.client.get("ticket:TICKET-1")),
+            await async_db.client.lrange("tickets:open", 0, -1),
+            await async_db.client.lrange("tickets:user:u1", 0, -1),
+        )
+
+    ticket, open_tickets, user_tickets = asyncio.run(scenario())
+    assert ticket["status"] == "OPEN"
+    assert open_tickets == user_tickets == ["TICKET-1"]
+
+
+def test_async_network_status_defaults_to_unknown(async_db):
+    assert asyncio.run(async_db.get_network_status("Mars")) == "Unknown"
+    assert asyncio.run(async_db.ping()) is True
+
+
+def test_concurrent_payers_on_one_account():
+    from concurrent.futures import ThreadPoolExecutor
+    from services.database import RedisDatabase
+
+    server = fakeredis.FakeServer()
+    seed = fakeredis.FakeRedis(server=server, decode_responses=True)
+    seed.set("user:hot", json.dumps({"name": "Hot", "balance": 1000.0}))
+
+    def pay(_):
+        db = RedisDatabase(client=fakeredis.FakeRedis(server=server, decode_responses=True))
+        return db.update_balance("hot", 5.0)
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(pay, range(100)))
+
+    assert json.loads(seed.get("user:hot"))["balance"] == 500.0
+    assert sorted(results, reverse=True) == [1000.0 - 5.0 * (i + 1) for i in range(100)]
+
+
+def test_replayed_payment_returns_the_original_transaction(async_db):
+    async def scenario():
+        await async_db.client.hset("user:u1", mapping={"balance": "100"})
+        # A replay key recorded by the previous release (balance only)
+        await async_db.client.set("payment:idem:old", "90")
+        return (
+            await async_db.apply_payment("u1", 30, "CA1:t1:u1:30", "TXN-A"),
+            await async_db.apply_payment("u1", 30, "CA1:t1:u1:30", "TXN-B"),
+            await async_db.apply_payment("u1", 10, "old", "TXN-C"),
+            await async_db.apply_payment("nobody", 10, "CA1:t1:nobody:10", "TXN-D"),
+        )
+
+    first, replay, legacy, missing = asyncio.run(scenario())
+    assert first == {"balance": 70.0, "transaction_id": "TXN-A", "duplicate": False}
+    assert replay == {"balance": 70.0, "transaction_id": "TXN-A", "duplicate": True}
+    assert legacy == {"balance": 90.0, "transaction_id": None, "duplicate": True}
+    assert missing is None
+
+
+def test_update_balance_idempotency_key_blocks_double_charge(async_db):
+    async def scenario():
+        await async_db.client.set("user:u1", json.dumps({"name": "A", "balance": 100.0}))
+        first = await async_db.update_balance("u1", 30, idempotency_key="CA1:turn:u1:30")
+        replay = await async_db.update_balance("u1", 30, idempotency_key="CA1:turn:u1:30")
+        other = await async_db.update_balance("u1", 30, idempotency_key="CA1:turn2:u1:30")
+        stored = json.loads(await async_db.client.get("user:u1"))
+        ttl = await async_db.client.ttl("payment:idem:CA1:turn:u1:30")
+        return first, replay, other, stored, ttl
+
+    first, replay, other, stored, ttl = asyncio.run(scenario())
+    assert first == replay == 70.0
+    assert other == 40.0
+    # Other profile fields survive the server-side rewrite
+    assert stored == {"name": "A", "balance": 40}
+    assert 0 < ttl <= database.PAYMENT_IDEMPOTENCY_TTL_SECONDS
+
+
+@pytest.fixture
+def sync_db():
+    from services.database import RedisDatabase
+    return RedisDatabase(client=fakeredis.FakeRedis(decode_responses=True))
+
+
+def test_get_user_projects_hash_fields(sync_db):
+    sync_db.save_user("u1", {"name": "A", "balance": 1245.0, "region": "India-West", "router_id": "R1"})
+
+    assert sync_db.get_user("u1", ("region",)) == {"region": "India-West"}
+    assert sync_db.get_user("u1", ("name", "balance")) == {"name": "A", "balance": 1245.0}
+    assert sync_db.get_user("u1")["router_id"] == "R1"
+    assert sync_db.get_user("nobody", ("region",)) is None
+
+
+def test_get_user_falls_back_to_legacy_json(sync_db):
+    sync_db.client.set("user:old", json.dumps({"name": "B", "balance": 10.0, "region": "India-South"}))
+
+    assert sync_db.get_user("old", ("region",)) == {"region": "India-South"}
+    assert sync_db.get_user("old")["balance"] == 10.0
+    assert sync_db.update_balance("old", 4) == 6.0
+
+
+def test_migrate_user_profiles(sync_db):
+    sync_db.client.set("user:old", json.dumps({"name": "B", "balance": 10.0, "region": "India-South"}))
+    sync_db.save_user("new", {"name": "C", "balance": 5.0})
+
+    assert sync_db.migrate_user_profiles() == 1
+    assert sync_db.client.type("user:old") == "hash"
+    assert sync_db.get_user("old") == {"name": "B", "balance": 10.0, "region": "India-South"}
+    # Re-running is a no-op, and balance updates keep working on the hash
+    assert sync_db.migrate_user_profiles() == 0
+    assert sync_db.update_balance("old", 2.5) == 7.5
+    assert sync_db.get_user("old", ("balance",)) == {"balance": 7.5}
+
+
+def test_migrated_and_saved_profiles_keep_value_types(sync_db):
+    profile = {"name": "D", "balance": 12.5, "region": "India-West", "router_id": "42",
+               "vip": True, "lines": 2, "devices": ["R1", "R2"], "plan": {"speed_mbps": 100}}
+    sync_db.client.set("user:old", json.dumps(profile))
+    sync_db.save_user("new", profile)
+
+    assert sync_db.migrate_user_profiles() == 1
+    for user_id in ("old", "new"):
+        assert sync_db.get_user(user_id) == profile
+        assert sync_db.get_user(user_id, ("vip", "router_id")) == {"vip": True, "router_id": "42"}
+    # Balance updates still work on the JSON-encoded number
+    assert sync_db.update_balance("old", 2.5) == 10.0
+
+
+def test_async_get_user_projection_and_fallback(async_db):
+    async def scenario():
+        await async_db.client.hset("user:u1", mapping={"region": "India-West", "balance": "3.5"})
+        await async_db.client.set("user:old", json.dumps({"region": "India-South"}))
+        return (
+            await async_db.get_user("u1", ("balance",)),
+            await async_db.get_user("old", ("region",)),
+        )
+
+    assert asyncio.run(scenario()) == ({"balance": 3.5}, {"region": "India-South"})
+
+
+def test_10k_parallel_tickets_never_collide():
+    from tools import async_tools
+    from tools.escalation_tools import format_ticket_id
+    from unittest.mock import patch
+
+    total = 10_000
+    server = fakeredis.FakeServer()
+    # Two server processes allocating from the same sequence
+    workers = [
+        AsyncRedisDatabase(client=fakeredis.FakeAsyncRedis(
+            server=server, decode_responses=True, max_connections=total
+        ))
+        for _ in range(2)
+    ]
+
+    async def escalate_on_other_worker(i):
+        ticket_id = format_ticket_id(await workers[1].next_ticket_seq())
+        await workers[1].create_ticket(f"user{i % 50}", "angry", ticket_id)
+        return {"ticket_id": ticket_id}
+
+    async def scenario():
+        results = await asyncio.gather(*(
+            async_tools.escalate_to_human(f"user{i % 50}", "angry") if i % 2
+            else escalate_on_other_worker(i)
+            for i in range(total)
+        ))
+        client = workers[0].client
+        return results, await client.lrange("tickets:open", 0, -1), await client.keys("ticket:*")
+
+    with patch('tools.async_tools.async_db', workers[0]):
+        results, open_tickets, ticket_keys = asyncio.run(scenario())
+    ticket_ids = [r["ticket_id"] for r in results]
+
+    assert len(set(ticket_ids)) == total
+    assert sorted(open_tickets) == sorted(ticket_ids)
+    assert len(ticket_keys) == total
+    # Readable digit by digit: short decimal sequence numbers
+    assert all(t.removeprefix("TICKET-").isdigit() for t in ticket_ids)
+    assert max(int(t.removeprefix("TICKET-")) for t in ticket_ids) <= total + 2 * database.TICKET_ID_BLOCK_SIZE
+
+
+def test_sync_ticket_ids_from_threads_are_unique(sync_db):
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        seqs = list(pool.map(lambda _: sync_db.next_ticket_seq(), range(1000)))
+
+    assert sorted(seqs) == list(range(1, 1001))
@@ -1,13 +1,31 @@
+import asyncio
+from types import SimpleNamespace
+
 import pytest
-from agents.agent_factory import create_agent_graph
+from agents.agent_factory import create_agent_graph, get_agent_graph, initial_session_state, RunnerPool
+
+def caller_context_of(agent, user_id):
+    """Runs the agent's caller-context callback against a session for user_id."""
+    # Minimal stand-in for the CallbackContext ADK passes to the callback
+    ctx = SimpleNamespace(_invocation_context=SimpleNamespace(
+        session=SimpleNamespace(state=initial_session_state(user_id)),
+        artifact_service=None
+    ))
+    request = SimpleNamespace(contents=[])
+
+    async def run():
+        await agent.before_model_callback[-1](ctx, request)
+        return " ".join(p.text for p in request.contents[0].parts)
+
+    return asyncio.run(run())
 
 def test_agent_creation():
     user_id = "+918275267982"
     root_agent = create_agent_graph(user_id)
     
     assert root_agent.name == "RootDispatcher"
-    # Check if User ID is injected into instructions
-    assert f"CURRENT USER ID: {user_id}" in root_agent.instruction
+    # The User ID reaches every model call as caller context
+    assert f"CURRENT USER ID: {user_id}" in caller_context_of(root_agent, user_id)
     
     # Check sub-agents
     sub_agents = {agent.name: agent for agent in root_agent.sub_agents}
@@ -15,5 +33,58 @@ def test_agent_creation():
     assert "TechSupportAgent" in sub_agents
     assert "EscalationAgent" in sub_agents
     
-    # Check Sub-Agent Prompt Injection
-    assert f"CURRENT USER ID: {user_id}" in sub_agents["BillingAgent"].instruction
+    # Check Sub-Agent Context Injection
+    assert f"CURRENT USER ID: {user_id}" in caller_context_of(sub_agents["BillingAgent"], user_id)
+
+def test_system_instructions_are_static():
+    # Same instruction bytes for every caller, so the provider can reuse the prompt prefix
+    first, second = create_agent_graph("+910000000001"), create_agent_graph("+910000000002")
+    for a, b in zip([first] + list(first.sub_agents), [second] + list(second.sub_agents)):
+        assert a.instruction == b.instruction
+        assert "+91" not in a.instruction and "{user_id}" not in a.instruction
+
+def test_template_graph_is_cached_and_user_agnostic():
+    graph = get_agent_graph()
+    assert get_agent_graph() is graph
+    # The shared graph only carries the placeholder, never a concrete caller
+    assert graph.instruction == create_agent_graph("+910000000001").instruction
+    for agent in [graph] + list(graph.sub_agents):
+        assert caller_context_of(agent, "+910000000001").endswith("CURRENT USER ID: +910000000001")
+
+def test_template_graph_no_user_id_leak_between_callers():
+    graph = get_agent_graph()
+    callers = [f"+9100000000{i:02d}" for i in range(20)]
+
+    async def resolve(user_id):
+        ctx = SimpleNamespace(_invocation_context=SimpleNamespace(
+            session=SimpleNamespace(state=initial_session_state(user_id)),
+            artifact_service=None
+        ))
+        contexts = []
+        for agent in [graph] + list(graph.sub_agents):
+            request = SimpleNamespace(contents=[])
+            await asyncio.sleep(0)
+            await agent.before_model_callback[-1](ctx, request)
+            contexts.append(request.contents[0].parts[-1].text)
+        return user_id, contexts
+
+    async def resolve_all():
+        return await asyncio.gather(*(resolve(u) for u in callers))
+
+    for user_id, contexts in asyncio.run(resolve_all()):
+        for context in contexts:
+            assert context == f"CURRENT USER ID: {user_id}"
+
+def test_runner_pool_reuses_runners():
+    created = []
+    pool = RunnerPool(lambda: created.append(object()) or created[-1], max_idle=1)
+
+    with pool.runner() as first:
+        pass
+    with pool.runner() as second:
+        # A concurrent borrower must get its own Runner
+        with pool.runner() as third:
+            assert third is not second
+
+    assert second is first
+    assert len(created) == 2
@@ -0,0 +1,171 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+import server
+from agents.agent_factory import RunnerPool
+from agents.intent_router import IntentRouter, classify_intent
+
+
+@pytest.mark.parametrize("text, intent", [
+    ("Check my balance", "billing"),
+    ("I want to pay my bill", "billing"),
+    ("My internet is down", "network"),
+    ("Let me speak with a human", "human"),
+])
+def test_classify_intent(text, intent):
+    assert classify_intent(text)[0] == intent
+
+
+def test_confidence_drops_when_intents_compete():
+    _, clear = classify_intent("my internet is slow")
+    _, mixed = classify_intent("my internet is slow and I want to pay my bill")
+    assert clear > mixed
+    assert classify_intent("hello there") == (None, 0.0)
+
+
+def test_router_threshold_and_hit_rates():
+    router = IntentRouter(mode="fast", threshold=0.75)
+    assert router.route("Check my balance") == "BillingAgent"
+    assert router.route("My wifi is down") == "TechSupportAgent"
+    # Ambiguous and unknown utterances fall back to the RootDispatcher
+    assert router.route("The internet bill is too high") is None
+    assert router.route("hello there") is None
+
+    rates = router.hit_rates()
+    assert rates["network"] == 1.0
+    assert rates["billing"] == 0.5
+    assert rates["unknown"] == 0.0
+
+
+@pytest.mark.parametrize("text", [
+    "I need help downloading my invoice",
+    "The agent hung up on me earlier, I want a refund",
+    "Can I speak with someone about a refund",
+    "Is my bill correct this month",
+])
+def test_weak_keyword_hits_stay_with_the_root_dispatcher(text):
+    # Whole words only, and one keyword in a sentence is below the default threshold
+    assert IntentRouter(mode="fast").route(text) is None
+
+
+def test_clear_requests_take_the_fast_path_by_default():
+    router = IntentRouter(mode="fast")
+    assert router.route("What's my balance?") == "BillingAgent"
+    assert router.route("My wifi is down again") == "TechSupportAgent"
+    assert router.route("Operator!") == "EscalationAgent"
+
+
+def test_hit_rates_are_exported():
+    import httpx
+
+    router = IntentRouter(mode="fast")
+    router.route("What's my balance?")
+    router.route("Is my bill correct this month")
+
+    async def scrape():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return (await client.get("/metrics")).text, (await client.get("/stats")).json()
+
+    with patch('server.intent_router', router):
+        text, stats = asyncio.run(scrape())
+
+    assert 'voice_intent_fast_path_ratio{intent="billing"} 0.5' in text
+    assert stats["intent_fast_path"] == {"billing": 0.5}
+
+
+def test_llm_mode_never_takes_fast_path():
+    router = IntentRouter(mode="llm")
+    assert router.route("Check my balance") is None
+
+
+class RecordingRunner:
+    """Stand-in Runner that records which pool served the turn."""
+    served_by = []
+
+    def __init__(self, name):
+        self.name = name
+
+    async def run_async(self, **kwargs):
+        RecordingRunner.served_by.append(self.name)
+        yield SimpleNamespace(text=f"handled by {self.name}")
+
+
+def test_fast_path_skips_root_dispatcher():
+    RecordingRunner.served_by = []
+    pools = {name: RunnerPool(lambda name=name: RecordingRunner(name)) for name in server.specialist_runner_pools}
+    with patch('server.runner_pool', RunnerPool(lambda: RecordingRunner("RootDispatcher"))), \
+         patch('server.specialist_runner_pools', pools), \
+         patch('server.intent_router', IntentRouter(mode="fast", threshold=0.75)):
+        billing = asyncio.run(server.get_agent_response("local_tester", "Check my balance"))
+        fallback = asyncio.run(server.get_agent_response("local_tester", "hello there"))
+
+    assert billing == "handled by BillingAgent"
+    assert fallback == "handled by RootDispatcher"
+
+
+def test_specialist_runner_starts_at_sub_agent():
+    with server.specialist_runner_pools["EscalationAgent"].runner() as runner:
+        # Rooted at the whole graph, so transfers and earlier events resolve
+        assert runner.agent.name == "RootDispatcher"
+        assert runner.start_agent == "EscalationAgent"
+
+
+def test_fast_path_turn_after_dispatcher_turns_logs_no_unknown_agents(caplog):
+    fakeredis = pytest.importorskip("fakeredis")
+    from google.adk.runners import Runner
+    from google.adk.sessions.in_memory_session_service import InMemorySessionService
+    from google.genai.types import Content, Part
+
+    from agents.agent_factory import RoutedRunner, create_agent_graph, initial_session_state
+    from benchmarks.fake_llm import FakeGemini
+    from benchmarks.load_calls import seed
+    from services.database import AsyncRedisDatabase
+
+    user_id = "+15550000000"
+    db = AsyncRedisDatabase(client=fakeredis.FakeAsyncRedis(decode_responses=True))
+    graph = create_agent_graph(user_id, model=FakeGemini(latency=0))
+    sessions = InMemorySessionService()
+
+    async def turn(runner, session_id, text):
+        message = Content(role="user", parts=[Part(text=text)])
+        return [e async for e in runner.run_async(user_id=user_id, session_id=session_id, new_message=message)]
+
+    async def scenario():
+        await seed(db, 1)
+        session = await sessions.create_session(app_name="voice-agent", user_id=user_id,
+                                                state=initial_session_state(user_id))
+        dispatcher = Runner(agent=graph, app_name="voice-agent", session_service=sessions)
+        billing = RoutedRunner(agent=graph, start_agent="BillingAgent", app_name="voice-agent",
+                               session_service=sessions)
+        await turn(dispatcher, session.id, "Is there an outage in my area")
+        await turn(dispatcher, session.id, "I want to talk to a human")
+        return await turn(billing, session.id, "What is my balance")
+
+    with patch('tools.async_tools.async_db', db), caplog.at_level("WARNING"):
+        events = asyncio.run(scenario())
+
+    assert {e.author for e in events} == {"BillingAgent"}
+    assert "balance amount 1245.0" in events[-1].content.parts[0].text
+    assert not [r for r in caplog.records if "unknown agent" in r.getMessage()]
+
+
+def test_routed_runner_hook_matches_the_pinned_adk():
+    # RoutedRunner overrides Runner._find_agent_to_run, a private ADK method:
+    # google-adk is pinned in requirements.txt and an upgrade has to pass this first
+    import importlib.metadata
+    import inspect
+    import os
+
+    from google.adk.runners import Runner
+
+    requirements = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "requirements.txt")
+    with open(requirements, encoding="utf-8") as f:
+        pinned = [line.strip().split("==", 1)[1] for line in f if line.startswith("google-adk==")]
+    assert pinned == [importlib.metadata.version("google-adk")]
+
+    assert list(inspect.signature(Runner._find_agent_to_run).parameters) == ["self", "session", "root_agent"]
+    assert "self._find_agent_to_run(" in inspect.getsource(Runner.run_async)
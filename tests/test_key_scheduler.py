@@ -0,0 +1,96 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from google.adk.models.google_llm import Gemini
+from google.genai import errors
+
+from agents.scheduled_gemini import ScheduledGemini
+from services.key_scheduler import ApiKeyScheduler, NoApiKeyAvailable, TokenBucket
+
+
+def test_token_bucket_refills_at_rate():
+    bucket = TokenBucket(rate=2.0, capacity=2)
+    now = time.monotonic()
+    bucket.take(now)
+    bucket.take(now)
+    assert bucket.wait_time(now) == pytest.approx(0.5)
+    assert bucket.available(now + 1.0) == pytest.approx(2.0)
+
+
+def test_least_loaded_key_is_chosen():
+    scheduler = ApiKeyScheduler(keys=["key-aaaa", "key-bbbb"], rpm=600, burst=10)
+
+    async def scenario():
+        async with scheduler.lease() as first:
+            async with scheduler.lease() as second:
+                return first, second
+
+    first, second = asyncio.run(scenario())
+    assert {first, second} == {"key-aaaa", "key-bbbb"}
+
+
+def test_rate_limited_key_cools_down():
+    scheduler = ApiKeyScheduler(keys=["key-aaaa", "key-bbbb"], rpm=600, burst=10, cooldown=60)
+    scheduler.report_rate_limited("key-aaaa")
+
+    async def scenario():
+        picked = []
+        for _ in range(5):
+            async with scheduler.lease() as key:
+                picked.append(key)
+        return picked
+
+    assert asyncio.run(scenario()) == ["key-bbbb"] * 5
+    metrics = scheduler.metrics()
+    assert metrics["keys"]["...aaaa"]["cooling_down"] is True
+    assert metrics["keys"]["...aaaa"]["rate_limited"] == 1
+    assert metrics["keys"]["...bbbb"]["requests"] == 5
+
+
+def test_exhausted_pool_waits_then_rejects():
+    # One token, refilled every 0.1s
+    scheduler = ApiKeyScheduler(keys=["key-aaaa"], rpm=600, burst=1, max_wait=0.5)
+
+    async def scenario():
+        async with scheduler.lease():
+            pass
+        async with scheduler.lease():  # waits ~0.1s for a refill
+            pass
+        scheduler.report_rate_limited("key-aaaa", retry_after=10)
+        with pytest.raises(NoApiKeyAvailable):
+            async with scheduler.lease():
+                pass
+
+    asyncio.run(scenario())
+    assert scheduler.stats["waited"] == 2
+    assert scheduler.stats["rejected"] == 1
+
+
+def test_model_calls_use_explicit_keys_and_skip_429s():
+    scheduler = ApiKeyScheduler(keys=["key-aaaa", "key-bbbb"], rpm=600, burst=10)
+    used = []
+
+    async def fake_generate(self, llm_request, stream=False):
+        key = self.api_client._api_client.api_key
+        used.append(key)
+        if key == "key-aaaa":
+            raise errors.ClientError(429, {"error": {"status": "RESOURCE_EXHAUSTED", "message": "quota"}})
+        yield SimpleNamespace(text=f"answered with {key}")
+
+    async def scenario(model):
+        return [r async for r in model.generate_content_async(SimpleNamespace())]
+
+    model = ScheduledGemini(model="gemini-2.0-flash")
+    with patch('agents.scheduled_gemini.key_scheduler', scheduler), \
+         patch.object(Gemini, 'generate_content_async', fake_generate), \
+         patch.dict('os.environ', {"GOOGLE_API_KEY": "env-key"}):
+        first = asyncio.run(scenario(model))
+        second = asyncio.run(scenario(model))
+
+    assert [r.text for r in first + second] == ["answered with key-bbbb"] * 2
+    # key-aaaa was tried once, then skipped while cooling down; the env key was never used
+    assert used == ["key-aaaa", "key-bbbb", "key-bbbb"]
+    assert scheduler.metrics()["keys"]["...aaaa"]["rate_limited"] == 1
@@ -0,0 +1,22 @@
+import asyncio
+
+import pytest
+
+from benchmarks.load_calls import run_load
+
+
+@pytest.mark.parametrize("handoff", ["await", "update"])
+def test_scripted_callers_complete_offline(handoff):
+    pytest.importorskip("fakeredis")
+    stats = asyncio.run(run_load(callers=8, latency=0.01, jitter=0, ramp=0, think=0, handoff=handoff))
+
+    counts = stats.counts
+    assert counts["calls"] == 8 and counts["failed_calls"] == 0
+    assert counts["error_replies"] == 0 and counts["shed"] == 0
+    # Every script ends in a goodbye; 12 agent turns across the 8 callers
+    assert counts["goodbyes"] == 8
+    assert counts["turns"] == len(stats.reply) == 12
+    assert all(first <= reply for first, reply in zip(stats.first_audio, stats.reply))
+    # Dispatcher hop, tool call and answer at most, per turn
+    assert 12 <= stats.llm_calls <= 36
+    assert stats.twilio_updates == (12 if handoff == "update" else 0)
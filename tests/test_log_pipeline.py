@@ -0,0 +1,84 @@
+import io
+import json
+import logging
+import queue
+from logging.handlers import RotatingFileHandler
+
+from services.log_pipeline import (
+    VERBOSE, BatchWriter, CallSampler, JsonFormatter, LogPipeline, NonBlockingQueueHandler,
+)
+from services.tracing import Tracer
+
+
+def _pipeline_logger(name: str, stream, sample_rate: float = 1.0, **options):
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    pipeline = LogPipeline([BatchWriter(handler)], sample_rate=sample_rate, flush_interval=0.05, **options).start()
+    log = logging.getLogger(name)
+    log.propagate = False
+    log.setLevel(logging.INFO)
+    log.addHandler(pipeline.handler)
+    return pipeline, log
+
+
+def test_records_are_written_as_json_batches():
+    stream = io.StringIO()
+    pipeline, log = _pipeline_logger("test.pipeline.json", stream, batch_size=100)
+    tracer = Tracer(path="")
+    with tracer.span("process_speech", call_sid="CA-log"):
+        for i in range(5):
+            log.info("turn %d done", i, extra={"agent": "BillingAgent"})
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        log.exception("tool failed")
+    pipeline.stop()
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [r["msg"] for r in records[:5]] == [f"turn {i} done" for i in range(5)]
+    assert records[0]["call_sid"] == "CA-log"
+    assert records[0]["agent"] == "BillingAgent"
+    assert records[-1]["level"] == "ERROR" and "ZeroDivisionError" in records[-1]["exc"]
+    # Everything logged before stop() went out in a handful of writes
+    assert pipeline.batches <= 3
+
+
+def test_verbose_records_are_sampled_per_call():
+    sampler = CallSampler(rate=0.5)
+    kept = {sampler._keeps(f"CA{i}") for i in range(200)}
+    assert kept == {True, False}
+    assert all(sampler._keeps("CA7") == sampler._keeps("CA7") for _ in range(10))
+
+    stream = io.StringIO()
+    pipeline, log = _pipeline_logger("test.pipeline.sampled", stream, sample_rate=0.0)
+    with Tracer(path="").span("process_speech", call_sid="CA-sampled"):
+        log.info("Received Speech Input: 'hello'", extra=VERBOSE)
+        log.info("Media session connected")
+        log.warning("Slow turn", extra=VERBOSE)
+    # Outside a call there is nothing to sample by, so the record is kept
+    log.info("Prewarmed runner pool", extra=VERBOSE)
+    pipeline.stop()
+
+    assert [json.loads(line)["msg"] for line in stream.getvalue().splitlines()] == [
+        "Media session connected", "Slow turn", "Prewarmed runner pool"]
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    for _ in range(3):
+        handler.handle(logging.makeLogRecord({"msg": "hi", "levelno": logging.INFO}))
+    assert handler.dropped == 2
+
+
+def test_log_file_rotates_by_size(tmp_path):
+    path = tmp_path / "server.log"
+    handler = RotatingFileHandler(path, maxBytes=300, backupCount=2, encoding="utf-8", delay=True)
+    handler.setFormatter(JsonFormatter())
+    writer = BatchWriter(handler)
+    for batch in range(4):
+        writer.write([logging.makeLogRecord({"msg": f"batch {batch} line {i}"}) for i in range(3)])
+    writer.close()
+
+    assert (tmp_path / "server.log.1").exists()
+    assert not (tmp_path / "server.log.3").exists()
+    assert "batch 3" in path.read_text()
@@ -0,0 +1,75 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from starlette.testclient import TestClient
+
+import server
+from agents.agent_factory import RunnerPool
+from fake_twilio import BARGE_IN_CALL, FakeConversationRelay
+
+
+class TwoSentenceRunner:
+    """Stand-in Runner: one sentence now, a second one after a pause."""
+    cancelled = []
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def run_async(self, new_message=None, **kwargs):
+        prompt = new_message.parts[0].text
+        try:
+            yield SimpleNamespace(text=f"About '{prompt}'. ", partial=True)
+            await asyncio.sleep(0.5)
+            yield SimpleNamespace(text="Here are the details.", partial=True)
+        except asyncio.CancelledError:
+            TwoSentenceRunner.cancelled.append(prompt)
+            raise
+
+
+def _replay(script):
+    TwoSentenceRunner.cancelled = []
+    with patch('server.runner_pool', RunnerPool(TwoSentenceRunner)), \
+         patch('server.intent_router.mode', "llm"):
+        with TestClient(server.app).websocket_connect("/media") as websocket:
+            return FakeConversationRelay(websocket).replay(script)
+
+
+def _spoken(log):
+    return [m["token"].strip() for kind, m in log if kind == "received" and m.get("token")]
+
+
+def test_barge_in_stops_the_reply_being_spoken():
+    log = _replay(BARGE_IN_CALL)
+
+    assert _spoken(log) == [
+        "About 'Check my balance'.",
+        "About 'Is the internet down'.",
+        "Here are the details.",
+    ]
+    # The interrupted reply never finished, and the agent stopped generating it
+    assert sum(1 for kind, m in log if kind == "received" and m.get("last")) == 1
+    assert TwoSentenceRunner.cancelled == ["Check my balance"]
+
+
+def test_one_connection_serves_several_turns():
+    script = [step for step in BARGE_IN_CALL if step["message"]["type"] != "interrupt"]
+    script[-1] = dict(script[-1], after=0.8)
+    log = _replay(script)
+
+    assert _spoken(log) == [
+        "About 'Check my balance'.",
+        "Here are the details.",
+        "About 'Is the internet down'.",
+        "Here are the details.",
+    ]
+    assert TwoSentenceRunner.cancelled == []
+
+
+def test_goodbye_ends_the_session():
+    with TestClient(server.app).websocket_connect("/media") as websocket:
+        relay = FakeConversationRelay(websocket)
+        relay.setup()
+        websocket.send_json({"type": "prompt", "voicePrompt": "Thanks, bye", "last": True})
+        assert websocket.receive_json()["token"] == "Thank you for calling. Goodbye!"
+        assert websocket.receive_json() == {"type": "end"}
@@ -0,0 +1,137 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+import pytest
+import redis
+
+import server
+from agents.agent_factory import RunnerPool
+from services.database import CountingConnection, counting_connection
+from services.metrics import MetricsRegistry, REDIS_ROUND_TRIPS
+
+
+def test_counter_sums_per_thread_shards():
+    registry = MetricsRegistry()
+    calls = registry.counter("calls_total", "Calls", ("tool",))
+
+    def work():
+        for _ in range(1000):
+            calls.inc("check_balance")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    calls.inc("run_diagnostics", amount=2)
+
+    assert calls.values() == {("check_balance",): 4000, ("run_diagnostics",): 2}
+
+
+def test_render_uses_prometheus_text_format():
+    registry = MetricsRegistry()
+    latency = registry.histogram("turn_seconds", "Turn latency", ("agent",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 3):
+        latency.observe(value, 'Billing"Agent')
+
+    async def sessions():
+        return 7
+
+    registry.callback("sessions", "Live sessions", "gauge", sessions)
+    registry.callback("broken", "Fails to collect", "gauge", lambda: 1 / 0)
+    text = asyncio.run(registry.render())
+
+    assert "# TYPE turn_seconds histogram" in text
+    assert 'turn_seconds_bucket{agent="Billing\\"Agent",le="0.1"} 1' in text
+    assert 'turn_seconds_bucket{agent="Billing\\"Agent",le="1"} 2' in text
+    assert 'turn_seconds_bucket{agent="Billing\\"Agent",le="+Inf"} 3' in text
+    assert 'turn_seconds_count{agent="Billing\\"Agent"} 3' in text
+    assert "sessions 7" in text
+    assert "# broken unavailable: ZeroDivisionError" in text
+
+
+def test_redis_round_trips_are_counted():
+    assert counting_connection("rediss://cache:6380/0") == {}
+    assert counting_connection("redis://localhost:6379/0") == {"connection_class": CountingConnection}
+
+    before = REDIS_ROUND_TRIPS.values().get((), 0)
+    with patch.object(redis.Connection, "send_packed_command") as send:
+        CountingConnection().send_packed_command(b"*1\r\n$4\r\nPING\r\n")
+    send.assert_called_once()
+    assert REDIS_ROUND_TRIPS.values()[()] == before + 1
+
+
+class ToolCallingRunner:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def run_async(self, user_id=None, **kwargs):
+        from tools import async_tools
+        balance = await async_tools.check_balance(user_id)
+        yield SimpleNamespace(author="BillingAgent", text=f"Your balance is {balance['balance_amount']:.0f}.")
+
+
+def _sample(text: str, prefix: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_metrics_endpoint_reports_turns_tools_and_goodbyes():
+    fakeredis = pytest.importorskip("fakeredis")
+    from services.database import AsyncRedisDatabase
+    fake = AsyncRedisDatabase(client=fakeredis.FakeAsyncRedis(decode_responses=True))
+
+    async def scenario():
+        await fake.client.hset("user:metrics_user", mapping={"balance": "500"})
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            before = (await client.get("/metrics")).text
+            await server.call_store.stash_input("metrics_user", "Check my balance")
+            await client.post("/process_speech", data={"From": "metrics_user"})
+            await client.post("/gather_speech", data={"From": "metrics_user", "SpeechResult": "goodbye"})
+            after = await client.get("/metrics")
+            return before, after
+
+    with patch('tools.async_tools.async_db', fake), \
+         patch('server.runner_pool', RunnerPool(ToolCallingRunner)), \
+         patch('server.intent_router.mode', "llm"):
+        before, after = asyncio.run(scenario())
+
+    assert after.headers["content-type"].startswith("text/plain; version=0.0.4")
+    for sample in ('voice_turn_duration_seconds_count{agent="RootDispatcher"}',
+                   'voice_tool_calls_total{tool="check_balance"}',
+                   "voice_goodbye_fast_path_total"):
+        assert _sample(after.text, sample) == _sample(before, sample) + 1, sample
+    # check_balance read the profile through the call's cache
+    miss = 'voice_call_cache_requests_total{result="miss"}'
+    assert _sample(after.text, miss) > _sample(before, miss)
+    assert "# TYPE voice_sessions gauge" in after.text
+    assert "voice_pending_inputs " in after.text
+    assert "# TYPE voice_background_turns gauge" in after.text
+
+
+def test_metrics_endpoint_reports_prefetch_outcomes():
+    from collections import Counter
+    from services.prefetch import Prefetcher
+
+    prefetcher = Prefetcher()
+    prefetcher.stats = Counter(started=3, completed=2, cancelled=1, used=2, wasted=1)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return (await client.get("/metrics")).text
+
+    with patch('server.prefetcher', prefetcher):
+        text = asyncio.run(scenario())
+
+    assert _sample(text, 'voice_prefetches_total{outcome="started"}') == 3
+    assert _sample(text, 'voice_prefetches_total{outcome="cancelled"}') == 1
+    assert _sample(text, 'voice_prefetches_total{outcome="failed"}') == 0
+    assert _sample(text, 'voice_prefetch_keys_total{result="used"}') == 2
+    assert _sample(text, 'voice_prefetch_keys_total{result="wasted"}') == 1
@@ -0,0 +1,137 @@
+import asyncio
+import time
+
+import pytest
+
+from services.network_cache import NETWORK_STATUS_CHANNEL, NetworkStatusCache, encode_status_update
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def test_entries_expire_after_ttl():
+    cache = NetworkStatusCache(ttl=0.05)
+    cache.put("India-West", "Operational")
+    assert cache.get("India-West") == "Operational"
+    time.sleep(0.06)
+    assert cache.get("India-West") is None
+
+
+def test_malformed_update_is_ignored():
+    cache = NetworkStatusCache()
+    cache.apply_update("not json")
+    cache.apply_update(encode_status_update("India-South", "Outage Detected"))
+    assert cache.updates == 1
+    assert cache.get("India-South") == "Outage Detected"
+
+
+def test_outage_spike_shares_one_read():
+    cache = NetworkStatusCache(ttl=60)
+    reads = 0
+
+    async def load():
+        nonlocal reads
+        reads += 1
+        await asyncio.sleep(0.01)
+        return "Outage Detected"
+
+    async def spike():
+        return await asyncio.gather(*(cache.aget_or_load("India-South", load) for _ in range(500)))
+
+    statuses = asyncio.run(spike())
+    assert set(statuses) == {"Outage Detected"}
+    assert reads == 1
+
+
+def test_published_status_reaches_other_servers():
+    from services.database import AsyncRedisDatabase
+
+    server = fakeredis.FakeServer()
+    publisher = AsyncRedisDatabase(client=fakeredis.FakeAsyncRedis(server=server, decode_responses=True))
+    subscriber_client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    # Cache of another server process, already holding a stale status
+    remote_cache = NetworkStatusCache(ttl=60)
+    remote_cache.put("India-South", "Operational")
+
+    async def scenario():
+        listener = asyncio.create_task(remote_cache.listen(subscriber_client))
+        await asyncio.sleep(0.05)
+        await publisher.set_network_status("India-South", "Outage Detected")
+        for _ in range(100):
+            if remote_cache.updates:
+                break
+            await asyncio.sleep(0.01)
+        listener.cancel()
+
+    asyncio.run(scenario())
+    assert remote_cache.get("India-South") == "Outage Detected"
+
+
+def test_listener_survives_unexpected_errors():
+    server = fakeredis.FakeServer()
+    publisher = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    subscriber_client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    real_pubsub = subscriber_client.pubsub
+    failures = []
+
+    class BrokenPubSub:
+        async def subscribe(self, channel):
+            failures.append(channel)
+            raise OSError("connection reset by peer")
+
+        async def aclose(self):
+            pass
+
+    def pubsub(**kwargs):
+        # The first subscription fails with something other than a RedisError
+        return BrokenPubSub() if not failures else real_pubsub(**kwargs)
+
+    subscriber_client.pubsub = pubsub
+    cache = NetworkStatusCache(ttl=60)
+
+    async def scenario():
+        listener = asyncio.create_task(cache.listen(subscriber_client, retry_delay=0.01))
+        await asyncio.sleep(0.1)
+        await publisher.publish(NETWORK_STATUS_CHANNEL, encode_status_update("India-South", "Outage Detected"))
+        for _ in range(100):
+            if cache.updates:
+                break
+            await asyncio.sleep(0.01)
+        listener.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await listener
+
+    asyncio.run(scenario())
+    assert len(failures) == 1
+    assert cache.get("India-South") == "Outage Detected"
+
+
+def test_update_during_load_is_not_overwritten():
+    cache = NetworkStatusCache(ttl=60)
+    read_started = asyncio.Event()
+    release_read = asyncio.Event()
+
+    async def slow_load():
+        # Reads the status just before it changes
+        read_started.set()
+        await release_read.wait()
+        return "Operational"
+
+    async def scenario():
+        load = asyncio.create_task(cache.aget_or_load("India-South", slow_load))
+        await read_started.wait()
+        cache.apply_update(encode_status_update("India-South", "Outage Detected"))
+        release_read.set()
+        return await load
+
+    assert asyncio.run(scenario()) == "Operational"
+    assert cache.get("India-South") == "Outage Detected"
+
+    # Same race on the blocking path, and a listener reconnect (clear) mid-load
+    cache.get_or_load("India-West", lambda: cache.apply_update(
+        encode_status_update("India-West", "Outage Detected")) or "Operational")
+    assert cache.get("India-West") == "Outage Detected"
+    cache.get_or_load("India-North", lambda: cache.clear() or "Operational")
+    assert cache.get("India-North") is None
+    # Without a concurrent write the load is cached as before
+    cache.get_or_load("India-North", lambda: "Operational")
+    assert cache.get("India-North") == "Operational"
@@ -0,0 +1,104 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from services.call_cache import CallCacheRegistry
+from services.database import AsyncRedisDatabase
+from services.prefetch import Prefetcher
+from utils.context import set_call_cache
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+class CountingDatabase(AsyncRedisDatabase):
+    delay = 0.0
+
+    def __init__(self, client):
+        super().__init__(client=client)
+        self.round_trips = 0
+
+    async def get_user(self, user_id, fields=None):
+        self.round_trips += 1
+        await asyncio.sleep(self.delay)
+        return await super().get_user(user_id, fields)
+
+
+@pytest.fixture
+def fake_db():
+    db = CountingDatabase(fakeredis.FakeAsyncRedis(decode_responses=True))
+    with patch('services.prefetch.async_db', db), patch('tools.async_tools.async_db', db):
+        yield db
+
+
+def test_prefetched_profile_serves_the_turn(fake_db):
+    from tools import async_tools
+    registry = CallCacheRegistry()
+    prefetcher = Prefetcher(registry=registry, mode="async")
+
+    async def scenario():
+        await fake_db.client.hset("user:u1", mapping={"name": "A", "balance": "250"})
+        # /gather_speech: filler is playing
+        await prefetcher.start("CA1", "u1", "billing")
+        # /process_speech: the agent's tool call
+        set_call_cache(registry.for_call("CA1"))
+        result = await async_tools.check_balance("u1")
+        prefetcher.finish("CA1")
+        return result
+
+    result = asyncio.run(scenario())
+    assert result["balance_amount"] == 250.0
+    assert fake_db.round_trips == 1
+    assert prefetcher.stats["used"] == 1
+    assert prefetcher.stats["wasted"] == 0
+
+
+def test_network_prefetch_warms_region_status(fake_db):
+    registry = CallCacheRegistry()
+    prefetcher = Prefetcher(registry=registry, mode="async")
+
+    async def scenario():
+        await fake_db.client.hset("user:u1", mapping={"region": "India-South"})
+        await fake_db.client.set("network:India-South", "Outage Detected")
+        await prefetcher.start("CA1", "u1", "network")
+        return registry.for_call("CA1")
+
+    cache = asyncio.run(scenario())
+    assert cache.get(("network", "India-South")) == "Outage Detected"
+
+
+def test_unused_prefetch_is_counted_as_wasted(fake_db):
+    registry = CallCacheRegistry()
+    prefetcher = Prefetcher(registry=registry, mode="async")
+
+    async def scenario():
+        await prefetcher.start("CA1", "u1", "billing")
+        prefetcher.finish("CA1")
+
+    asyncio.run(scenario())
+    assert prefetcher.stats["wasted"] == 1
+
+
+def test_slow_prefetch_is_cancelled_when_turn_ends(fake_db):
+    fake_db.delay = 1.0
+    prefetcher = Prefetcher(registry=CallCacheRegistry(), mode="async")
+
+    async def scenario():
+        task = prefetcher.start("CA1", "u1", "billing")
+        # A newer utterance for the same call supersedes it
+        prefetcher.start("CA1", "u1", "network")
+        await asyncio.sleep(0)
+        prefetcher.finish("CA1")
+        await asyncio.sleep(0)
+        return task
+
+    task = asyncio.run(scenario())
+    assert task.cancelled()
+    assert prefetcher.stats["cancelled"] == 2
+    assert len(prefetcher) == 0
+
+
+def test_no_prefetch_for_escalation(fake_db):
+    prefetcher = Prefetcher(registry=CallCacheRegistry(), mode="async")
+    assert prefetcher.start("CA1", "u1", "human") is None
+    assert prefetcher.stats["started"] == 0
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from agents.prompt_cache import PromptCache
+
+
+def request(instruction="You are a billing support specialist."):
+    return LlmRequest(
+        contents=[types.Content(role="user", parts=[types.Part(text="What is my balance")])],
+        config=types.GenerateContentConfig(
+            system_instruction=instruction,
+            tools=[types.Tool(function_declarations=[types.FunctionDeclaration(name="check_balance")])],
+        ),
+    )
+
+
+class FakeCaches:
+    def __init__(self, fail=False):
+        self.created = []
+        self.attempts = 0
+        self.fail = fail
+
+    async def create(self, model, config):
+        self.attempts += 1
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise RuntimeError("Cached content is too small")
+        self.created.append(config)
+        return types.CachedContent(name=f"cachedContents/{len(self.created)}", model=model)
+
+
+def test_static_prefix_is_served_from_one_cache_per_key():
+    cache = PromptCache(mode="explicit", ttl=60)
+    caches = FakeCaches()
+
+    async def scenario():
+        original = request()
+        first = await cache.apply(original, "key-a", "gemini-2.0-flash", caches.create)
+        again = await cache.apply(request(), "key-a", "gemini-2.0-flash", caches.create)
+        other_key = await cache.apply(request(), "key-b", "gemini-2.0-flash", caches.create)
+        other_prompt = await cache.apply(request("You handle escalations."), "key-a", "gemini-2.0-flash",
+                                         caches.create)
+        return original, first, again, other_key, other_prompt
+
+    original, first, again, other_key, other_prompt = asyncio.run(scenario())
+    assert len(caches.created) == 3
+    assert caches.created[0].system_instruction == "You are a billing support specialist."
+    assert caches.created[0].ttl == "60s"
+    # The cached request carries the conversation but not the prefix it points at
+    assert first.config.cached_content == again.config.cached_content == "cachedContents/1"
+    assert first.config.system_instruction is None and first.config.tools is None
+    assert first.contents == original.contents
+    assert other_key.config.cached_content != other_prompt.config.cached_content
+    # The request ADK holds is left as it was (a 429 retry on another key starts from it)
+    assert original.config.cached_content is None and original.config.system_instruction
+
+
+def test_concurrent_requests_do_not_wait_for_the_cache():
+    cache = PromptCache(mode="explicit")
+    caches = FakeCaches()
+
+    async def scenario():
+        return await asyncio.gather(*(
+            cache.apply(request(), "key-a", "gemini-2.0-flash", caches.create) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert len(caches.created) == 1
+    assert sum(1 for r in results if r.config.cached_content) == 1
+
+
+def test_uncacheable_prefix_falls_back_and_is_not_retried_at_once():
+    cache = PromptCache(mode="explicit", retry_after=600)
+    caches = FakeCaches(fail=True)
+
+    async def scenario():
+        first = await cache.apply(request(), "key-a", "gemini-2.0-flash", caches.create)
+        second = await cache.apply(request(), "key-a", "gemini-2.0-flash", caches.create)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first.config.system_instruction and second.config.system_instruction
+    assert first.config.cached_content is None
+    # The second request did not try again
+    assert caches.attempts == 1
+
+
+def test_off_mode_sends_the_request_as_is():
+    original = request()
+    assert asyncio.run(PromptCache(mode="off").apply(original, "key-a", "m", None)) is original
+
+
+def test_static_first_layout_shrinks_what_each_call_sends():
+    pytest.importorskip("fakeredis")
+    from benchmarks.bench_prompt_cache import reusable_bytes, run_callers
+
+    old = asyncio.run(run_callers(4, "id-first"))
+    static = asyncio.run(run_callers(4, "static-first"))
+    explicit = asyncio.run(run_callers(4, "explicit"))
+
+    # Same dialogs, same model calls
+    assert old.calls == static.calls == explicit.calls
+    share = lambda model: reusable_bytes(model.prompts) / sum(len(p) for p in model.prompts)
+    assert share(static) > share(old)
+    sent = lambda model: sum(s for s, _ in model.prompt_bytes)
+    assert sent(explicit) < sent(static) / 2
+    # Only the first call of each agent (4 prompts) goes out uncached
+    assert sum(1 for _, cached in explicit.prompt_bytes if not cached) <= 4
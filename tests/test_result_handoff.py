@@ -0,0 +1,106 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+
+import server
+from agents.agent_factory import RunnerPool
+
+
+class QuickRunner:
+    """Stand-in Runner whose turn finishes in a fraction of a second."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def run_async(self, **kwargs):
+        await asyncio.sleep(0.05)
+        yield SimpleNamespace(text="Your balance is 500 rupees.")
+
+
+def _client():
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test")
+
+
+def test_async_turn_holds_on_result_loop_instead_of_pauses():
+    async def scenario():
+        await server.call_store.stash_input("+911111111111", "Check my balance")
+        async with _client() as client:
+            hold = await client.post("/process_speech", data={"From": "+911111111111", "CallSid": "CA1"})
+            redirect = hold.text.split("<Redirect>")[1].split("</Redirect>")[0].replace("&amp;", "&")
+            start = time.perf_counter()
+            result = await client.post(redirect)
+            return hold, result, time.perf_counter() - start
+
+    with patch('server.runner_pool', RunnerPool(QuickRunner)), \
+         patch('server.intent_router.mode', "llm"), \
+         patch('server.RESULT_HANDOFF_MODE', "await"):
+        hold, result, elapsed = asyncio.run(scenario())
+
+    assert "<Pause" not in hold.text
+    assert "/await_result?turn=" in hold.text
+    assert "Your balance is 500 rupees." in result.text
+    assert "<Gather" in result.text
+    assert elapsed < 1.0
+
+
+def test_result_is_played_as_soon_as_it_is_published():
+    async def scenario():
+        async with _client() as client:
+            waiting = asyncio.create_task(client.post(f"/await_result?turn=t-live&started={time.time()}"))
+            await asyncio.sleep(0.2)
+            published_at = time.perf_counter()
+            await server.call_store.publish_result("t-live", "No outage in your area.")
+            resp = await waiting
+            return resp, time.perf_counter() - published_at
+
+    resp, latency = asyncio.run(scenario())
+    assert "No outage in your area." in resp.text
+    assert latency < 0.5
+
+
+def test_hold_loop_redirects_until_deadline():
+    async def scenario(started):
+        async with _client() as client:
+            return await client.post(f"/await_result?turn=t-slow&started={started}")
+
+    with patch('server.RESULT_POLL_SECONDS', 0.05), patch('server.RESULT_DEADLINE_SECONDS', 10):
+        waiting = asyncio.run(scenario(time.time()))
+        expired = asyncio.run(scenario(time.time() - 10))
+
+    assert "Still checking" in waiting.text
+    assert "/await_result?turn=t-slow" in waiting.text
+    assert "taking longer than expected" in expired.text
+    assert "<Gather" in expired.text
+    assert "<Hangup" not in expired.text
+
+
+def test_update_mode_falls_back_to_hold_loop_when_push_fails():
+    from fake_twilio import FakeTwilioApi
+    from services.twilio_updater import TwilioCallUpdater
+
+    api = FakeTwilioApi(faults=[{"status": 500}, {}])
+
+    async def scenario(updater):
+        with patch('server.twilio_updater', updater):
+            await server.handle_async_agent("+912222222222", "Check my balance", "CA9", "http://test", "t-failed")
+            await server.handle_async_agent("+912222222222", "Check my balance", "CA9", "http://test", "t-pushed")
+        failed = await server.call_store.wait_result("t-failed", timeout=0)
+        pushed = await server.call_store.wait_result("t-pushed", timeout=0)
+        await updater.close()
+        return failed, pushed
+
+    with api.serve() as base_url, \
+         patch('server.runner_pool', RunnerPool(QuickRunner)), \
+         patch('server.intent_router.mode', "llm"), \
+         patch('server.RESULT_HANDOFF_MODE', "update"):
+        updater = TwilioCallUpdater(account_sid="AC-test", auth_token="token", base_url=base_url, retries=0)
+        failed, pushed = asyncio.run(scenario(updater))
+
+    # A failed push is still spoken by the hold loop; a successful one is not spoken twice
+    assert failed == "Your balance is 500 rupees."
+    assert pushed is None
+    assert len(api.applied) == 1
+    assert "http://test/gather_speech" in api.applied[0][1]
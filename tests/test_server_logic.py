@@ -53,3 +53,68 @@ def test_gather_speech_no_input():
     # If it's None, it might fail or proceed.
     # Let's skip this one or check server implementation.
     pass
+
+def test_turn_ids_are_unique_and_scoped_to_the_session_without_call_sid():
+    import asyncio
+    from types import SimpleNamespace
+
+    import server
+    from agents.agent_factory import RunnerPool
+    from utils.context import get_turn_context
+
+    class TurnIdRunner:
+        async def run_async(self, **kwargs):
+            yield SimpleNamespace(text=f"{kwargs['session_id']} {get_turn_context()}")
+
+    async def two_turns():
+        return [await server.get_agent_response("+15550001111", "Pay 200 rupees") for _ in range(2)]
+
+    with patch('server.runner_pool', RunnerPool(TurnIdRunner)), patch('server.intent_router.mode', "llm"):
+        first, second = asyncio.run(two_turns())
+
+    session_id, first_turn = first.split(" ")
+    assert first_turn.startswith(f"{session_id}:")
+    assert second.split(" ")[1] != first_turn
+
+
+def test_retried_webhook_charges_once():
+    import asyncio
+    import json
+    from types import SimpleNamespace
+
+    import httpx
+    import server
+    from agents.agent_factory import RunnerPool
+    from services.database import AsyncRedisDatabase
+
+    fakeredis = pytest.importorskip("fakeredis")
+    db = AsyncRedisDatabase(client=fakeredis.FakeAsyncRedis(decode_responses=True))
+
+    class PayingRunner:
+        async def run_async(self, user_id=None, **kwargs):
+            from tools import async_tools
+            paid = await async_tools.process_payment(user_id, 200.0)
+            yield SimpleNamespace(text=f"Paid, transaction {paid['transaction_id']}.")
+
+    async def deliver_twice():
+        await db.client.set("user:+15550002222", json.dumps({"balance": 500.0}))
+        form = {"From": "+15550002222", "CallSid": "CA-retry", "SpeechResult": "Pay 200 rupees"}
+        replies = []
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # Twilio re-posts the same utterance (e.g. after a timeout)
+            for _ in range(2):
+                await client.post("/gather_speech", data=form)
+                replies.append((await client.post("/process_speech", data=form)).text)
+        return replies, await db.get_user("+15550002222")
+
+    with patch('tools.async_tools.async_db', db), \
+         patch('server.runner_pool', RunnerPool(PayingRunner)), \
+         patch('server.intent_router.mode', "llm"), \
+         patch('server.RESULT_HANDOFF_MODE', "update"):
+        # No Twilio credentials in tests, so the turn runs inside /process_speech
+        (first, second), user = asyncio.run(deliver_twice())
+
+    assert user["balance"] == 300.0
+    # The retry reports the original payment
+    assert first.split("transaction ")[1] == second.split("transaction ")[1]
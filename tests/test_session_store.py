@@ -0,0 +1,225 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.adk.sessions.base_session_service import GetSessionConfig
+from google.adk.sessions.in_memory_session_service import InMemorySessionService
+from google.genai.types import Content, Part
+
+from services.session_store import RedisSessionService, RedisCallStore, InMemoryCallStore
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+
+def _text_event(author, text, **kwargs):
+    return Event(
+        author=author,
+        invocation_id="inv-1",
+        content=Content(role="user" if author == "user" else "model", parts=[Part(text=text)]),
+        **kwargs
+    )
+
+
+def test_session_round_trip_across_service_instances(redis_client):
+    async def scenario():
+        # Two services on the same Redis stand in for two uvicorn workers
+        worker_a = RedisSessionService(redis_client, ttl=60)
+        worker_b = RedisSessionService(redis_client, ttl=60)
+
+        session = await worker_a.create_session(
+            app_name="voice-agent", user_id="+911234567890", state={"user_id": "+911234567890"}
+        )
+        await worker_a.append_event(session, _text_event("user", "Check my balance"))
+        await worker_a.append_event(session, _text_event(
+            "BillingAgent", "Your balance is 1245 rupees.",
+            actions=EventActions(state_delta={"last_intent": "billing"})
+        ))
+
+        loaded = await worker_b.get_session(
+            app_name="voice-agent", user_id="+911234567890", session_id=session.id
+        )
+        recent = await worker_b.get_session(
+            app_name="voice-agent", user_id="+911234567890", session_id=session.id,
+            config=GetSessionConfig(num_recent_events=1)
+        )
+        wrong_user = await worker_b.get_session(
+            app_name="voice-agent", user_id="+919999999999", session_id=session.id
+        )
+        return session, loaded, recent, wrong_user
+
+    session, loaded, recent, wrong_user = asyncio.run(scenario())
+
+    assert loaded.id == session.id
+    assert loaded.state == {"user_id": "+911234567890", "last_intent": "billing"}
+    assert [e.content.parts[0].text for e in loaded.events] == [
+        "Check my balance", "Your balance is 1245 rupees."
+    ]
+    assert len(recent.events) == 1
+    assert wrong_user is None
+
+
+def test_session_keys_carry_ttl(redis_client):
+    async def scenario():
+        service = RedisSessionService(redis_client, ttl=60, prefix="t")
+        session = await service.create_session(app_name="voice-agent", user_id="u1")
+        await service.append_event(session, _text_event("user", "hello"))
+        return session, [await redis_client.ttl(k) for k in await redis_client.keys("t:*")]
+
+    session, ttls = asyncio.run(scenario())
+    assert len(ttls) == 3
+    assert all(0 < ttl <= 60 for ttl in ttls)
+
+
+def test_get_session_refreshes_index_ttl(redis_client):
+    async def scenario():
+        service = RedisSessionService(redis_client, ttl=60, prefix="t")
+        session = await service.create_session(app_name="voice-agent", user_id="u1")
+        await redis_client.expire("t:adk:idx:voice-agent:u1", 5)
+        await service.get_session(app_name="voice-agent", user_id="u1", session_id=session.id)
+        return await redis_client.ttl("t:adk:idx:voice-agent:u1")
+
+    assert 5 < asyncio.run(scenario()) <= 60
+
+
+def test_events_are_capped(redis_client):
+    async def scenario():
+        service = RedisSessionService(redis_client, ttl=60, max_events=3)
+        session = await service.create_session(app_name="voice-agent", user_id="u1")
+        for i in range(5):
+            await service.append_event(session, _text_event("user", f"turn {i}"))
+        return await service.get_session(app_name="voice-agent", user_id="u1", session_id=session.id)
+
+    loaded = asyncio.run(scenario())
+    assert [e.content.parts[0].text for e in loaded.events] == ["turn 2", "turn 3", "turn 4"]
+
+
+def test_delete_session(redis_client):
+    async def scenario():
+        service = RedisSessionService(redis_client, ttl=60)
+        session = await service.create_session(app_name="voice-agent", user_id="u1")
+        listed = await service.list_sessions(app_name="voice-agent", user_id="u1")
+        await service.delete_session(app_name="voice-agent", user_id="u1", session_id=session.id)
+        gone = await service.get_session(app_name="voice-agent", user_id="u1", session_id=session.id)
+        return session, listed, gone
+
+    session, listed, gone = asyncio.run(scenario())
+    assert [s.id for s in listed.sessions] == [session.id]
+    assert gone is None
+
+
+@pytest.mark.parametrize("store_factory", [
+    lambda client: RedisCallStore(client, session_ttl=60, pending_ttl=5),
+    lambda client: InMemoryCallStore(session_ttl=60, pending_ttl=5),
+])
+def test_call_store_pending_input_is_popped_once(redis_client, store_factory):
+    store = store_factory(redis_client)
+
+    async def scenario():
+        await store.stash_input("+911234567890", "Check my balance")
+        await store.set_session_id("+911234567890", "session-1")
+        return (
+            await store.pop_input("+911234567890"),
+            await store.pop_input("+911234567890"),
+            await store.get_session_id("+911234567890"),
+            await store.get_session_id("+919999999999"),
+        )
+
+    first, second, session_id, unknown = asyncio.run(scenario())
+    assert first == "Check my balance"
+    assert second is None
+    assert session_id == "session-1"
+    assert unknown is None
+
+
+@pytest.mark.parametrize("store_factory", [
+    lambda client: RedisCallStore(client, session_ttl=60, pending_ttl=5),
+    lambda client: InMemoryCallStore(session_ttl=60, pending_ttl=5),
+])
+def test_call_store_result_wakes_waiter(redis_client, store_factory):
+    store = store_factory(redis_client)
+
+    async def scenario():
+        # Published before anyone waits (caller between long-polls)
+        await store.publish_result("turn-1", "Your balance is 500.")
+        early = await store.wait_result("turn-1", timeout=1)
+
+        # Published while the long-poll is waiting
+        waiter = asyncio.create_task(store.wait_result("turn-2", timeout=5))
+        await asyncio.sleep(0.05)
+        start = asyncio.get_running_loop().time()
+        await store.publish_result("turn-2", "No outage in your area.")
+        woken = await waiter
+        latency = asyncio.get_running_loop().time() - start
+
+        missing = await store.wait_result("turn-3", timeout=0.05)
+        consumed = await store.wait_result("turn-1", timeout=0)
+        return early, woken, latency, missing, consumed
+
+    early, woken, latency, missing, consumed = asyncio.run(scenario())
+    assert early == "Your balance is 500."
+    assert woken == "No outage in your area."
+    assert latency < 0.5
+    assert missing is None
+    assert consumed is None
+
+
+def test_redis_call_store_counts_without_scanning(redis_client):
+    store = RedisCallStore(redis_client, session_ttl=60, pending_ttl=60, prefix="t")
+
+    async def scenario():
+        await store.set_session_id("u1", "session-1")
+        await store.set_session_id("u2", "session-2")
+        await store.set_session_id("u2", "session-3")
+        await store.stash_input("u1", "hello")
+        await store.stash_input("u2", "hi")
+        await store.pop_input("u2")
+        live = await store.count_sessions(), await store.count_pending()
+
+        # An expired caller drops out of the count with its key
+        await redis_client.zadd("t:callers", {"u1": 0})
+        await redis_client.delete("t:caller:u1")
+        with patch.object(redis_client, "scan_iter", side_effect=AssertionError("keyspace scan")):
+            return live, (await store.count_sessions(), await store.count_pending())
+
+    assert asyncio.run(scenario()) == ((2, 1), (1, 1))
+
+
+def test_in_memory_call_store_expires_entries():
+    store = InMemoryCallStore(session_ttl=0, pending_ttl=0)
+
+    async def scenario():
+        await store.set_session_id("u1", "session-1")
+        await store.stash_input("u1", "hello")
+        return await store.get_session_id("u1"), await store.pop_input("u1"), await store.count_sessions()
+
+    assert asyncio.run(scenario()) == (None, None, 0)
+
+
+def test_in_memory_call_store_deletes_expired_adk_sessions():
+    service = InMemorySessionService()
+    store = InMemoryCallStore(session_ttl=0, pending_ttl=0, session_service=service)
+
+    async def scenario():
+        expired = await service.create_session(app_name="voice-agent", user_id="u1")
+        await store.set_session_id("u1", expired.id)
+        looked_up = await store.get_session_id("u1")
+
+        swept = await service.create_session(app_name="voice-agent", user_id="u2")
+        await store.set_session_id("u2", swept.id)
+        await store.count_sessions()
+
+        return looked_up, [
+            await service.get_session(app_name="voice-agent", user_id=s.user_id, session_id=s.id)
+            for s in (expired, swept)
+        ]
+
+    looked_up, sessions = asyncio.run(scenario())
+    assert looked_up is None
+    assert sessions == [None, None]
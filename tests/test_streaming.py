@@ -0,0 +1,73 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from starlette.testclient import TestClient
+
+import server
+from agents.agent_factory import RunnerPool
+from services.response_stream import SentenceChunker
+from fake_twilio import FakeConversationRelay
+
+SENTENCE_GAP_SECONDS = 0.3
+
+
+class StreamingRunner:
+    """Stand-in Runner that streams two sentences (SSE partials + final aggregate)."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def run_async(self, **kwargs):
+        yield SimpleNamespace(text="Your balance is ", partial=True)
+        yield SimpleNamespace(text="Rs. 1,245.50. ", partial=True)
+        await asyncio.sleep(SENTENCE_GAP_SECONDS)
+        yield SimpleNamespace(text="Anything else?", partial=True)
+        yield SimpleNamespace(text="Your balance is Rs. 1,245.50. Anything else?", partial=False)
+
+
+def test_chunker_cuts_on_sentence_ends():
+    chunker = SentenceChunker(max_chars=200)
+    assert chunker.feed("Your balance is Rs. ") == ["Your balance is Rs."]
+    assert chunker.feed("1,245.50") == []
+    assert chunker.feed(". Anything") == ["1,245.50."]
+    assert chunker.feed(" else?") == []
+    assert chunker.flush() == ["Anything else?"]
+
+
+def test_chunker_caps_long_sentences():
+    chunker = SentenceChunker(max_chars=20)
+    chunks = chunker.feed("one two three four five six seven eight") + chunker.flush()
+    assert all(len(c) <= 20 for c in chunks)
+    assert " ".join(chunks) == "one two three four five six seven eight"
+
+
+def test_first_sentence_arrives_before_reply_completes():
+    with patch('server.runner_pool', RunnerPool(StreamingRunner)), \
+         patch('server.intent_router.mode', "llm"):
+        client = TestClient(server.app)
+        with client.websocket_connect("/media") as websocket:
+            relay = FakeConversationRelay(websocket)
+            relay.setup()
+            tokens = relay.say("Check my balance")
+
+    spoken = "".join(token for _, token in tokens)
+    # The final aggregated event is not spoken twice
+    assert spoken.split() == "Your balance is Rs. 1,245.50. Anything else?".split()
+    first_at, last_at = tokens[0][0], tokens[-1][0]
+    assert first_at < SENTENCE_GAP_SECONDS
+    assert last_at >= SENTENCE_GAP_SECONDS
+
+
+def test_gather_path_still_returns_whole_reply():
+    with patch('server.runner_pool', RunnerPool(StreamingRunner)), \
+         patch('server.intent_router.mode', "llm"):
+        reply = asyncio.run(server.get_agent_response("local_tester", "Check my balance"))
+    assert reply == "Your balance is Rs. 1,245.50. Anything else?"
+
+
+def test_relay_transport_connects_call_to_media():
+    with patch('server.VOICE_TRANSPORT', "relay"):
+        resp = TestClient(server.app).post("/voice")
+    assert '<ConversationRelay url="ws://testserver/media"' in resp.text
+    assert "<Gather" not in resp.text
@@ -1,3 +1,5 @@
+import asyncio
+import json
 import pytest
 from unittest.mock import MagicMock, patch
 from tools.billing_tools import check_balance, process_payment
@@ -41,3 +43,65 @@ def test_escalation_ticket(mock_db):
     assert result["action"] == "transfer_call"
     assert "TICKET-" in result["ticket_id"]
     assert result["user_id"] == "user123"
+
+# Async tools against an in-process fake Redis
+@pytest.fixture
+def fake_async_db():
+    fakeredis = pytest.importorskip("fakeredis")
+    from services.database import AsyncRedisDatabase
+    fake = AsyncRedisDatabase(client=fakeredis.FakeAsyncRedis(decode_responses=True))
+    with patch('tools.async_tools.async_db', fake):
+        yield fake
+
+def test_async_check_outage_found(fake_async_db):
+    from tools import async_tools
+
+    async def scenario():
+        await fake_async_db.client.set("user:user123", json.dumps({"region": "India-South"}))
+        await fake_async_db.set_network_status("India-South", "Outage Detected")
+        return await async_tools.check_outage("user123")
+
+    result = asyncio.run(scenario())
+    assert result["status"] == "outage_confirmed"
+    assert result["region"] == "India-South"
+
+def test_async_process_payment(fake_async_db):
+    from tools import async_tools
+
+    async def scenario():
+        await fake_async_db.client.set("user:user123", json.dumps({"balance": 500.0}))
+        paid = await async_tools.process_payment("user123", 200.0)
+        balance = await async_tools.check_balance("user123")
+        return paid, balance
+
+    paid, balance = asyncio.run(scenario())
+    assert paid["remaining_balance"] == 300.0
+    assert balance["balance_amount"] == 300.0
+
+def test_repeated_payment_in_one_turn_reports_the_original(fake_async_db):
+    from tools import async_tools
+    from utils.context import set_turn_context
+
+    async def scenario():
+        await fake_async_db.client.set("user:user123", json.dumps({"balance": 500.0}))
+        set_turn_context("CA1:turn1")
+        first = await async_tools.process_payment("user123", 200.0)
+        repeat = await async_tools.process_payment("user123", 200.0)
+        # Same words in a later turn of the call: a new payment
+        set_turn_context("CA1:turn2")
+        later = await async_tools.process_payment("user123", 200.0)
+        return first, repeat, later
+
+    first, repeat, later = asyncio.run(scenario())
+    assert not first["duplicate"] and not later["duplicate"]
+    assert repeat["duplicate"]
+    assert repeat["transaction_id"] == first["transaction_id"] != later["transaction_id"]
+    assert first["remaining_balance"] == repeat["remaining_balance"] == 300.0
+    assert later["remaining_balance"] == 100.0
+
+def test_async_escalation_ticket(fake_async_db):
+    from tools import async_tools
+
+    result = asyncio.run(async_tools.escalate_to_human("user123", "I am angry"))
+    assert result["action"] == "transfer_call"
+    assert "TICKET-" in result["ticket_id"]
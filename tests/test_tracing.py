@@ -0,0 +1,91 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+import pytest
+from google.adk.tools import FunctionTool
+
+import server
+from agents.agent_factory import RunnerPool
+from services import tracing
+from services.tracing import Tracer, trace_id_for
+
+
+def test_spans_nest_and_summarise():
+    tracer = Tracer(path="")
+    for _ in range(10):
+        with tracer.span("process_speech", call_sid="CA1") as outer:
+            with tracer.span("agent_turn") as inner:
+                pass
+    assert inner.parent_id == outer.span_id
+    assert inner.call_sid == "CA1"
+    assert inner.trace_id == outer.trace_id == trace_id_for("CA1")
+
+    summary = tracer.summary()
+    assert summary["agent_turn"]["count"] == 10
+    assert summary["process_speech"]["p50"] <= summary["process_speech"]["p99"]
+
+
+def test_otlp_export_batches_spans(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(path=str(path), export_format="otlp", batch_size=2)
+    with tracer.span("gather_speech", call_sid="CA1"):
+        with tracer.span("tool:check_balance"):
+            pass
+
+    [line] = path.read_text().splitlines()
+    spans = json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    tool, webhook = spans
+    assert tool["name"] == "tool:check_balance"
+    assert tool["parentSpanId"] == webhook["spanId"]
+    assert {"key": "call_sid", "value": {"stringValue": "CA1"}} in webhook["attributes"]
+
+
+def test_traced_tools_keep_their_adk_declaration():
+    from tools import async_tools, billing_tools
+    assert FunctionTool(billing_tools.check_balance).name == "check_balance"
+    assert asyncio.iscoroutinefunction(async_tools.check_balance)
+
+
+class ToolCallingRunner:
+    """Stand-in Runner: dispatcher hop, a tool call, then the specialist's answer."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def run_async(self, user_id=None, **kwargs):
+        from tools import async_tools
+        yield SimpleNamespace(author="RootDispatcher", content=None)
+        balance = await async_tools.check_balance(user_id)
+        yield SimpleNamespace(author="BillingAgent", text=f"Your balance is {balance['balance_amount']:.0f}.")
+
+
+def test_turn_is_traced_end_to_end(tmp_path):
+    fakeredis = pytest.importorskip("fakeredis")
+    from services.database import AsyncRedisDatabase
+    fake = AsyncRedisDatabase(client=fakeredis.FakeAsyncRedis(decode_responses=True))
+    path = tmp_path / "traces.jsonl"
+
+    async def scenario():
+        await fake.client.hset("user:local_tester", mapping={"balance": "500"})
+        await server.call_store.stash_input("local_tester", "Check my balance")
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/process_speech", data={"From": "local_tester", "CallSid": "CA-trace"})
+
+    with patch.object(tracing.tracer, "path", str(path)), \
+         patch.object(tracing.tracer, "batch_size", 1), \
+         patch('tools.async_tools.async_db', fake), \
+         patch('server.runner_pool', RunnerPool(ToolCallingRunner)), \
+         patch('server.intent_router.mode', "llm"):
+        resp = asyncio.run(scenario())
+
+    assert "Your balance is 500." in resp.text
+    spans = {s["name"]: s for s in map(json.loads, path.read_text().splitlines()) if s["call_sid"] == "CA-trace"}
+    assert {"process_speech", "agent_turn", "session_lookup", "event:RootDispatcher",
+            "tool:check_balance", "event:BillingAgent"} <= set(spans)
+    assert spans["agent_turn"]["parent_id"] == spans["process_speech"]["span_id"]
+    assert spans["tool:check_balance"]["parent_id"] == spans["agent_turn"]["span_id"]
+    assert "tool:check_balance" in tracing.tracer.summary()
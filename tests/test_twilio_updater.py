@@ -0,0 +1,123 @@
+import asyncio
+import threading
+
+import pytest
+
+from fake_twilio import FakeTwilioApi
+from services.twilio_updater import TwilioCallUpdater, TwilioUpdateError
+
+
+def _updater(base_url, **kwargs):
+    kwargs.setdefault("retries", 3)
+    return TwilioCallUpdater(account_sid="AC-test", auth_token="token", base_url=base_url,
+                             timeout=0.2, base_delay=0.01, max_delay=0.05, **kwargs)
+
+
+def _run(api, scenario, **kwargs):
+    with api.serve() as base_url:
+        updater = _updater(base_url, **kwargs)
+
+        async def main():
+            try:
+                return await scenario(updater)
+            finally:
+                await updater.close()
+
+        return asyncio.run(main()), updater
+
+
+def test_retries_5xx_and_timeouts_then_succeeds():
+    api = FakeTwilioApi(faults=[{"status": 500}, {"delay": 0.5}, {"status": 503}])
+    result, updater = _run(api, lambda u: u.update("CA1", "<Response><Say>Hi</Say></Response>"))
+
+    assert result["sid"] == "CA1"
+    assert api.applied == [("CA1", "<Response><Say>Hi</Say></Response>")]
+    assert updater.stats["retries"] == 3
+    assert updater.stats["ok"] == 1
+
+
+def test_client_errors_are_not_retried():
+    api = FakeTwilioApi(faults=[{"status": 404}])
+    with pytest.raises(TwilioUpdateError, match="404"):
+        _run(api, lambda u: u.update("CA-gone", "<Response/>"))
+    assert api.requests == 1
+
+
+def test_gives_up_after_bounded_retries():
+    api = FakeTwilioApi(faults=[{"status": 502}] * 10)
+    with pytest.raises(TwilioUpdateError, match="3 attempts"):
+        _run(api, lambda u: u.update("CA1", "<Response/>"), retries=2)
+    assert api.requests == 3
+
+
+def test_updates_to_one_call_apply_in_submission_order():
+    # The first update for CA1 is slow and then fails once; later ones must wait for it
+    api = FakeTwilioApi(faults=[{"delay": 0.1, "status": 500}])
+
+    async def scenario(updater):
+        await asyncio.gather(
+            updater.update("CA1", "first"),
+            updater.update("CA1", "second"),
+            updater.update("CA2", "other call"),
+            updater.update("CA1", "third"),
+        )
+
+    _run(api, scenario)
+    assert [twiml for sid, twiml in api.applied if sid == "CA1"] == ["first", "second", "third"]
+    # Another call is not held up behind CA1's retry
+    assert api.applied[0] == ("CA2", "other call")
+
+
+def test_pool_keeps_connections_alive_and_loop_free():
+    api = FakeTwilioApi(faults=[{"delay": 0.1}])
+
+    async def scenario(updater):
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        beat = asyncio.create_task(heartbeat())
+        for i in range(10):
+            await updater.update("CA1", f"update {i}")
+        beat.cancel()
+        return ticks
+
+    ticks, _ = _run(api, scenario)
+    assert len(api.applied) == 10
+    assert len(api.client_ports) == 1
+    # The event loop kept running during the slow round trip
+    assert ticks >= 5
+
+
+def test_each_event_loop_gets_its_own_client_and_close_shuts_them_all():
+    api = FakeTwilioApi()
+    with api.serve() as base_url:
+        updater = _updater(base_url)
+        # A second loop on another thread, e.g. a worker that runs its own loop
+        other = asyncio.new_event_loop()
+        thread = threading.Thread(target=other.run_forever, daemon=True)
+        thread.start()
+        try:
+            asyncio.run_coroutine_threadsafe(updater.update("CA1", "from the other loop"), other).result(5)
+            other_client = updater._clients[other]
+
+            async def main():
+                await updater.update("CA2", "from this loop")
+                clients = list(updater._clients.values())
+                await updater.close()
+                return clients
+
+            clients = asyncio.run(main())
+        finally:
+            other.call_soon_threadsafe(other.stop)
+            thread.join(5)
+            other.close()
+
+    assert len(clients) == 2 and other_client in clients
+    assert all(client.is_closed for client in clients)
+    assert updater._clients == {}
+    assert sorted(api.applied) == [("CA1", "from the other loop"), ("CA2", "from this loop")]
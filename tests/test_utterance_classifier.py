@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from agents.utterance_classifier import UtteranceClassifier, utterance_classifier
+from server import get_filler_message, is_goodbye, FILLER_MESSAGES, DEFAULT_FILLER
+
+INTENTS = {
+    "goodbye": {"priority": 1, "utterance": ["bye", "see you"], "contains": ["thanks bye"]},
+    "billing": {"contains": ["bill", "balance"]},
+    "greeting": {"word": ["hi"]},
+}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Thanks, bye.", True),
+    ("Thank you, goodbye!", True),
+    ("Bye bye", True),
+    ("  See you ", True),
+    ("OK thanks bye", True),
+    ("Bye, and can you check my bill first?", False),
+    ("I want to end my contract", False),
+    ("", False),
+])
+def test_is_goodbye(text, expected):
+    assert is_goodbye(text) is expected
+
+
+def test_filler_follows_the_winning_intent():
+    assert get_filler_message("Is my bill due?") == FILLER_MESSAGES["billing"]
+    assert get_filler_message("The wifi is slow and keeps dropping, is it down?") == FILLER_MESSAGES["network"]
+    assert get_filler_message("Yes") == DEFAULT_FILLER
+
+
+@pytest.mark.parametrize("text, intent", [
+    ("Can I speak with a person?", "human"),
+    ("I want to talk to someone", "human"),
+    ("Transfer me to an agent please", "human"),
+    ("I want to speak with an agent", "human"),
+    ("I can't get connected", "network"),
+    ("I keep losing connectivity", "network"),
+    ("I need help downloading my invoice", None),
+])
+def test_filler_keeps_its_baseline_phrases(text, intent):
+    # One keyword is enough for the filler (and the prefetch); routing also needs the threshold
+    expected = FILLER_MESSAGES[intent] if intent else DEFAULT_FILLER
+    assert get_filler_message(text) == expected
+
+
+def test_whole_utterance_and_spans():
+    clf = UtteranceClassifier(INTENTS)
+    text = "  See   YOU!"
+    match = clf.classify(text)
+    assert match.intent == "goodbye"
+    assert match.confidence == 1.0
+    # The span indexes the original (not lowercased or normalized) text
+    assert text[match.span[0]:match.span[1]] == text
+
+    # Only the whole utterance counts, not the phrase inside a sentence
+    assert clf.classify("I'll see you tomorrow about the bill").intent == "billing"
+
+
+def test_priority_word_and_contains_modes():
+    clf = UtteranceClassifier(INTENTS)
+    # Goodbye outranks billing even with fewer hits
+    match = clf.classify("my bill, my balance, thanks bye")
+    assert match.intent == "goodbye"
+    assert match.confidence < 1.0
+
+    # "word" phrases need word boundaries, "contains" phrases do not
+    assert clf.classify("this is a chip").intent is None
+    assert clf.classify("hi there").intent == "greeting"
+    assert clf.classify("billing question").intent == "billing"
+
+
+def test_subset_and_from_file(tmp_path):
+    path = tmp_path / "intents.json"
+    path.write_text(json.dumps(INTENTS))
+    clf = UtteranceClassifier.from_file(str(path))
+
+    routable = clf.subset(["billing", "greeting"])
+    assert routable.intents == ["billing", "greeting"]
+    assert routable.classify("thanks bye, my bill").intent == "billing"
+    assert clf.subset({"greeting", "billing"}) is routable
+
+
+def test_shipped_config_covers_the_routable_intents():
+    from agents.intent_router import INTENT_AGENTS
+    assert set(INTENT_AGENTS) <= set(utterance_classifier.intents)
+    assert utterance_classifier.classify("hang up").intent == "goodbye"
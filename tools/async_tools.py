@@ -0,0 +1,63 @@
+"""
+Awaitable versions of the agent tools, backed by services.database.async_db.
+Function names match the sync tools so the model sees the same tool schema.
+"""
+from services.database import async_db
+from services.tracing import traced_tool
+from services.call_cache import cached_async
+from tools.billing_tools import (
+    BALANCE_FIELDS, balance_response, payment_response, payment_idempotency_key, generate_txn_id
+)
+from tools.network_tools import OUTAGE_FIELDS, DIAGNOSTICS_FIELDS, outage_response, diagnostics_response
+from tools.escalation_tools import format_ticket_id, escalation_response
+
+@traced_tool
+async def check_balance(user_id: str) -> dict:
+    if not user_id:
+        return {"status": "error", "message": "No user ID provided"}
+
+    return balance_response(await cached_async(async_db).get_user(user_id, BALANCE_FIELDS))
+
+@traced_tool
+async def process_payment(user_id: str, amount: float) -> dict:
+    if not user_id:
+        return {"status": "error", "message": "No user ID provided"}
+
+    if amount <= 0:
+        return {"status": "error", "message": "Invalid amount"}
+
+    payment = await cached_async(async_db).apply_payment(
+        user_id, amount, payment_idempotency_key(user_id, amount), generate_txn_id())
+    return payment_response(amount, payment)
+
+@traced_tool
+async def check_outage(user_id: str) -> dict:
+    if not user_id:
+        return {"status": "error", "message": "No user ID provided"}
+
+    user = await cached_async(async_db).get_user(user_id, OUTAGE_FIELDS)
+    if not user:
+        return {"status": "error", "message": "User not found"}
+
+    region = user.get("region", "Unknown")
+    return outage_response(region, await cached_async(async_db).get_network_status(region))
+
+@traced_tool
+async def run_diagnostics(user_id: str) -> dict:
+    if not user_id:
+        return {"status": "error", "message": "No user ID provided"}
+
+    return diagnostics_response(await cached_async(async_db).get_user(user_id, DIAGNOSTICS_FIELDS))
+
+@traced_tool
+async def escalate_to_human(user_id: str, reason: str) -> dict:
+    """
+    Escalates the call to a human agent by creating a support ticket.
+    """
+    if not user_id:
+        return {"status": "error", "message": "No user ID provided"}
+
+    ticket_id = format_ticket_id(await async_db.next_ticket_seq())
+
+    success = await async_db.create_ticket(user_id, reason, ticket_id)
+    return escalation_response(user_id, reason, ticket_id, success)
@@ -1,16 +1,34 @@
 from datetime import date, timedelta
 from services.database import db
+from services.tracing import traced_tool
+from services.call_cache import cached
+from utils.context import get_turn_context
 from uuid import uuid4
 
+# Profile fields check_balance needs (HMGET projection)
+BALANCE_FIELDS = ("name", "balance")
+
 def generate_txn_id():
     return f"TXN-{uuid4().hex[:8].upper()}"
 
+def payment_idempotency_key(user_id: str, amount: float):
+    """
+    Same turn + same payment => same key, so webhook retries (and a payment the
+    model repeats within a turn) don't double-charge. See server.turn_id_for.
+    """
+    turn_id = get_turn_context()
+    if not turn_id:
+        return None
+    return f"{turn_id}:{user_id}:{amount}"
+
+@traced_tool
 def check_balance(user_id: str) -> dict:
     if not user_id:
         return {"status": "error", "message": "No user ID provided"}
         
-    user = db.get_user(user_id)
+    return balance_response(cached(db).get_user(user_id, BALANCE_FIELDS))
 
+def balance_response(user: dict) -> dict:
     if not user:
         return {"status": "error", "message": "User not found in database"}
 
@@ -22,6 +40,7 @@ def check_balance(user_id: str) -> dict:
         "due_date": (date.today() + timedelta(days=7)).isoformat()
     }
 
+@traced_tool
 def process_payment(user_id: str, amount: float) -> dict:
     if not user_id:
         return {"status": "error", "message": "No user ID provided"}
@@ -29,13 +48,18 @@ def process_payment(user_id: str, amount: float) -> dict:
     if amount <= 0:
         return {"status": "error", "message": "Invalid amount"}
 
-    new_balance = db.update_balance(user_id, amount)
-    if new_balance is None:
+    payment = cached(db).apply_payment(user_id, amount, payment_idempotency_key(user_id, amount), generate_txn_id())
+    return payment_response(amount, payment)
+
+def payment_response(amount: float, payment) -> dict:
+    if payment is None:
         return {"status": "error", "message": "User not found"}
 
+    # A duplicate reports the payment already made, not a second one
     return {
         "status": "success",
         "amount_paid": amount,
-        "remaining_balance": new_balance,
-        "transaction_id": generate_txn_id()
+        "remaining_balance": payment["balance"],
+        "transaction_id": payment["transaction_id"],
+        "duplicate": payment["duplicate"]
     }
@@ -1,6 +1,7 @@
-from datetime import datetime
 from services.database import db
+from services.tracing import traced_tool
 
+@traced_tool
 def escalate_to_human(user_id: str, reason: str) -> dict:
     """
     Escalates the call to a human agent by creating a support ticket.
@@ -8,10 +9,16 @@ def escalate_to_human(user_id: str, reason: str) -> dict:
     if not user_id:
         return {"status": "error", "message": "No user ID provided"}
 
-    ticket_id = f"TICKET-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    ticket_id = format_ticket_id(db.next_ticket_seq())
 
     success = db.create_ticket(user_id, reason, ticket_id)
-    
+    return escalation_response(user_id, reason, ticket_id, success)
+
+def format_ticket_id(seq: int) -> str:
+    # Short sequential number so TTS can read it digit by digit
+    return f"TICKET-{seq}"
+
+def escalation_response(user_id: str, reason: str, ticket_id: str, success: bool) -> dict:
     if not success:
          return {"status": "error", "message": "Database error while creating ticket"}
 
@@ -1,18 +1,29 @@
+import logging
 import random
 from services.database import db
+from services.tracing import traced_tool
+from services.call_cache import cached
 
+logger = logging.getLogger("NetworkTools")
+
+# Profile fields each tool needs (HMGET projection)
+OUTAGE_FIELDS = ("region",)
+DIAGNOSTICS_FIELDS = ("router_id",)
+
+@traced_tool
 def check_outage(user_id: str) -> dict:
-    print(f"DEBUG: check_outage called with user_id={user_id}")
+    logger.debug("check_outage called with user_id=%s", user_id)
     if not user_id:
         return {"status": "error", "message": "No user ID provided"}
         
-    user = db.get_user(user_id)
+    user = cached(db).get_user(user_id, OUTAGE_FIELDS)
     if not user:
         return {"status": "error", "message": "User not found"}
 
     region = user.get("region", "Unknown")
-    status = db.get_network_status(region)
+    return outage_response(region, cached(db).get_network_status(region))
 
+def outage_response(region: str, status: str) -> dict:
     if status == "Outage Detected":
         return {
             "status": "outage_confirmed",
@@ -27,11 +38,14 @@ def check_outage(user_id: str) -> dict:
         "message": "No known outages in your area."
     }
 
+@traced_tool
 def run_diagnostics(user_id: str) -> dict:
     if not user_id:
         return {"status": "error", "message": "No user ID provided"}
         
-    user = db.get_user(user_id)
+    return diagnostics_response(cached(db).get_user(user_id, DIAGNOSTICS_FIELDS))
+
+def diagnostics_response(user: dict) -> dict:
     if not user:
         return {"status": "error", "message": "User not found"}
 
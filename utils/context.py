@@ -1,14 +1,50 @@
 from contextvars import ContextVar
+import logging
 import threading
 
+logger = logging.getLogger("Context")
+
 # ContextVar to store the current user_id (thread-safe and async-safe)
 _current_user_id: ContextVar[str] = ContextVar("current_user_id", default=None)
 
 def set_user_context(user_id: str):
     """Sets the user_id for the current context."""
-    print(f"DEBUG: Setting context for {user_id} in Thread {threading.get_ident()}")
+    logger.debug("Setting context for %s in Thread %s", user_id, threading.get_ident())
     _current_user_id.set(user_id)
 
 def get_user_context() -> str:
     """Retrieves the user_id from the current context."""
     return _current_user_id.get()
+
+# ContextVar to store the current conversation turn (stable across Twilio webhook retries of a call)
+_current_turn_id: ContextVar[str] = ContextVar("current_turn_id", default=None)
+
+def set_turn_context(turn_id: str):
+    """Sets the turn id for the current context."""
+    _current_turn_id.set(turn_id)
+
+def get_turn_context() -> str:
+    """Retrieves the turn id from the current context."""
+    return _current_turn_id.get()
+
+# ContextVar to store the per-call read-through cache (see services/call_cache.py)
+_current_call_cache: ContextVar[object] = ContextVar("current_call_cache", default=None)
+
+def set_call_cache(cache):
+    """Sets the call cache for the current context."""
+    _current_call_cache.set(cache)
+
+def get_call_cache():
+    """Retrieves the call cache from the current context (None outside a turn)."""
+    return _current_call_cache.get()
+
+# ContextVar to store the currently open trace span (see services/tracing.py)
+_current_trace_span: ContextVar[object] = ContextVar("current_trace_span", default=None)
+
+def set_trace_span(span):
+    """Sets the open trace span for the current context."""
+    _current_trace_span.set(span)
+
+def get_trace_span():
+    """Retrieves the open trace span from the current context (None outside a span)."""
+    return _current_trace_span.get()